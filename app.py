@@ -1,53 +1,102 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_file, send_from_directory, stream_with_context, url_for
 from flask_cors import CORS
-import requests
-import xml.etree.ElementTree as ET
 from datetime import datetime
 from docx import Document
 from docx.shared import Inches, Mm
-from docx.enum.section import WD_ORIENT
-import PyPDF2
-import google.generativeai as genai
-import openai
 import os
 import tempfile
-from werkzeug.utils import secure_filename
 import re
-from docx.shared import RGBColor
+import json
+import time
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from law_api import metropolitan_govs, search_laws, get_law_detail, describe_error
+from law_cache import law_cache
+from law_text import normalize_text
+from ordinance_service import SEARCH_SCOPES, collect_ordinances, iter_collect
+import compare_jobs
+from docx_render import set_landscape_a3, write_search_results
+import pdf_extract
+import exporters
+import article_align
+import metrics
+import upstream
+from prompt_budget import (
+    ANALYSIS_REFERENCE_TOKEN_BUDGET, UPPER_LAW_TOKEN_BUDGET, UPPER_LAW_ORDINANCE_TOKEN_BUDGET,
+    UPPER_LAW_DOC_TOKEN_BUDGET, estimate_tokens, plan_reference_articles, select_passages, truncate_to_budget
+)
+from llm_client import (
+    GEMINI_TIMEOUT, OPENAI_TIMEOUT, generate_gemini, generate_openai, run_concurrently, stats as llm_stats
+)
 
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
-# API 설정
-OC = "climsneys85"  # 이메일 ID
-search_url = "http://www.law.go.kr/DRF/lawSearch.do"
-detail_url = "http://www.law.go.kr/DRF/lawService.do"
-
-# 광역지자체 코드 및 이름
-metropolitan_govs = {
-    '6110000': '서울특별시',
-    '6260000': '부산광역시',
-    '6270000': '대구광역시',
-    '6280000': '인천광역시',
-    '6290000': '광주광역시',
-    '6300000': '대전광역시',
-    '5690000': '세종특별자치시',
-    '6310000': '울산광역시',
-    '6410000': '경기도',
-    '6530000': '강원특별자치도',
-    '6430000': '충청북도',
-    '6440000': '충청남도',
-    '6540000': '전북특별자치도',
-    '6460000': '전라남도',
-    '6470000': '경상북도',
-    '6480000': '경상남도',
-    '6500000': '제주특별자치도'
-}
-
 # 임시 파일 저장 경로
 UPLOAD_FOLDER = tempfile.gettempdir()
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Word/Excel 문서를 응답으로 보낼 때 메모리에 둘 최대 크기 (넘으면 요청별 임시 파일로 넘김)
+DOCX_SPOOL_MAX_BYTES = int(os.environ.get('DOCX_SPOOL_MAX_BYTES', str(16 * 1024 * 1024)))
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+# /api/save 저장 형식
+EXPORT_FORMATS = ('docx', 'xlsx') + tuple(exporters.STREAM_FORMATS)
+
+# 상위법령 검토(검색, 본문 조회, Gemini 검토)를 동시에 진행할 법령 수
+UPPER_LAW_MAX_WORKERS = int(os.environ.get('UPPER_LAW_MAX_WORKERS', '4'))
+
+def send_spooled(write, download_name, mimetype=DOCX_MIMETYPE):
+    """
+    write(파일 객체)로 문서를 요청마다 따로 만든 버퍼에 써서 바로 응답으로 보냄 (고정된 임시 파일 이름을 쓰지 않음)
+    DOCX_SPOOL_MAX_BYTES까지는 메모리에 두고, 더 크면 이름 없는 임시 파일로 넘어가며 응답이 끝나면 닫힘
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=DOCX_SPOOL_MAX_BYTES)
+    with metrics.span('render', format=os.path.splitext(download_name)[1].lstrip('.')) as info:
+        write(buffer)
+        info['bytes'] = buffer.tell()
+    buffer.seek(0)
+    return send_file(buffer, mimetype=mimetype, as_attachment=True, download_name=download_name)
+
+def send_stream(chunks, download_name, mimetype):
+    # 제너레이터가 내보내는 조각을 그대로 첨부 파일 응답으로 보냄 (한글 파일 이름은 filename*로 전달)
+    extension = os.path.splitext(download_name)[1]
+    ascii_name = 'search_results' + extension
+
+    def timed_chunks():
+        # 렌더링이 응답 전송과 함께 진행되므로 마지막 조각까지 보낸 시간을 기록
+        with metrics.span('render', format=extension.lstrip('.')):
+            yield from chunks
+
+    return Response(
+        stream_with_context(timed_chunks()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(download_name)}"}
+    )
+
+@app.before_request
+def start_request_metrics():
+    # 요청마다 request_id를 정하고(X-Request-ID 헤더가 있으면 그대로 사용) 처리 시간 측정을 시작
+    g.request_started = time.monotonic()
+    metrics.start_request(request.headers.get('X-Request-ID'))
+
+@app.after_request
+def finish_request_metrics(response):
+    # 스트리밍 응답은 헤더를 보내기까지의 시간이 기록됨 (본문 생성 시간은 단계별 span으로 확인)
+    seconds = time.monotonic() - g.request_started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_REQUEST_SECONDS.observe(seconds, method=request.method, route=route, status=response.status_code)
+    if route != '/metrics':
+        metrics.log('request', method=request.method, path=request.path, route=route,
+                    status=response.status_code, seconds=round(seconds, 4))
+    response.headers['X-Request-ID'] = metrics.request_id()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # 이 워커의 지표 (Prometheus 텍스트 형식, gunicorn 워커마다 따로 집계되므로 워커별로 수집해야 함)
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/')
 def index():
     return send_from_directory('.', 'index.html')
@@ -56,32 +105,6 @@ def index():
 def static_files(path):
     return send_from_directory('.', path)
 
-def get_ordinance_detail(ordinance_id):
-    params = {
-        'OC': OC,
-        'target': 'ordin',
-        'ID': ordinance_id,
-        'type': 'XML'
-    }
-    try:
-        response = requests.get(detail_url, params=params, timeout=60)
-        root = ET.fromstring(response.text)
-        articles = []
-        for article in root.findall('.//조'):
-            content = article.find('조내용').text if article.find('조내용') is not None else ""
-            if content:
-                content = content.replace('<![CDATA[', '').replace(']]>', '')
-                content = content.replace('<p>', '').replace('</p>', '\n')
-                content = content.replace('<br/>', '\n')
-                content = content.replace('<br>', '\n')
-                content = content.replace('&nbsp;', ' ')
-                content = content.strip()
-            if content:
-                articles.append(content)
-        return articles
-    except Exception:
-        return []
-
 @app.route('/api/search', methods=['POST'])
 def search():
     try:
@@ -93,73 +116,77 @@ def search():
         if not query:
             return jsonify({'error': '검색어가 비어있습니다.'}), 400
 
-        results = []
-        total_count = 0
-
-        # 각 광역지자체별로 검색
-        for org_code, metro_name in metropolitan_govs.items():
-            try:
-                params = {
-                    'OC': OC,
-                    'target': 'ordin',
-                    'type': 'XML',
-                    'query': query,
-                    'display': 100,
-                    'search': 1,  # 제목만 검색
-                    'sort': 'ddes',
-                    'page': 1,
-                    'org': org_code
-                }
-                
-                response = requests.get(search_url, params=params, timeout=60)
-                response.raise_for_status()  # HTTP 오류 체크
-                
-                root = ET.fromstring(response.text)
-                total_laws = len(root.findall('.//law'))
-                
-                if total_laws > 0:
-                    for law in root.findall('.//law'):
-                        ordinance_name = law.find('자치법규명').text if law.find('자치법규명') is not None else ""
-                        ordinance_id = law.find('자치법규ID').text if law.find('자치법규ID') is not None else None
-                        기관명 = law.find('지자체기관명').text if law.find('지자체기관명') is not None else ""
-                        
-                        if 기관명 != metro_name:
-                            continue  # 본청이 아니면 건너뜀
-                            
-                        # 검색어 매칭 로직
-                        search_terms = [term.lower() for term in query.split() if term.strip()]
-                        ordinance_name_clean = ordinance_name.replace(' ', '').lower()
-                        if not all(term in ordinance_name_clean for term in search_terms):
-                            continue
-                            
-                        total_count += 1
-                        articles = get_ordinance_detail(ordinance_id)
-                        
-                        results.append({
-                            'name': ordinance_name,
-                            'content': '\n'.join(articles) if articles else '(조문 없음)',
-                            'metro': metro_name
-                        })
-                        
-            except requests.RequestException as e:
-                print(f"API 요청 오류 ({metro_name}): {str(e)}")
-                continue
-            except ET.ParseError as e:
-                print(f"XML 파싱 오류 ({metro_name}): {str(e)}")
-                continue
-            except Exception as e:
-                print(f"예상치 못한 오류 ({metro_name}): {str(e)}")
-                continue
+        # 검색 범위: title(조례명), body(조례명과 조문 본문, 로컬 색인 필요)
+        scope = data.get('scope', 'title')
+        if scope not in SEARCH_SCOPES:
+            return jsonify({'error': '검색 범위는 title 또는 body여야 합니다.'}), 400
+
+        # 같은 검색어의 최근 수집 결과가 있으면 재사용
+        collected = collect_ordinances(query, scope=scope)
+        results = [
+            {
+                'name': ordinance.name,
+                'content': ordinance.text,
+                'metro': ordinance.metro
+            }
+            for ordinance in collected.ordinances
+        ]
 
         return jsonify({
             'results': results,
-            'total': total_count
+            'total': collected.total,
+            'regions': [asdict(region) for region in collected.regions]
         })
 
     except Exception as e:
         print(f"검색 처리 중 오류 발생: {str(e)}")
         return jsonify({'error': f'검색 처리 중 오류가 발생했습니다: {str(e)}'}), 500
 
+@app.route('/api/search/stream', methods=['POST'])
+def search_stream():
+    data = request.get_json()
+    if not data or 'query' not in data:
+        return jsonify({'error': '검색어가 필요합니다.'}), 400
+
+    query = data['query'].strip()
+    if not query:
+        return jsonify({'error': '검색어가 비어있습니다.'}), 400
+
+    scope = data.get('scope', 'title')
+    if scope not in SEARCH_SCOPES:
+        return jsonify({'error': '검색 범위는 title 또는 body여야 합니다.'}), 400
+
+    # 지역별 수집이 끝나는 대로 한 줄에 하나씩 JSON 레코드(NDJSON)로 전송
+    def generate():
+        total = 0
+        regions = [None] * len(metropolitan_govs)
+        try:
+            for index, status, ordinances in iter_collect(query, scope=scope):
+                for ordinance in ordinances:
+                    total += 1
+                    yield json.dumps({
+                        'type': 'result',
+                        'region_index': index,
+                        'name': ordinance.name,
+                        'content': ordinance.text,
+                        'metro': ordinance.metro
+                    }, ensure_ascii=False) + '\n'
+                regions[index] = asdict(status)
+                yield json.dumps({'type': 'region', 'region_index': index, **regions[index]},
+                                 ensure_ascii=False) + '\n'
+            yield json.dumps({'type': 'summary', 'total': total, 'regions': regions},
+                             ensure_ascii=False) + '\n'
+        except Exception as e:
+            print(f"검색 처리 중 오류 발생: {str(e)}")
+            yield json.dumps({'type': 'error', 'error': f'검색 처리 중 오류가 발생했습니다: {str(e)}'},
+                             ensure_ascii=False) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/save', methods=['POST'])
 def save():
     try:
@@ -171,122 +198,39 @@ def save():
         if not query:
             return jsonify({'error': '검색어가 비어있습니다.'}), 400
 
+        # docx(기본), xlsx, html, csv, json, ndjson
+        export_format = data.get('format', 'docx')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'지원하지 않는 저장 형식입니다. ({", ".join(EXPORT_FORMATS)})'}), 400
+
+        # 검색 범위는 /api/search와 같음
+        scope = data.get('scope', 'title')
+        if scope not in SEARCH_SCOPES:
+            return jsonify({'error': '검색 범위는 title 또는 body여야 합니다.'}), 400
+
         # 검색 결과 수집
-        results = []
-        total_count = 0
-
-        # 각 광역지자체별로 검색
-        for org_code, metro_name in metropolitan_govs.items():
-            try:
-                params = {
-                    'OC': OC,
-                    'target': 'ordin',
-                    'type': 'XML',
-                    'query': query,
-                    'display': 100,
-                    'search': 1,  # 제목만 검색
-                    'sort': 'ddes',
-                    'page': 1,
-                    'org': org_code
-                }
-                
-                response = requests.get(search_url, params=params, timeout=60)
-                response.raise_for_status()
-                
-                root = ET.fromstring(response.text)
-                for law in root.findall('.//law'):
-                    ordinance_name = law.find('자치법규명').text if law.find('자치법규명') is not None else ""
-                    ordinance_id = law.find('자치법규ID').text if law.find('자치법규ID') is not None else None
-                    기관명 = law.find('지자체기관명').text if law.find('지자체기관명') is not None else ""
-                    
-                    if 기관명 != metro_name:
-                        continue  # 본청이 아니면 건너뜀
-                        
-                    # 검색어 매칭 로직
-                    search_terms = [term.lower() for term in query.split() if term.strip()]
-                    ordinance_name_clean = ordinance_name.replace(' ', '').lower()
-                    if not all(term in ordinance_name_clean for term in search_terms):
-                        continue
-                        
-                    total_count += 1
-                    articles = get_ordinance_detail(ordinance_id)
-                    results.append({
-                        'name': ordinance_name,
-                        'content': articles,
-                        'metro': metro_name
-                    })
-                    
-            except Exception as e:
-                print(f"검색 중 오류 발생 ({metro_name}): {str(e)}")
-                continue
+        # /api/search에서 방금 수집한 결과가 있으면 다시 크롤링하지 않음
+        collected = collect_ordinances(query, scope=scope)
+        results = collected.ordinances
+        total_count = collected.total
 
         if not results:
             return jsonify({'error': '검색 결과가 없습니다.'}), 404
 
-        # Word 문서 생성
-        doc = Document()
-        section = doc.sections[-1]
-        section.orientation = WD_ORIENT.LANDSCAPE
-        section.page_width = Mm(420)
-        section.page_height = Mm(297)
-
-        # 제목 추가
-        doc.add_heading('조례 검색 결과', level=1)
-        doc.add_paragraph(f'검색어: {query}')
-        doc.add_paragraph(f'총 {total_count}건의 조례가 검색되었습니다.\n')
-
-        # 조례를 3개씩 그룹화
-        for i in range(0, len(results), 3):
-            # 현재 페이지의 조례들
-            current_laws = results[i:i+3]
-            # 3개 미만이면 빈 값으로 채움
-            while len(current_laws) < 3:
-                current_laws.append({'name': '', 'content': [], 'metro': ''})
-
-            # 표 생성 (1행, 3열 고정)
-            table = doc.add_table(rows=1, cols=3)
-            table.style = 'Table Grid'
-            table.autofit = True
-
-            # 각 셀에 조례 내용 추가
-            for idx, law in enumerate(current_laws):
-                cell = table.cell(0, idx)
-                paragraph = cell.paragraphs[0]
-                
-                if law['name']:
-                    # 조례명 추가
-                    run = paragraph.add_run(f"{law['metro']}\n{law['name']}\n")
-                    run.bold = True
-                    run.font.color.rgb = RGBColor(255, 0, 0)  # 빨간색
-                    
-                    # 조문 내용 추가
-                    if law['content']:
-                        paragraph.add_run('\n'.join(law['content']))
-                    else:
-                        paragraph.add_run('(조문 없음)')
-
-            # 마지막 페이지가 아니면 페이지 나누기 추가
-            if i + 3 < len(results):
-                doc.add_page_break()
-                section = doc.sections[-1]
-                section.orientation = WD_ORIENT.LANDSCAPE
-                section.page_width = Mm(420)
-                section.page_height = Mm(297)
-
-        # 임시 파일로 저장
-        temp_docx = os.path.join(app.config['UPLOAD_FOLDER'], 'search_results.docx')
-        doc.save(temp_docx)
-
-        return send_file(
-            temp_docx,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            as_attachment=True,
-            download_name=f'조례_검색결과_{datetime.now().strftime("%Y%m%d_%H%M%S")}.docx'
-        )
+        download_name = f'조례_검색결과_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+        if export_format == 'docx':
+            # Word 문서 생성 (python-docx 객체 대신 본문 XML을 한 번에 만들어 씀)
+            return send_spooled(lambda out: write_search_results(out, query, results, total_count), download_name)
+        if export_format == 'xlsx':
+            return send_spooled(lambda out: exporters.write_xlsx(out, collected), download_name,
+                                mimetype=exporters.XLSX_MIMETYPE)
+        # 나머지 형식은 버퍼 없이 조례 단위로 바로 흘려보냄
+        mimetype, generate = exporters.STREAM_FORMATS[export_format]
+        return send_stream(generate(collected), download_name, mimetype)
 
     except Exception as e:
-        print(f"Word 문서 저장 중 오류 발생: {str(e)}")
-        return jsonify({'error': f'Word 문서 저장 중 오류가 발생했습니다: {str(e)}'}), 500
+        print(f"검색 결과 저장 중 오류 발생: {str(e)}")
+        return jsonify({'error': f'검색 결과 저장 중 오류가 발생했습니다: {str(e)}'}), 500
 
 @app.route('/api/upload', methods=['POST'])
 def upload():
@@ -301,199 +245,238 @@ def upload():
         if not file.filename.lower().endswith('.pdf'):
             return jsonify({'error': 'PDF 파일만 업로드 가능합니다.'}), 400
 
-        # 파일 저장
-        filename = 'uploaded_pdf.pdf'
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # 파일이 제대로 저장되었는지 확인
-        if not os.path.exists(filepath):
-            return jsonify({'error': '파일 저장에 실패했습니다.'}), 500
-            
-        # PDF 파일 읽기 테스트
+        # PDF 텍스트를 추출해 검사하고, 파일 내용의 해시를 문서 ID로 돌려줌
+        # (추출한 텍스트는 공유 캐시에 보관되어 비교 분석에서 PDF를 다시 보내거나 다시 파싱하지 않음)
         try:
-            with open(filepath, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                if len(reader.pages) == 0:
-                    return jsonify({'error': 'PDF 파일이 비어있습니다.'}), 400
+            _, info = pdf_extract.extract_text(file.read())
         except Exception as e:
             return jsonify({'error': f'PDF 파일 읽기 실패: {str(e)}'}), 400
 
-        return jsonify({'message': 'PDF 파일이 성공적으로 업로드되었습니다.'})
+        return jsonify({
+            'message': 'PDF 파일이 성공적으로 업로드되었습니다.',
+            'document_id': info['sha256'],
+            'filename': file.filename,
+            'pages': info['pages']
+        })
         
     except Exception as e:
         print(f"PDF 업로드 중 오류 발생: {str(e)}")
         return jsonify({'error': f'PDF 업로드 중 오류가 발생했습니다: {str(e)}'}), 500
 
-def extract_pdf_text(pdf_path):
-    try:
-        with open(pdf_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            text = ''
-            for page in reader.pages:
-                text += page.extract_text() + '\n'
-            return text
-    except Exception as e:
-        print(f"PDF 텍스트 추출 중 오류 발생: {str(e)}")
-        return None
-
-@app.route('/api/compare', methods=['POST'])
-def compare():
-    try:
-        debug_logs = []
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    # 이 워커의 캐시 적중/미스 횟수와 공유 캐시 파일의 크기, PDF 추출 통계, LLM 응답 캐시 통계, law.go.kr 브레이커 상태
+    stats = law_cache.stats()
+    stats['pdf'] = pdf_extract.stats()
+    stats['llm'] = llm_stats()
+    stats['upstream'] = upstream.stats()
+    return jsonify(stats)
+
+def _compare_form():
+    # /api/compare와 /api/compare/jobs의 공통 입력 검사 (오류가 있으면 (None, 오류 응답) 반환)
+    query = request.form.get('query', '').strip()
+    if not query:
+        return None, (jsonify({'error': '검색어가 필요합니다.'}), 400)
+
+    # 검색 범위는 /api/search와 같음
+    scope = request.form.get('scope', 'title').strip() or 'title'
+    if scope not in SEARCH_SCOPES:
+        return None, (jsonify({'error': '검색 범위는 title 또는 body여야 합니다.'}), 400)
+
+    # API 키 확인
+    gemini_api_key = request.form.get('geminiApiKey', '').strip()
+    openai_api_key = request.form.get('openaiApiKey', '').strip()
+
+    if not gemini_api_key and not openai_api_key:
+        return None, (jsonify({'error': 'API 키를 하나 이상 입력해주세요.'}), 400)
+
+    # /api/upload에서 받은 문서 ID를 쓰고, 없으면 함께 보낸 PDF를 여기서 추출
+    document_id = request.form.get('document_id', '').strip()
+    if document_id:
+        if pdf_extract.load_text(document_id) is None:
+            return None, (jsonify({'error': '업로드한 문서를 찾을 수 없습니다. PDF를 다시 업로드해주세요.'}), 404)
+    else:
         if 'pdf' not in request.files:
-            return jsonify({'error': 'PDF 파일이 없습니다.'}), 400
+            return None, (jsonify({'error': 'PDF 파일이 없습니다.'}), 400)
 
         pdf_file = request.files['pdf']
         if pdf_file.filename == '':
-            return jsonify({'error': '선택된 파일이 없습니다.'}), 400
+            return None, (jsonify({'error': '선택된 파일이 없습니다.'}), 400)
 
-        if not pdf_file.filename.endswith('.pdf'):
-            return jsonify({'error': 'PDF 파일만 업로드 가능합니다.'}), 400
+        if not pdf_file.filename.lower().endswith('.pdf'):
+            return None, (jsonify({'error': 'PDF 파일만 업로드 가능합니다.'}), 400)
 
-        # PDF 파일 저장
-        filename = secure_filename(pdf_file.filename)
-        pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        pdf_file.save(pdf_path)
+        try:
+            _, info = pdf_extract.extract_text(pdf_file.read())
+        except Exception as e:
+            return None, (jsonify({'error': f'PDF 파일 읽기 실패: {str(e)}'}), 400)
+        document_id = info['sha256']
+
+    # refresh를 주면 저장해 둔 LLM 응답을 쓰지 않고 새로 분석 (새 응답으로 캐시를 갱신)
+    refresh = request.form.get('refresh', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+    return {
+        'document_id': document_id,
+        'query': query,
+        'scope': scope,
+        'gemini_api_key': gemini_api_key,
+        'openai_api_key': openai_api_key,
+        'use_llm_cache': not refresh
+    }, None
+
+def analyze_ordinance(pdf_text, results, gemini_api_key, openai_api_key, use_llm_cache=True, alignments=None):
+    """
+    입력된 API 키의 제공자(Gemini, OpenAI)에 같은 프롬프트로 동시에 분석을 요청
+    결과는 응답 순서와 관계없이 Gemini, OpenAI 순서로 반환
+    """
+    debug_logs = []
+    analysis_results = []
+    is_first_ordinance = not results
+
+    prompt = create_analysis_prompt(pdf_text, results, is_first_ordinance, alignments)
+    calls = []
+    if gemini_api_key:
+        debug_logs.append(f"[DEBUG] Gemini 프롬프트 길이: {len(prompt)}")
+        calls.append(('Gemini', lambda: generate_gemini(gemini_api_key, prompt, use_cache=use_llm_cache),
+                      GEMINI_TIMEOUT))
+    if openai_api_key:
+        calls.append(('OpenAI', lambda: generate_openai(openai_api_key, prompt, use_cache=use_llm_cache),
+                      OPENAI_TIMEOUT))
+
+    for model_name, text, error in run_concurrently(calls):
+        if error is not None:
+            print(f"{model_name} API 오류: {str(error)}")
+            debug_logs.append(f"{model_name} API 오류: {str(error)}")
+            analysis_results.append({
+                'model': model_name,
+                'error': str(error)
+            })
+        elif text:
+            if model_name == 'Gemini':
+                debug_logs.append(f"[DEBUG] Gemini 응답: {text}")
+            analysis_results.append({
+                'model': model_name,
+                'content': text
+            })
+        elif model_name == 'Gemini':
+            analysis_results.append({
+                'model': 'Gemini',
+                'error': 'Gemini API 응답이 비어있음 또는 None입니다.'
+            })
+
+    return analysis_results, debug_logs
+
+def run_comparison(document_id, query, gemini_api_key, openai_api_key, report=None, use_llm_cache=True,
+                   scope='title'):
+    """
+    비교 분석 전체 과정을 실행해 Word 문서를 반환 (분석 결과가 하나도 없으면 None)
+    report(state)는 단계가 바뀔 때마다 호출되며, use_llm_cache=False이면 저장해 둔 LLM 응답을 쓰지 않음
+    scope는 비교할 조례를 찾는 검색 범위 (/api/search와 같음)
+    """
+    report = report or (lambda state: None)
+
+    # /api/search에서 방금 수집한 결과가 있으면 다시 크롤링하지 않음
+    report('crawling')
+    results = collect_ordinances(query, scope=scope).ordinances
+
+    # 업로드할 때 추출해 둔 PDF 텍스트
+    report('extracting')
+    document = pdf_extract.load_text(document_id)
+    if document is None:
+        raise RuntimeError('업로드한 문서를 찾을 수 없습니다. PDF를 다시 업로드해주세요.')
+    pdf_text = document[0]
+
+    # 조 단위 자동 대응 (문서의 조문 대응표와 프롬프트의 대응 요약에 사용)
+    with metrics.span('article_align') as info:
+        alignments = article_align.align(pdf_text, results) if results else []
+        info['articles'] = len(alignments)
+
+    report('analyzing')
+    with metrics.span('analysis'):
+        analysis_results, debug_logs = analyze_ordinance(pdf_text, results, gemini_api_key, openai_api_key,
+                                                         use_llm_cache=use_llm_cache, alignments=alignments)
+    if not analysis_results:
+        return None
 
-        # 검색 결과 수집
-        query = request.form.get('query', '').strip()
-        if not query:
-            return jsonify({'error': '검색어가 필요합니다.'}), 400
+    # Word 문서 생성 (분석 결과, 디버그 로그 등 모두 워드에만 저장)
+    report('upper_law_review')
+    with metrics.span('comparison_document'):
+        return create_comparison_document(pdf_text, results, analysis_results, debug_logs,
+                                          gemini_api_key=gemini_api_key, use_llm_cache=use_llm_cache,
+                                          alignments=alignments)
 
-        results = []
-        total_count = 0
-
-        # 각 광역지자체별로 검색
-        for org_code, metro_name in metropolitan_govs.items():
-            try:
-                params = {
-                    'OC': OC,
-                    'target': 'ordin',
-                    'type': 'XML',
-                    'query': query,
-                    'display': 100,
-                    'search': 1,  # 제목만 검색
-                    'sort': 'ddes',
-                    'page': 1,
-                    'org': org_code
-                }
-                
-                response = requests.get(search_url, params=params, timeout=60)
-                response.raise_for_status()
-                
-                root = ET.fromstring(response.text)
-                for law in root.findall('.//law'):
-                    ordinance_name = law.find('자치법규명').text if law.find('자치법규명') is not None else ""
-                    ordinance_id = law.find('자치법규ID').text if law.find('자치법규ID') is not None else None
-                    기관명 = law.find('지자체기관명').text if law.find('지자체기관명') is not None else ""
-                    
-                    if 기관명 != metro_name:
-                        continue  # 본청이 아니면 건너뜀
-                        
-                    # 검색어 매칭 로직
-                    search_terms = [term.lower() for term in query.split() if term.strip()]
-                    ordinance_name_clean = ordinance_name.replace(' ', '').lower()
-                    if not all(term in ordinance_name_clean for term in search_terms):
-                        continue
-                        
-                    total_count += 1
-                    articles = get_ordinance_detail(ordinance_id)
-                    results.append({
-                        'name': ordinance_name,
-                        'content': articles,
-                        'metro': metro_name
-                    })
-                    
-            except Exception as e:
-                print(f"검색 중 오류 발생 ({metro_name}): {str(e)}")
-                continue
+@app.route('/api/compare', methods=['POST'])
+def compare():
+    try:
+        form, error = _compare_form()
+        if error:
+            return error
 
-        # PDF 텍스트 추출
-        pdf_text = extract_pdf_text(pdf_path)
-
-        # API 키 확인
-        gemini_api_key = request.form.get('geminiApiKey', '').strip()
-        openai_api_key = request.form.get('openaiApiKey', '').strip()
-
-        if not gemini_api_key and not openai_api_key:
-            return jsonify({'error': 'API 키를 하나 이상 입력해주세요.'}), 400
-
-        analysis_results = []
-        is_first_ordinance = not results
-
-        # Gemini API 분석
-        if gemini_api_key:
-            try:
-                genai.configure(api_key=gemini_api_key)
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                prompt = create_analysis_prompt(pdf_text, results, is_first_ordinance)
-                debug_logs.append(f"[DEBUG] Gemini 프롬프트 길이: {len(prompt)}")
-                response = model.generate_content(prompt)
-                debug_logs.append(f"[DEBUG] Gemini 응답: {getattr(response, 'text', None)}")
-                if response and hasattr(response, 'text') and response.text:
-                    analysis_results.append({
-                        'model': 'Gemini',
-                        'content': response.text
-                    })
-                else:
-                    analysis_results.append({
-                        'model': 'Gemini',
-                        'error': 'Gemini API 응답이 비어있음 또는 None입니다.'
-                    })
-            except Exception as e:
-                debug_logs.append(f"Gemini API 오류: {str(e)}")
-                analysis_results.append({
-                    'model': 'Gemini',
-                    'error': str(e)
-                })
-
-        # OpenAI API 분석
-        if openai_api_key:
-            try:
-                openai.api_key = openai_api_key
-                prompt = create_analysis_prompt(pdf_text, results, is_first_ordinance)
-                response = openai.ChatCompletion.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": "당신은 법률 전문가입니다. 조례 분석과 검토를 도와주세요."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=4000
-                )
-                if response.choices[0].message.content:
-                    analysis_results.append({
-                        'model': 'OpenAI',
-                        'content': response.choices[0].message.content
-                    })
-            except Exception as e:
-                print(f"OpenAI API 오류: {str(e)}")
-                analysis_results.append({
-                    'model': 'OpenAI',
-                    'error': str(e)
-                })
-
-        if not analysis_results:
+        doc = run_comparison(form['document_id'], form['query'], form['gemini_api_key'], form['openai_api_key'],
+                             use_llm_cache=form['use_llm_cache'], scope=form['scope'])
+        if doc is None:
             return jsonify({'error': '분석 결과가 없습니다.'}), 500
 
-        # Word 문서 생성 (분석 결과, 디버그 로그 등 모두 워드에만 저장)
-        doc = create_comparison_document(pdf_text, results, analysis_results, debug_logs)
-        # 임시 파일로 저장
-        temp_docx = os.path.join(app.config['UPLOAD_FOLDER'], 'comparison_results.docx')
-        doc.save(temp_docx)
-        return send_file(
-            temp_docx,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            as_attachment=True,
-            download_name=f'조례_비교분석_{datetime.now().strftime("%Y%m%d_%H%M%S")}.docx'
-        )
+        return send_spooled(doc.save, f'조례_비교분석_{datetime.now().strftime("%Y%m%d_%H%M%S")}.docx')
 
     except Exception as e:
         print(f"비교 분석 중 오류 발생: {str(e)}")
         return jsonify({'error': f'비교 분석 중 오류가 발생했습니다: {str(e)}'}), 500
 
-def create_analysis_prompt(pdf_text, search_results, is_first_ordinance=False):
+@app.route('/api/compare/jobs', methods=['POST'])
+def submit_compare_job():
+    # 비교 분석을 백그라운드 작업으로 등록하고 작업 ID를 바로 반환
+    try:
+        form, error = _compare_form()
+        if error:
+            return error
+
+        job_id = compare_jobs.create_job(query=form['query'], scope=form['scope'], document_id=form['document_id'])
+
+        def work(report, result_path):
+            doc = run_comparison(form['document_id'], form['query'], form['gemini_api_key'], form['openai_api_key'],
+                                 report=report, use_llm_cache=form['use_llm_cache'], scope=form['scope'])
+            if doc is None:
+                raise RuntimeError('분석 결과가 없습니다.')
+            report('rendering')
+            with metrics.span('render', format='docx'):
+                doc.save(result_path)
+
+        compare_jobs.start_job(job_id, work)
+        return jsonify({
+            'job_id': job_id,
+            'status_url': url_for('compare_job_status', job_id=job_id),
+            'download_url': url_for('compare_job_download', job_id=job_id)
+        }), 202
+
+    except Exception as e:
+        print(f"비교 분석 작업 등록 중 오류 발생: {str(e)}")
+        return jsonify({'error': f'비교 분석 작업 등록 중 오류가 발생했습니다: {str(e)}'}), 500
+
+@app.route('/api/compare/jobs/<job_id>', methods=['GET'])
+def compare_job_status(job_id):
+    status = compare_jobs.get_status(job_id)
+    if status is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(status)
+
+@app.route('/api/compare/jobs/<job_id>/download', methods=['GET'])
+def compare_job_download(job_id):
+    status = compare_jobs.get_status(job_id)
+    if status is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    path = compare_jobs.result_path(job_id)
+    if path is None:
+        return jsonify({'error': '아직 완료되지 않은 작업입니다.', 'status': status}), 409
+    created_at = datetime.fromtimestamp(status['created_at'])
+    return send_file(
+        path,
+        mimetype=DOCX_MIMETYPE,
+        as_attachment=True,
+        download_name=f'조례_비교분석_{created_at.strftime("%Y%m%d_%H%M%S")}.docx'
+    )
+
+def create_analysis_prompt(pdf_text, search_results, is_first_ordinance=False, alignments=None):
     prompt = (
         "아래는 내가 업로드한 조례 PDF의 전체 내용이야.\n"
         "---\n"
@@ -507,11 +490,32 @@ def create_analysis_prompt(pdf_text, search_results, is_first_ordinance=False):
             "타시도 조례가 없는 상황에서, 아래 기준에 따라 조례의 적정성, 상위법령과의 관계, 실무적 검토 포인트 등을 중심으로 분석해줘.\n"
         )
     else:
+        identical = set()
+        if alignments:
+            # 조문별 대응은 미리 계산해 두고, 내 조례와 동일한 타 시도 조문은 본문을 다시 보내지 않음
+            prompt += (
+                "아래는 내 조례의 조문마다 타 시도 조례에서 가장 비슷한 조문을 글자 n-gram 유사도로 미리 찾아 둔 결과야. "
+                f"(유사도 {article_align.ALIGN_SAME_THRESHOLD} 이상 동일, "
+                f"{article_align.ALIGN_SIMILAR_THRESHOLD} 이상 유사, 그 밖에는 상이)\n"
+                "비교분석 요약표의 '타 시도 유사 조항'과 '동일 여부'는 이 결과를 바탕으로 작성해줘.\n"
+                f"{article_align.prompt_digest(alignments)}\n"
+                "---\n"
+            )
+            identical = article_align.identical_articles(alignments)
         prompt += "그리고 아래는 타시도 조례명과 각 조문 내용이야.\n"
-        for result in search_results:
-            prompt += f"조례명: {result['name']}\n"
-            for idx, article in enumerate(result['content']):
+        # 타 시도 조문은 내 조례와 관련도가 높은 것부터 토큰 예산 안에서만 포함
+        names_cost = sum(estimate_tokens(result.name) + 5 for result in search_results)
+        plan = plan_reference_articles(pdf_text or '', search_results,
+                                       max(ANALYSIS_REFERENCE_TOKEN_BUDGET - names_cost, 0), exclude=identical)
+        for o_index, (result, selected) in enumerate(zip(search_results, plan)):
+            prompt += f"조례명: {result.name}\n"
+            for idx, article in selected:
                 prompt += f"제{idx+1}조: {article}\n"
+            same = sum(1 for idx in range(len(result.articles)) if (o_index, idx) in identical)
+            if same:
+                prompt += f"(내 조례와 동일한 조문 {same}개 생략)\n"
+            if len(selected) + same < len(result.articles):
+                prompt += f"(관련성이 낮은 조문 {len(result.articles) - len(selected) - same}개 생략)\n"
     
     prompt += (
         "---\n"
@@ -544,12 +548,144 @@ def create_analysis_prompt(pdf_text, search_results, is_first_ordinance=False):
     )
     return prompt
 
-def create_comparison_document(pdf_text, search_results, analysis_results, debug_logs=None):
+# 분석 결과 파싱에 쓰는 정규식 (분석 결과마다 다시 컴파일하지 않도록 미리 준비)
+# 괄호, 따옴표, 공백 등 구분자에 둘러싸인 경우에도 핵심 법령명만 추출
+LAW_NAME_PATTERN = re.compile(
+    r'(?:^|[\s\(\[\{\<\"\'\“\‘『「])'  # 앞 구분자 또는 문장 처음
+    r'([가-힣·]{2,10}?(법|시행령|시행규칙))'      # 2~10글자 한글+법/시행령/시행규칙
+    r'(?:[\s\)\]\}\>\"\'\”\’』」.,;:!?~-]|$)'  # 뒤 구분자 또는 끝
+)
+# "c) 법령우위의 원칙 위반 여부" ~ 다음 항목 또는 끝까지
+LAW_SECTION_C_PATTERN = re.compile(r'c[).]\s*법령우위의 원칙 위반 여부[\s\S]+?(?=\n[0-9a-z][).]|\n[가-힣]\)|$)', re.IGNORECASE)
+TABLE_PATTERN = re.compile(r'(\|.+\|\n)+')
+MARKDOWN_SYMBOLS = re.compile(r'[#*`>\-]+')
+
+def extract_law_names(text):
+    candidates = set()
+    for m in LAW_NAME_PATTERN.finditer(text):
+        law_name = m.group(1)
+        if is_valid_law_name(law_name):
+            candidates.add(law_name)
+    return candidates
+
+def extract_law_section_c(text):
+    m = LAW_SECTION_C_PATTERN.search(text)
+    return m.group(0) if m else ''
+
+def parse_analysis_result(content):
+    """
+    LLM 분석 결과를 (요약표 데이터, 표를 뺀 나머지 텍스트, 상위법령 후보)로 나눔
+    """
+    table_data = None
+
+    # 1. 비교분석 요약표 추출
+    table_match = TABLE_PATTERN.search(content)
+    if table_match:
+        table_text = table_match.group()
+        rows = [row.strip() for row in table_text.strip().split('\n') if row.strip()]
+        # 마크다운 구분선(---) 제거
+        rows = [row for row in rows if not set(row.replace('|','').strip()) <= set('-')]
+        table_data = [[cell.strip().replace('**','') for cell in row.split('|')[1:-1]] for row in rows]
+        # 표 이후 텍스트만 남기기 위해 결과에서 표 부분 제거
+        content = content.replace(table_text, '')
+
+    # 2. 차별점 요약, 3. 검토시 유의사항 등 나머지 텍스트(마크다운 기호 제거)
+    clean_text = MARKDOWN_SYMBOLS.sub('', content)
+
+    # 'c) 법령우위의 원칙 위반 여부' 블록에서 상위법령 후보 추출
+    law_section_c = extract_law_section_c(clean_text)
+    upper_law_candidates = extract_law_names(law_section_c)
+    return table_data, clean_text, upper_law_candidates
+
+def review_upper_law(upper_law_name, pdf_text, gemini_api_key=None, use_llm_cache=True):
+    """
+    상위법령 하나를 검색해 본문을 가져오고 Gemini로 위반 여부를 검토
+    문서에 넣을 {'name', 'text'(관련 조문 발췌), 'lines'(검토 의견)}를 반환하며, 법령이나 본문을 찾지 못하면 None
+    """
+    print(f"[DEBUG] 상위법령명: {upper_law_name}")
+    # 1. lawSearch로 현행 법령ID 및 법령명한글 얻기 (캐시 사용)
+    law_id = None
+    law_name_kor = None
+    law_revision = None
+    for law in search_laws(upper_law_name):
+        if law['현행연혁코드'] == '현행':
+            law_id = law['법령ID']
+            law_name_kor = law['법령명한글']
+            law_revision = law['법령일련번호']
+            break
+    print(f"[DEBUG] law_id: {law_id}, law_name_kor: {law_name_kor}")
+    if not law_id or not law_name_kor:
+        print(f"[DEBUG] 법령ID 또는 법령명한글 없음, 건너뜀")
+        return None
+    # 2. lawService로 본문 요청 (법령일련번호가 바뀌면 캐시 무효화)
+    # 조문내용을 시작으로 딸린 항/호까지 묶어 조 단위 구절로 모음
+    passages = []
+    for tag, text in get_law_detail(law_id, revision=law_revision):
+        content = normalize_text(text)
+        if tag == '조문내용':
+            passages.append(content + '\n')
+        elif tag == '항내용':
+            if not passages:
+                passages.append('')
+            passages[-1] += '    ' + content + '\n'
+        elif tag == '호내용':
+            if not passages:
+                passages.append('')
+            passages[-1] += '        ' + content + '\n'
+    upper_law_text = ''.join(passages)
+    print(f"[DEBUG] upper_law_text length: {len(upper_law_text)}")
+    if not upper_law_text.strip():
+        print(f"[DEBUG] upper_law_text가 비어 있음, 건너뜀")
+        return None
+
+    # 상위 법령 전체 대신 내 조례와 관련도가 높은 조문만 예산 안에서 발췌
+    query_text = pdf_text or ''
+    prompt_excerpt = ''.join(passages[i] for i in select_passages(passages, query_text, UPPER_LAW_TOKEN_BUDGET))
+    doc_excerpt = ''.join(passages[i] for i in select_passages(passages, query_text, UPPER_LAW_DOC_TOKEN_BUDGET))
+    ordinance_excerpt = truncate_to_budget(query_text, UPPER_LAW_ORDINANCE_TOKEN_BUDGET)
+
+    review = {'name': upper_law_name, 'text': doc_excerpt, 'lines': []}
+    # 3. Gemini API로 위반 여부 분석 (동시 호출 수는 llm_client에서 제한)
+    if gemini_api_key:
+        try:
+            prompt = (
+                f'아래는 상위 법령({upper_law_name})의 조문 중 내 조례와 관련도가 높은 조문과 내가 업로드한 조례의 내용이야.\n'
+                '---상위 법령---\n'
+                f'{prompt_excerpt}\n'
+                '---내 조례---\n'
+                f'{ordinance_excerpt}\n'
+                '---\n'
+                '상위 법령 전체 조문 중에서, 내가 업로드한 조례와 직접적으로 관련 있는 조문(또는 위반 가능성이 있는 조문)만 발췌해서 요약해줘. 반드시 한글로 답변해줘.\n'
+                '1. [법령우위의 원칙 위반 여부]\n'
+                '- 조례가 상위 법령의 내용과 직접적으로 충돌하거나 위배되는지\n'
+                '- 상위 법령의 취지나 목적을 해치는지\n'
+                '- 상위 법령이 금지하는 행위를 허용하거나, 의무화하는 행위를 면제하는지\n\n'
+                '2. [법률 유보의 원칙 위반 여부]\n'
+                '- 주민의 권리를 제한하거나 의무를 부과하는 내용이 있는지\n'
+                '- 상위 법령에서 위임받지 않은 권한을 행사하는지\n'
+                '- 상위 법령의 위임 범위를 초과하는지\n\n'
+                '3. [실무적 검토 포인트]\n'
+                '- 조례의 집행 과정에서 발생할 수 있는 문제점\n'
+                '- 상위 법령과의 관계에서 주의해야 할 사항\n'
+                '- 개선이 필요한 부분과 그 방향성\n'
+            )
+            print(f"[DEBUG] Gemini 프롬프트 길이: {len(prompt)}")
+            response_text = generate_gemini(gemini_api_key, prompt, use_cache=use_llm_cache)
+            print(f"[DEBUG] Gemini 응답: {response_text}")
+            if response_text:
+                clean_gemini = MARKDOWN_SYMBOLS.sub('', response_text)
+                review['lines'] = [line.strip() for line in clean_gemini.split('\n') if line.strip()]
+            else:
+                review['lines'] = ['Gemini API 응단이 비어있음 또는 None입니다.']
+        except Exception as e:
+            print(f"Gemini API 오류: {e}")
+            review['lines'] = [f"상위법령 위반 여부 분석 중 오류가 발생했습니다: {str(e)}"]
+    return review
+
+def create_comparison_document(pdf_text, search_results, analysis_results, debug_logs=None, gemini_api_key=None,
+                               use_llm_cache=True, alignments=None):
     doc = Document()
-    section = doc.sections[-1]
-    section.orientation = WD_ORIENT.LANDSCAPE
-    section.page_width = Mm(420)
-    section.page_height = Mm(297)
+    set_landscape_a3(doc.sections[-1])
 
     # 제목 추가
     doc.add_heading('조례 비교 분석 결과', level=1)
@@ -561,190 +697,97 @@ def create_comparison_document(pdf_text, search_results, analysis_results, debug
     #     for log in debug_logs:
     #         doc.add_paragraph(log)
 
-    # 각 API 분석 결과 추가
-    for result in analysis_results:
-        if 'error' in result:
-            doc.add_paragraph(f"{result['model']} API 오류: {result['error']}")
-            continue
+    parsed_results = [
+        None if 'error' in result else parse_analysis_result(result['content'])
+        for result in analysis_results
+    ]
 
-        # 분석 결과 텍스트 정리
-        content = result['content']
-        
-        # 1. 비교분석 요약표 추출 및 표로 변환
-        table_pattern = re.compile(r'(\|.+\|\n)+')
-        table_match = table_pattern.search(content)
-        if table_match:
-            table_text = table_match.group()
-            rows = [row.strip() for row in table_text.strip().split('\n') if row.strip()]
-            # 마크다운 구분선(---) 제거
-            rows = [row for row in rows if not set(row.replace('|','').strip()) <= set('-')]
-            table_data = [[cell.strip().replace('**','') for cell in row.split('|')[1:-1]] for row in rows]
-            
-            # 표 생성
-            table = doc.add_table(rows=1, cols=len(table_data[0]))
+    # 모든 분석 결과의 상위법령 후보를 한 번씩만, 동시에 검토 (문서에는 아래에서 정해진 순서로 추가)
+    upper_law_names = sorted(set().union(*(parsed[2] for parsed in parsed_results if parsed)))
+
+    def review(name):
+        with metrics.span('upper_law_review', law=name):
+            return review_upper_law(name, pdf_text, gemini_api_key, use_llm_cache)
+
+    upper_law_executor = ThreadPoolExecutor(max_workers=UPPER_LAW_MAX_WORKERS)
+    try:
+        upper_law_reviews = {name: upper_law_executor.submit(metrics.bind(review), name) for name in upper_law_names}
+
+        # LLM 분석과 별도로 계산한 조문 대응표
+        if alignments:
+            doc.add_heading('조문 대응표 (자동 비교)', level=2)
+            rows = article_align.summary_rows(alignments)
+            table = doc.add_table(rows=1, cols=len(rows[0]))
             table.style = 'Table Grid'
             table.autofit = True
-            
-            # 헤더 추가
             for i, cell in enumerate(table.rows[0].cells):
-                cell.text = table_data[0][i]
-                if '동일 여부' in cell.text:
-                    cell.width = Mm(20)
-                if '추천 조문' in cell.text:
-                    cell.width = Mm(80)
-            
-            # 데이터 추가
-            for row in table_data[1:]:
+                cell.text = rows[0][i]
+            for row in rows[1:]:
                 cells = table.add_row().cells
-                for i, cell in enumerate(cells):
-                    cells[i].text = row[i]
-            
+                for i, value in enumerate(row):
+                    cells[i].text = value
             doc.add_paragraph('')
-            # 표 이후 텍스트만 남기기 위해 결과에서 표 부분 제거
-            content = content.replace(table_text, '')
 
-        # 2. 차별점 요약, 3. 검토시 유의사항 등 나머지 텍스트(마크다운 기호 제거)
-        clean_text = re.sub(r'[#*`>\-]+', '', content)
-        
-        # '3. 검토 시 유의사항'과 '4.' 블록 모두에서 상위법령 후보 추출
-        def extract_law_names(text):
-            # 괄호, 따옴표, 공백 등 구분자에 둘러싸인 경우에도 핵심 법령명만 추출
-            pattern = re.compile(
-                r'(?:^|[\s\(\[\{\<\"\'\“\‘『「])'  # 앞 구분자 또는 문장 처음
-                r'([가-힣·]{2,10}?(법|시행령|시행규칙))'      # 2~10글자 한글+법/시행령/시행규칙
-                r'(?:[\s\)\]\}\>\"\'\”\’』」.,;:!?~-]|$)'  # 뒤 구분자 또는 끝
-            )
-            candidates = set()
-            for m in pattern.finditer(text):
-                law_name = m.group(1)
-                if is_valid_law_name(law_name):
-                    candidates.add(law_name)
-            return candidates
-
-        def extract_law_section_c(text):
-            # "c) 법령우위의 원칙 위반 여부" ~ 다음 항목 또는 끝까지
-            m = re.search(r'c[).]\s*법령우위의 원칙 위반 여부[\s\S]+?(?=\n[0-9a-z][).]|\n[가-힣]\)|$)', text, re.IGNORECASE)
-            return m.group(0) if m else ''
-
-        law_section_c = extract_law_section_c(clean_text)
-        upper_law_candidates = extract_law_names(law_section_c)
-
-        # 나머지 분석 결과 추가 (중복 문단 제거)
-        added_paragraphs = set()
-        for line in clean_text.split('\n'):
-            line_strip = line.strip()
-            if line_strip and line_strip not in added_paragraphs:
-                doc.add_paragraph(line_strip)
-                added_paragraphs.add(line_strip)
-
-        # 상위법령 위반 여부 검토 (문서 마지막에 추가)
-        if upper_law_candidates:
-            doc.add_page_break()  # 새로운 페이지 시작
-            doc.add_heading('상위법령 위반 여부 검토', level=1)
-            # 임시 파일 경로 확보
-            temp_docx = os.path.join(app.config['UPLOAD_FOLDER'], 'comparison_results.docx')
-            for upper_law_name in upper_law_candidates:
-                try:
-                    print(f"[DEBUG] 상위법령명: {upper_law_name}")
-                    # 1. lawSearch로 현행 법령ID 및 법령명한글 얻기
-                    search_params = {
-                        'OC': OC,
-                        'target': 'law',
-                        'type': 'XML',
-                        'query': upper_law_name
-                    }
-                    search_resp = requests.get(search_url, params=search_params, timeout=60)
-                    print(f"[DEBUG] lawSearch status: {search_resp.status_code}")
-                    search_root = ET.fromstring(search_resp.text)
-                    law_id = None
-                    law_name_kor = None
-                    for law in search_root.findall('.//law'):
-                        if law.find('현행연혁코드') is not None and law.find('현행연혁코드').text == '현행':
-                            law_id = law.find('법령ID').text if law.find('법령ID') is not None else None
-                            law_name_kor = law.find('법령명한글').text if law.find('법령명한글') is not None else None
-                            break
-                    print(f"[DEBUG] law_id: {law_id}, law_name_kor: {law_name_kor}")
-                    if not law_id or not law_name_kor:
-                        print(f"[DEBUG] 법령ID 또는 법령명한글 없음, continue")
-                        continue
-                    # 2. lawService로 본문 요청
-                    detail_params = {
-                        'OC': OC,
-                        'target': 'law',
-                        'type': 'XML',
-                        'ID': law_id
-                    }
-                    detail_resp = requests.get(detail_url, params=detail_params, timeout=60)
-                    print(f"[DEBUG] lawService status: {detail_resp.status_code}")
-                    detail_root = ET.fromstring(detail_resp.text)
-                    upper_law_text = ''
-                    for node in detail_root.iter():
-                        if node.tag == '조문내용' and node.text and node.text.strip():
-                            content = re.sub(r'<[^>]+>', '', node.text)
-                            content = content.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>').strip()
-                            upper_law_text += content + '\n'
-                        elif node.tag == '항내용' and node.text and node.text.strip():
-                            content = re.sub(r'<[^>]+>', '', node.text)
-                            content = content.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>').strip()
-                            upper_law_text += '    ' + content + '\n'
-                        elif node.tag == '호내용' and node.text and node.text.strip():
-                            content = re.sub(r'<[^>]+>', '', node.text)
-                            content = content.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>').strip()
-                            upper_law_text += '        ' + content + '\n'
-                    print(f"[DEBUG] upper_law_text length: {len(upper_law_text)}")
-                    if not upper_law_text.strip():
-                        print(f"[DEBUG] upper_law_text가 비어 있음, continue")
-                        continue
-                    # 상위법령 검토 결과 추가
-                    doc.add_heading(f'상위 법령명: {upper_law_name}', level=2)
-                    doc.add_paragraph('(아래는 상위 법령 전체 조문 중 조례와 직접적으로 관련 있는 조문만 발췌/요약한 내용입니다.)')
-                    doc.add_paragraph(upper_law_text[:2000])
-                    # Gemini API로 위반 여부 분석
-                    if 'geminiApiKey' in request.form:
-                        try:
-                            genai.configure(api_key=request.form['geminiApiKey'])
-                            model = genai.GenerativeModel('gemini-1.5-flash')
-                            prompt = (
-                                f'아래는 상위 법령({upper_law_name})의 전체 조문과 내가 업로드한 조례의 전체 내용이야.\n'
-                                '---상위 법령---\n'
-                                f'{upper_law_text}\n'
-                                '---내 조례---\n'
-                                f'{pdf_text[:2000]}\n'
-                                '---\n'
-                                '상위 법령 전체 조문 중에서, 내가 업로드한 조례와 직접적으로 관련 있는 조문(또는 위반 가능성이 있는 조문)만 발췌해서 요약해줘. 반드시 한글로 답변해줘.\n'
-                                '1. [법령우위의 원칙 위반 여부]\n'
-                                '- 조례가 상위 법령의 내용과 직접적으로 충돌하거나 위배되는지\n'
-                                '- 상위 법령의 취지나 목적을 해치는지\n'
-                                '- 상위 법령이 금지하는 행위를 허용하거나, 의무화하는 행위를 면제하는지\n\n'
-                                '2. [법률 유보의 원칙 위반 여부]\n'
-                                '- 주민의 권리를 제한하거나 의무를 부과하는 내용이 있는지\n'
-                                '- 상위 법령에서 위임받지 않은 권한을 행사하는지\n'
-                                '- 상위 법령의 위임 범위를 초과하는지\n\n'
-                                '3. [실무적 검토 포인트]\n'
-                                '- 조례의 집행 과정에서 발생할 수 있는 문제점\n'
-                                '- 상위 법령과의 관계에서 주의해야 할 사항\n'
-                                '- 개선이 필요한 부분과 그 방향성\n'
-                            )
-                            print(f"[DEBUG] Gemini 프롬프트 길이: {len(prompt)}")
-                            response = model.generate_content(prompt)
-                            print(f"[DEBUG] Gemini 응답: {getattr(response, 'text', None)}")
-                            if response and hasattr(response, 'text') and response.text:
-                                clean_gemini = re.sub(r'[\*#`>\-]+', '', response.text)
-                                for line in clean_gemini.split('\n'):
-                                    if line.strip():
-                                        doc.add_paragraph(line.strip())
-                            else:
-                                doc.add_paragraph('Gemini API 응단이 비어있음 또는 None입니다.')
-                        except Exception as e:
-                            print(f"Gemini API 오류: {e}")
-                            doc.add_paragraph(f"상위법령 위반 여부 분석 중 오류가 발생했습니다: {str(e)}")
-                    # ★★★ 상위법령 하나 처리할 때마다 워드에 저장
-                    doc.save(temp_docx)
-                except Exception as e:
-                    print(f"상위법령 검토 중 오류 발생: {e}")
-                    doc.add_paragraph(f"상위법령 검토 중 오류 발생: {str(e)}")
-                    doc.save(temp_docx)
+        # 각 API 분석 결과 추가
+        for result, parsed in zip(analysis_results, parsed_results):
+            if parsed is None:
+                doc.add_paragraph(f"{result['model']} API 오류: {result['error']}")
+                continue
 
+            table_data, clean_text, upper_law_candidates = parsed
+
+            # 1. 비교분석 요약표를 표로 변환
+            if table_data:
+                # 표 생성
+                table = doc.add_table(rows=1, cols=len(table_data[0]))
+                table.style = 'Table Grid'
+                table.autofit = True
+            
+                # 헤더 추가
+                for i, cell in enumerate(table.rows[0].cells):
+                    cell.text = table_data[0][i]
+                    if '동일 여부' in cell.text:
+                        cell.width = Mm(20)
+                    if '추천 조문' in cell.text:
+                        cell.width = Mm(80)
+            
+                # 데이터 추가
+                for row in table_data[1:]:
+                    cells = table.add_row().cells
+                    for i, cell in enumerate(cells):
+                        cells[i].text = row[i]
+            
+                doc.add_paragraph('')
+
+            # 나머지 분석 결과 추가 (중복 문단 제거)
+            added_paragraphs = set()
+            for line in clean_text.split('\n'):
+                line_strip = line.strip()
+                if line_strip and line_strip not in added_paragraphs:
+                    doc.add_paragraph(line_strip)
+                    added_paragraphs.add(line_strip)
+
+            # 상위법령 위반 여부 검토 (문서 마지막에 추가)
+            if upper_law_candidates:
+                doc.add_page_break()  # 새로운 페이지 시작
+                doc.add_heading('상위법령 위반 여부 검토', level=1)
+                for upper_law_name in sorted(upper_law_candidates):
+                    try:
+                        review = upper_law_reviews[upper_law_name].result()
+                        if review is None:
+                            continue
+                        # 상위법령 검토 결과 추가
+                        doc.add_heading(f'상위 법령명: {upper_law_name}', level=2)
+                        doc.add_paragraph('(아래는 상위 법령 전체 조문 중 조례와 직접적으로 관련 있는 조문만 발췌/요약한 내용입니다.)')
+                        doc.add_paragraph(review['text'])
+                        for line in review['lines']:
+                            doc.add_paragraph(line)
+                    except Exception as e:
+                        print(f"상위법령 검토 중 오류 발생: {e}")
+                        doc.add_paragraph(f"상위법령 검토 중 오류 발생: {describe_error(e)}")
+    finally:
+        # 문서 생성 중 오류가 나도 스레드 풀을 정리 (아직 시작하지 않은 검토는 취소)
+        upper_law_executor.shutdown(wait=False, cancel_futures=True)
     return doc
 
 def is_valid_law_name(name):
@@ -0,0 +1,234 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from law_text import compact
+
+# 업로드한 조례와 타 시도 조례의 조문 대응 (LLM 없이 조 단위 글자 bigram TF-IDF 코사인 유사도로 가장 비슷한 조문을 찾음)
+# 유사도가 ALIGN_SAME_THRESHOLD 이상이면 동일, ALIGN_SIMILAR_THRESHOLD 이상이면 유사, 그 밖에는 상이
+ALIGN_SAME_THRESHOLD = float(os.environ.get('ALIGN_SAME_THRESHOLD', '0.9'))
+ALIGN_SIMILAR_THRESHOLD = float(os.environ.get('ALIGN_SIMILAR_THRESHOLD', '0.4'))
+# 프롬프트에 조문마다 넣을 대응 조문 수
+ALIGN_PROMPT_MATCHES = int(os.environ.get('ALIGN_PROMPT_MATCHES', '3'))
+# 유사도 계산 중 한 번에 만드는 중간 값 개수 (float32 4바이트씩, 기본 16MB)
+ALIGN_CHUNK_CELLS = int(os.environ.get('ALIGN_CHUNK_CELLS', str(4 * 1024 * 1024)))
+
+VERDICTS = ('동일', '유사', '상이')
+SUMMARY_HEADER = ['조문(내 조례)', '주요 내용', '가장 유사한 타 시도 조문', '유사도', '동일/유사/상이']
+
+# 줄 처음의 "제3조(목적)", "제 3 조의2 (정의)" 같은 조 제목 (본문 중의 "제3조에 따라"는 조 시작으로 보지 않음)
+_ARTICLE_HEAD = re.compile(r'^[ \t]*제\s*(\d+)\s*조(?:\s*의\s*(\d+))?\s*[(（]([^)）\n]*)[)）]', re.MULTILINE)
+_ADDENDA = re.compile(r'^[ \t]*부\s*칙', re.MULTILINE)
+
+
+@dataclass
+class Article:
+    label: str  # 제3조, 제3조의2
+    title: str
+    text: str
+
+    @property
+    def heading(self):
+        return f'{self.label}({self.title})' if self.title else self.label
+
+
+@dataclass
+class Match:
+    ordinance_index: int
+    metro: str
+    name: str
+    article_index: Optional[int]  # 조문이 없는 조례면 None
+    label: Optional[str]
+    score: float
+    verdict: str  # 동일, 유사, 상이 또는 없음(조문 없음)
+
+
+@dataclass
+class Alignment:
+    article: Article
+    matches: List[Match] = field(default_factory=list)  # 검색 결과(조례) 순서
+
+    @property
+    def best(self):
+        found = [match for match in self.matches if match.article_index is not None]
+        return max(found, key=lambda match: match.score) if found else None
+
+    def counts(self):
+        return {verdict: sum(1 for match in self.matches if match.verdict == verdict) for verdict in VERDICTS}
+
+
+def _label(head):
+    number, branch = head.group(1), head.group(2)
+    return f'제{number}조의{branch}' if branch else f'제{number}조'
+
+
+def split_articles(text):
+    """
+    조례 전문(PDF에서 추출한 텍스트)을 조 단위 Article 목록으로 나눔 (첫 조 앞의 제명과 부칙은 제외)
+    """
+    text = text or ''
+    heads = list(_ARTICLE_HEAD.finditer(text))
+    if not heads:
+        return []
+    addenda = _ADDENDA.search(text, heads[0].end())
+    end_all = addenda.start() if addenda else len(text)
+    articles = []
+    for i, head in enumerate(heads):
+        if head.start() >= end_all:
+            break
+        end = min(heads[i + 1].start(), end_all) if i + 1 < len(heads) else end_all
+        articles.append(Article(_label(head), head.group(3).strip(), text[head.start():end].strip()))
+    return articles
+
+
+def parse_article(text, index):
+    # get_ordinance_detail의 조문 하나 (조 제목이 없으면 순서대로 제N조로 표시)
+    head = _ARTICLE_HEAD.match(text)
+    if head is None:
+        return Article(f'제{index + 1}조', '', text)
+    return Article(_label(head), head.group(3).strip(), text)
+
+
+def _bigram_codes(text):
+    # 조 제목의 번호는 지역마다 달라 비교에서 빼고, 띄어쓰기와 문장부호를 없앤 글자 bigram을 정수 하나로 묶음
+    head = _ARTICLE_HEAD.match(text)
+    body = compact(text[head.end():] if head else text)
+    title = compact(head.group(3)) if head else ''
+    chars = np.frombuffer((title + body).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    if len(chars) < 2:
+        return chars
+    return (chars[:-1] << 21) | chars[1:]
+
+
+def _tfidf(texts):
+    # 글자 bigram TF-IDF(로그 TF, L2 정규화)를 희소 형식 (문서 번호, 항 번호, 가중치) 배열로 반환
+    codes = [_bigram_codes(text) for text in texts]
+    doc = np.repeat(np.arange(len(texts)), [len(c) for c in codes])
+    if not len(doc):
+        return doc, doc, np.zeros(0)
+    terms, term = np.unique(np.concatenate(codes), return_inverse=True)
+    pairs, tf = np.unique(doc * len(terms) + term.ravel(), return_counts=True)
+    doc, term = np.divmod(pairs, len(terms))
+    df = np.bincount(term, minlength=len(terms))
+    idf = np.log((1 + len(texts)) / (1 + df)) + 1
+    weight = (1 + np.log(tf)) * idf[term]
+    norm = np.sqrt(np.bincount(doc, weight ** 2, minlength=len(texts)))
+    return doc, term, weight / norm[doc]
+
+
+def similarity_matrix(ours, theirs):
+    """
+    ours(내 조례 조문)와 theirs(타 시도 조문) 사이의 코사인 유사도 행렬 (len(ours) x len(theirs))
+    타 시도 조문은 0이 아닌 항만 희소 형식으로 다루고, 한 번에 ALIGN_CHUNK_CELLS개 값씩 나눠 곱함
+    """
+    doc, term, weight = _tfidf(list(ours) + list(theirs))
+    m = len(ours)
+    mine = doc < m
+    # 내 조문에 나오는 항만 열로 쓰면 충분함 (나머지 항은 내적에 기여하지 않음)
+    our_terms = np.unique(term[mine])
+    column = np.full(int(term.max()) + 1 if len(term) else 0, -1)
+    column[our_terms] = np.arange(len(our_terms))
+    query = np.zeros((m, len(our_terms)), dtype=np.float32)
+    query[doc[mine], column[term[mine]]] = weight[mine]
+
+    # 타 시도 조문의 항 (_tfidf 결과는 문서 번호 순으로 정렬되어 있음)
+    keep = ~mine & (column[term] >= 0)
+    their_doc = doc[keep] - m
+    their_column = column[term[keep]]
+    their_weight = weight[keep].astype(np.float32)
+    scores = np.zeros((m, len(theirs)), dtype=np.float32)
+    step = max(1, ALIGN_CHUNK_CELLS // max(m, 1))
+    for start in range(0, len(their_doc), step):
+        docs = their_doc[start:start + step]
+        products = query[:, their_column[start:start + step]] * their_weight[start:start + step]
+        # 같은 문서의 항끼리 더함 (문서가 두 조각에 걸치면 두 번에 나눠 더해짐)
+        firsts = np.flatnonzero(np.r_[True, docs[1:] != docs[:-1]])
+        scores[:, docs[firsts]] += np.add.reduceat(products, firsts, axis=1)
+    return scores
+
+
+def verdict(score):
+    if score >= ALIGN_SAME_THRESHOLD:
+        return '동일'
+    if score >= ALIGN_SIMILAR_THRESHOLD:
+        return '유사'
+    return '상이'
+
+
+def align(pdf_text, ordinances):
+    """
+    업로드한 조례의 조마다 검색된 타 시도 조례(ordinances)별로 가장 비슷한 조문과 동일/유사/상이 판정을 찾아
+    Alignment 목록으로 반환 (PDF에서 조를 찾지 못하면 빈 목록)
+    """
+    ours = split_articles(pdf_text)
+    if not ours:
+        return []
+    theirs = [parse_article(text, index)
+              for ordinance in ordinances for index, text in enumerate(ordinance.articles)]
+    scores = similarity_matrix([article.text for article in ours], [article.text for article in theirs])
+
+    alignments = [Alignment(article) for article in ours]
+    start = 0
+    for o_index, ordinance in enumerate(ordinances):
+        stop = start + len(ordinance.articles)
+        if start == stop:
+            for alignment in alignments:
+                alignment.matches.append(Match(o_index, ordinance.metro, ordinance.name, None, None, 0.0, '없음'))
+            continue
+        best = scores[:, start:stop].argmax(axis=1)
+        for alignment, a_index, score in zip(alignments, best, scores[np.arange(len(ours)), start + best]):
+            score = float(score)
+            alignment.matches.append(Match(o_index, ordinance.metro, ordinance.name, int(a_index),
+                                           theirs[start + a_index].label, score, verdict(score)))
+        start = stop
+    return alignments
+
+
+def identical_articles(alignments):
+    # 내 조례의 어느 조와 동일로 판정된 타 시도 조문의 (조례 번호, 조문 번호) 집합
+    return {(match.ordinance_index, match.article_index)
+            for alignment in alignments for match in alignment.matches if match.verdict == '동일'}
+
+
+def _excerpt(text, limit=80):
+    head = _ARTICLE_HEAD.match(text)
+    body = ' '.join((text[head.end():] if head else text).split())
+    return body if len(body) <= limit else body[:limit] + '…'
+
+
+def summary_rows(alignments):
+    """
+    비교 분석 문서의 조문 대응표 ([머리글] + 조마다 한 행)
+    """
+    rows = [list(SUMMARY_HEADER)]
+    for alignment in alignments:
+        best = alignment.best
+        counts = alignment.counts()
+        rows.append([
+            alignment.article.heading,
+            _excerpt(alignment.article.text),
+            f'{best.metro} {best.name} {best.label}' if best else '-',
+            f'{best.score:.2f}' if best else '-',
+            ' · '.join(f'{verdict_name} {counts[verdict_name]}' for verdict_name in VERDICTS)
+        ])
+    return rows
+
+
+def prompt_digest(alignments, max_matches=ALIGN_PROMPT_MATCHES):
+    """
+    LLM 프롬프트에 넣을 조문 대응 요약 (조마다 한 줄, 유사도가 높은 대응 조문 max_matches개)
+    """
+    lines = []
+    for alignment in alignments:
+        counts = alignment.counts()
+        found = sorted((match for match in alignment.matches if match.article_index is not None),
+                       key=lambda match: match.score, reverse=True)[:max_matches]
+        top = '; '.join(f'{match.metro} {match.name} {match.label} {match.score:.2f}({match.verdict})'
+                        for match in found)
+        lines.append(f"{alignment.article.heading}: "
+                     + ', '.join(f'{verdict_name} {counts[verdict_name]}' for verdict_name in VERDICTS)
+                     + (f" | {top}" if top else ''))
+    return '\n'.join(lines)
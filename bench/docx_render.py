@@ -0,0 +1,138 @@
+"""
+/api/save Word 문서 생성 벤치마크 (이전 방식: python-docx로 표와 run을 하나씩 추가 / 현재 방식: docx_render 일괄 렌더링)
+
+    python bench/docx_render.py [--ordinances 150] [--articles 40]
+
+방식마다 별도 프로세스에서 실행해 생성 시간, 결과 크기, 최대 RSS를 비교하고, 생성한 문서를 python-docx로 다시 열어 확인
+"""
+import io
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_ordinances(count, articles):
+    # ordinance_service를 불러오지 않도록 같은 속성(metro, name, text)만 가진 객체를 만듦
+    class Ordinance:
+        def __init__(self, metro, name, articles):
+            self.metro = metro
+            self.name = name
+            self.articles = articles
+
+        @property
+        def text(self):
+            return '\n'.join(self.articles)
+
+    body = ('① 시장은 주차장의 효율적인 관리를 위하여 필요한 경우 관리 업무를 위탁할 수 있다.\n'
+            '② 제1항에 따라 위탁받은 자는 매년 운영 실적을 시장에게 보고하여야 한다.')
+    return [
+        Ordinance('서울특별시', f'서울특별시 주차장 설치 및 관리 조례 {i}',
+                  [f'제{j}조(목적) {body}' for j in range(1, articles + 1)])
+        for i in range(count)
+    ]
+
+
+def legacy_render(out, query, results, total_count):
+    # 이전 /api/save 구현
+    from docx import Document
+    from docx.enum.section import WD_ORIENT
+    from docx.shared import Mm, RGBColor
+
+    doc = Document()
+    section = doc.sections[-1]
+    section.orientation = WD_ORIENT.LANDSCAPE
+    section.page_width = Mm(420)
+    section.page_height = Mm(297)
+    doc.add_heading('조례 검색 결과', level=1)
+    doc.add_paragraph(f'검색어: {query}')
+    doc.add_paragraph(f'총 {total_count}건의 조례가 검색되었습니다.\n')
+    for i in range(0, len(results), 3):
+        current_laws = results[i:i + 3]
+        while len(current_laws) < 3:
+            current_laws.append(None)
+        table = doc.add_table(rows=1, cols=3)
+        table.style = 'Table Grid'
+        table.autofit = True
+        for idx, law in enumerate(current_laws):
+            paragraph = table.cell(0, idx).paragraphs[0]
+            if law is not None:
+                run = paragraph.add_run(f"{law.metro}\n{law.name}\n")
+                run.bold = True
+                run.font.color.rgb = RGBColor(255, 0, 0)
+                paragraph.add_run(law.text)
+        if i + 3 < len(results):
+            doc.add_page_break()
+            section = doc.sections[-1]
+            section.orientation = WD_ORIENT.LANDSCAPE
+            section.page_width = Mm(420)
+            section.page_height = Mm(297)
+    doc.save(out)
+
+
+def bulk_render(out, query, results, total_count):
+    from docx_render import write_search_results
+    write_search_results(out, query, results, total_count)
+
+
+def run_variant(name, count, articles):
+    results = make_ordinances(count, articles)
+    render = {'legacy': legacy_render, 'bulk': bulk_render}[name]
+    if name == 'bulk':
+        bulk_render(io.BytesIO(), 'warmup', results[:1], 1)  # 서식 준비는 워커마다 한 번뿐이므로 제외
+    started = time.perf_counter()
+    out = io.BytesIO()
+    render(out, '주차장', results, len(results))
+    seconds = time.perf_counter() - started
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # 검증을 위해 다시 열기 전에 측정
+
+    from docx import Document
+    doc = Document(io.BytesIO(out.getvalue()))
+    cells = [cell.text for table in doc.tables for cell in table.rows[0].cells]
+    return {
+        'seconds': seconds,
+        'bytes': len(out.getvalue()),
+        'max_rss_kb': max_rss_kb,
+        'tables': len(doc.tables),
+        'cells_digest': hash('\x00'.join(cells))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/save Word 문서 생성 벤치마크')
+    parser.add_argument('--ordinances', type=int, default=150)
+    parser.add_argument('--articles', type=int, default=40, help='조례당 조문 수')
+    parser.add_argument('--variant', choices=['legacy', 'bulk'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.ordinances, args.articles)))
+        return
+
+    env = dict(os.environ, PYTHONHASHSEED='0')
+    reports = {}
+    for name in ('legacy', 'bulk'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--variant', name,
+             '--ordinances', str(args.ordinances), '--articles', str(args.articles)],
+            check=True, capture_output=True, text=True, env=env
+        ).stdout
+        reports[name] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"조례 {args.ordinances}건, 조례당 조문 {args.articles}개")
+    print(f"{'방식':<10}{'시간(ms)':>12}{'크기(KB)':>12}{'최대 RSS(MB)':>16}{'표':>8}")
+    for name, report in reports.items():
+        print(f"{name:<10}{report['seconds'] * 1000:>12.1f}{report['bytes'] // 1024:>12}"
+              f"{report['max_rss_kb'] / 1024:>16.1f}{report['tables']:>8}")
+    same = reports['legacy']['cells_digest'] == reports['bulk']['cells_digest']
+    print(f"표 내용 일치: {'예' if same else '아니오'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+"""
+엔드포인트 부하 벤치마크 (bench/mock_law_server.py를 law.go.kr/Gemini/OpenAI 대신 띄우고 앱을 별도 프로세스로 실행)
+
+    python bench/load.py [--scenarios search,save,compare] [--concurrency 8] [--requests 40] [--distinct 40]
+                         [--gunicorn-workers 0] [--latency-ms 150 --jitter-ms 100 --error-rate 0 --llm-latency-ms 3000]
+                         [--law-api-rate 0]
+                         [--json results.json] [--baseline 이전결과.json]
+
+시나리오마다 빈 캐시(요청 한도 상태와 로컬 색인 포함)로 앱을 새로 띄운 뒤 동시 클라이언트 --concurrency개가 요청 --requests개를 나눠 보내고
+p50/p95 지연 시간, 처리량(요청/초), 앱 프로세스의 최대 RSS를 보고함
+검색어는 --distinct개를 돌려 쓰므로 --distinct를 --requests보다 작게 하면 캐시된 결과를 다시 쓰는 경우가 섞임
+--json으로 저장한 결과(커밋 해시 포함)를 다음 실행의 --baseline으로 주면 지표별 변화율을 함께 출력
+"""
+import os
+import sys
+import json
+import math
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = ('search', 'search_stream', 'save', 'compare')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{url} 서버가 시작되지 않았습니다 (종료 코드 {process.returncode})')
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} 서버가 {timeout}초 안에 응답하지 않았습니다')
+
+
+def peak_rss_kb(pid):
+    # 프로세스와 자식 프로세스(gunicorn 워커)의 최대 RSS(VmHWM) 합계 (Linux /proc 기준)
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total += int(line.split()[1])
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return total
+
+
+def make_pdf(lines):
+    # 글자(ASCII) 한 쪽짜리 최소 PDF (비교 분석 업로드용)
+    text = ''.join(f'({line.replace("(", "[").replace(")", "]")}) Tj T* ' for line in lines)
+    stream = f'BT /F1 10 Tf 14 TL 40 800 Td {text}ET'.encode('latin-1')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 4 0 R >> >> '
+        b'/Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream',
+    ]
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    out += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return bytes(out)
+
+
+class Servers:
+    """
+    대역 서버와 앱 서버를 띄우고 끄는 도우미 (앱은 시나리오마다 빈 캐시 디렉터리로 새로 띄움)
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.mock = None
+        self.app = None
+        self.workdir = None
+
+    def start_mock(self):
+        port = free_port()
+        self.mock_url = f'http://127.0.0.1:{port}'
+        self.mock = subprocess.Popen(
+            [sys.executable, os.path.join(BENCH, 'mock_law_server.py'), '--port', str(port),
+             '--latency-ms', str(self.args.latency_ms), '--jitter-ms', str(self.args.jitter_ms),
+             '--error-rate', str(self.args.error_rate), '--llm-latency-ms', str(self.args.llm_latency_ms),
+             '--ordinances', str(self.args.ordinances), '--articles', str(self.args.articles),
+             '--fixtures', self.args.fixtures],
+            stdout=subprocess.DEVNULL
+        )
+        wait_ready(f'{self.mock_url}/stats', self.mock)
+
+    def start_app(self):
+        port = free_port()
+        self.app_url = f'http://127.0.0.1:{port}'
+        self.workdir = tempfile.TemporaryDirectory(prefix='bench-load-')
+        env = dict(
+            os.environ,
+            LAW_API_BASE_URL=f'{self.mock_url}/DRF',
+            OPENAI_BASE_URL=f'{self.mock_url}/v1',
+            GEMINI_API_ENDPOINT=self.mock_url,
+            # 캐시, 요청 한도 상태, 로컬 색인도 실행마다 새로 만들어 이전 실행의 상태가 결과에 섞이지 않게 함
+            LAW_CACHE_PATH=os.path.join(self.workdir.name, 'law_cache.sqlite3'),
+            LAW_API_STATE_PATH=os.path.join(self.workdir.name, 'law_api_state.sqlite3'),
+            ORDINANCE_INDEX_PATH=os.path.join(self.workdir.name, 'ordinance_index.sqlite3'),
+            LAW_API_RATE=str(self.args.law_api_rate),
+            COMPARE_JOB_DIR=os.path.join(self.workdir.name, 'jobs'),
+            METRICS_LOG='0',
+            PYTHONUNBUFFERED='1'
+        )
+        if self.args.gunicorn_workers:
+            command = ['gunicorn', '-w', str(self.args.gunicorn_workers), '-k', 'gthread', '--threads', '8',
+                       '-b', f'127.0.0.1:{port}', 'app:app']
+        else:
+            command = [sys.executable, '-c',
+                       f'import app; app.app.run(host="127.0.0.1", port={port}, threaded=True)']
+        self.app = subprocess.Popen(command, cwd=ROOT, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wait_ready(f'{self.app_url}/metrics', self.app)
+
+    def stop_app(self):
+        self.app.terminate()
+        self.app.wait(timeout=30)
+        self.workdir.cleanup()
+
+    def stop(self):
+        if self.app is not None and self.app.poll() is None:
+            self.stop_app()
+        if self.mock is not None:
+            self.mock.terminate()
+            self.mock.wait(timeout=30)
+
+
+def scenario_request(name, args, base_url, session, query, document_id):
+    # 요청 하나를 보내고 응답 본문을 끝까지 읽음 (오류 응답이면 예외)
+    if name == 'search':
+        response = session.post(f'{base_url}/api/search', json={'query': query}, timeout=args.timeout)
+    elif name == 'search_stream':
+        response = session.post(f'{base_url}/api/search/stream', json={'query': query},
+                                timeout=args.timeout, stream=True)
+    elif name == 'save':
+        response = session.post(f'{base_url}/api/save', json={'query': query, 'format': args.save_format},
+                                timeout=args.timeout)
+    else:
+        response = session.post(f'{base_url}/api/compare', timeout=args.timeout, data={
+            'query': query, 'document_id': document_id, 'geminiApiKey': 'mock', 'openaiApiKey': 'mock'
+        })
+    size = sum(len(chunk) for chunk in response.iter_content(64 * 1024))
+    response.raise_for_status()
+    return size
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def run_scenario(name, args, servers):
+    servers.start_app()
+    try:
+        base_url = servers.app_url
+        document_id = None
+        if name == 'compare':
+            pdf = make_pdf([f'Article {i} The mayor may delegate parking management.' for i in range(1, 31)])
+            if args.pdf:
+                with open(args.pdf, 'rb') as f:
+                    pdf = f.read()
+            response = requests.post(f'{base_url}/api/upload', files={'pdf': ('bench.pdf', pdf, 'application/pdf')},
+                                     timeout=args.timeout)
+            response.raise_for_status()
+            document_id = response.json()['document_id']
+
+        queries = [f'{args.query} {i}' for i in range(args.distinct)]
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        counter = iter(range(args.requests))
+
+        def client():
+            session = requests.Session()
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    scenario_request(name, args, base_url, session, queries[index % len(queries)], document_id)
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        rss = peak_rss_kb(servers.app.pid)
+    finally:
+        servers.stop_app()
+
+    return {
+        'requests': args.requests,
+        'errors': len(errors),
+        'error_sample': errors[:3],
+        'p50_ms': percentile(latencies, 0.5) * 1000 if latencies else None,
+        'p95_ms': percentile(latencies, 0.95) * 1000 if latencies else None,
+        'max_ms': max(latencies) * 1000 if latencies else None,
+        'throughput_rps': len(latencies) / wall if wall else None,
+        'peak_rss_mb': rss / 1024,
+        'seconds': wall
+    }
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def change(current, previous):
+    if current is None or not previous:
+        return ''
+    return f'{(current - previous) / previous * 100:+.0f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='엔드포인트 부하 벤치마크')
+    parser.add_argument('--scenarios', default='search,save,compare', help=f'쉼표로 구분 ({", ".join(SCENARIOS)})')
+    parser.add_argument('--concurrency', type=int, default=8, help='동시 클라이언트 수')
+    parser.add_argument('--requests', type=int, default=40, help='시나리오당 요청 수')
+    parser.add_argument('--distinct', type=int, default=None, help='돌려 쓸 검색어 수 (기본값은 요청 수)')
+    parser.add_argument('--query', default='주차장')
+    parser.add_argument('--save-format', default='docx', help='save 시나리오의 저장 형식')
+    parser.add_argument('--pdf', help='compare 시나리오에 올릴 PDF (없으면 한 쪽짜리 PDF를 만들어 씀)')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--gunicorn-workers', type=int, default=0, help='0이면 Flask 개발 서버(스레드)로 실행')
+    parser.add_argument('--law-api-rate', type=float, default=0,
+                        help='앱의 law.go.kr 초당 요청 수 상한 (LAW_API_RATE, 기본값 0은 제한 없음)')
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--jitter-ms', type=float, default=100)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=3000)
+    parser.add_argument('--ordinances', type=int, default=5, help='기관별 합성 조례 수')
+    parser.add_argument('--articles', type=int, default=20, help='합성 조례의 조문 수')
+    parser.add_argument('--fixtures', default=os.path.join(BENCH, 'fixtures'))
+    parser.add_argument('--json', help='결과를 저장할 JSON 파일')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON 파일')
+    args = parser.parse_args()
+    args.distinct = args.distinct or args.requests
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'알 수 없는 시나리오: {", ".join(sorted(unknown))}')
+
+    servers = Servers(args)
+    results = {}
+    try:
+        servers.start_mock()
+        for name in names:
+            results[name] = run_scenario(name, args, servers)
+    finally:
+        servers.stop()
+
+    report = {
+        'revision': git_revision(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('json', 'baseline')},
+        'results': results
+    }
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            previous = json.load(f)
+        baseline = previous['results']
+        print(f"기준: {previous.get('revision')} ({previous.get('created_at')})")
+
+    print(f"커밋 {report['revision']}, 동시 {args.concurrency}, 요청 {args.requests}, 검색어 {args.distinct}개")
+    print(f"{'시나리오':<14}{'p50(ms)':>10}{'p95(ms)':>10}{'요청/초':>10}{'최대RSS(MB)':>13}{'오류':>6}")
+    for name, result in results.items():
+        print(f"{name:<14}{result['p50_ms'] or 0:>10.0f}{result['p95_ms'] or 0:>10.0f}"
+              f"{result['throughput_rps'] or 0:>10.2f}{result['peak_rss_mb']:>13.1f}{result['errors']:>6}")
+        previous = baseline.get(name)
+        if previous:
+            print(f"{'  변화':<14}{change(result['p50_ms'], previous['p50_ms']):>10}"
+                  f"{change(result['p95_ms'], previous['p95_ms']):>10}"
+                  f"{change(result['throughput_rps'], previous['throughput_rps']):>10}"
+                  f"{change(result['peak_rss_mb'], previous['peak_rss_mb']):>13}")
+        for sample in result['error_sample']:
+            print(f"  오류: {sample}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""
+law.go.kr(lawSearch.do, lawService.do)와 Gemini/OpenAI를 흉내 내는 로컬 서버 (벤치마크용)
+
+    python bench/mock_law_server.py [--port 8900] [--fixtures bench/fixtures] [--latency-ms 150 --jitter-ms 100]
+                                    [--error-rate 0.02] [--llm-latency-ms 3000] [--record-from http://www.law.go.kr/DRF]
+
+앱은 아래 환경 변수로 이 서버를 바라보게 함
+    LAW_API_BASE_URL=http://127.0.0.1:8900/DRF
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8900
+
+법령/조례 응답은 --fixtures 디렉터리에 녹화된 XML이 있으면 그대로 돌려주고, 없으면 기관 코드와 ID로 정해지는 합성 XML을 만듦
+(저장소에는 녹화본이 없어 기본값은 합성 응답이며, 녹화 방법과 합성 응답의 한계는 bench/README.md 참고)
+(같은 설정이면 언제나 같은 응답이므로 커밋 사이 결과를 비교할 수 있음)
+--record-from을 주면 녹화본이 없는 요청을 실제 서버로 보내고 응답을 fixtures에 저장함
+    lawSearch/{target}_{org}_{검색어 SHA-1 앞 12자리}_p{page}.xml
+    lawService/{target}_{ID}.xml
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from law_api import metropolitan_govs  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# 비교 분석 요청에 돌려줄 LLM 응답 (요약표, 차별점, 상위법령 후보가 들어 있어 문서 생성과 상위법령 검토까지 진행됨)
+LLM_RESPONSE = """1. [비교분석 요약표(조문별)]
+| 조문(내 조례) | 주요 내용 | 타 시도 유사 조항 | 동일 여부 | 차이 및 내 조례 특징 | 추천 조문 |
+|---|---|---|---|---|---|
+| 제1조(목적) | 조례의 목적 | 서울특별시 제1조 | 유사 | 목적 규정이 간결함 | 제1조(목적) 이 조례는 ... |
+| 제2조(정의) | 용어의 정의 | 부산광역시 제2조 | 상이 | 정의 대상이 다름 | 제2조(정의) 이 조례에서 ... |
+
+2. [내 조례의 차별점 요약]
+- 관리 위탁 규정이 구체적임
+
+3. [검토 시 유의사항]
+a) 소관사무의 원칙
+- 자치사무에 해당함
+b) 법률 유보의 원칙
+- 주민의 권리를 제한하는 내용은 없음
+c) 법령우위의 원칙 위반 여부
+- 「주차장법」 제12조와 충돌하지 않음
+
+4. [실무적 검토 포인트]
+- 위탁 기관 선정 기준을 정할 필요가 있음
+"""
+
+
+class Settings:
+
+    def __init__(self, args):
+        self.fixtures = args.fixtures
+        self.latency = args.latency_ms / 1000
+        self.jitter = args.jitter_ms / 1000
+        self.error_rate = args.error_rate
+        self.error_status = args.error_status
+        self.llm_latency = args.llm_latency_ms / 1000
+        self.ordinances = args.ordinances
+        self.articles = args.articles
+        self.record_from = args.record_from.rstrip('/') if args.record_from else None
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def delay(self, base):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0
+            failed = self.error_rate and self.random.random() < self.error_rate
+        time.sleep(max(0.0, base + jitter))
+        return failed
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+def _xml(body):
+    return f'<?xml version="1.0" encoding="UTF-8"?>{body}'.encode('utf-8')
+
+
+def _ordinance_id(org_code, index):
+    return f'{int(org_code) // 10000}{index:04d}'
+
+
+def synth_ordinance_search(params, settings):
+    org_code = params.get('org', '')
+    metro = metropolitan_govs.get(org_code, '서울특별시')
+    query = params.get('query', '')
+    page = int(params.get('page', 1) or 1)
+    display = int(params.get('display', 20) or 20)
+    ids = range((page - 1) * display, min(page * display, settings.ordinances))
+    laws = ''.join(
+        f'<law id="{i + 1}"><자치법규일련번호>{1000 + i}</자치법규일련번호>'
+        f'<자치법규명>{escape(f"{metro} {query} 조례 {i + 1}")}</자치법규명>'
+        f'<자치법규ID>{_ordinance_id(org_code, i)}</자치법규ID><공포일자>2024{(i % 12) + 1:02d}01</공포일자>'
+        f'<지자체기관명>{metro}</지자체기관명><자치법규종류>조례</자치법규종류></law>'
+        for i in ids
+    )
+    return _xml(f'<OrdinSearch><totalCnt>{settings.ordinances}</totalCnt><page>{page}</page>{laws}</OrdinSearch>')
+
+
+def _synth_annex(rng):
+    # 별표(요금표 등): 실제 응답처럼 조문보다 훨씬 긴 표 텍스트가 붙음 (앱은 읽지 않지만 응답 크기와 파싱 시간에 영향)
+    rows = '<br/>'.join(
+        f'{zone}급지&nbsp;&nbsp;{kind}&nbsp;&nbsp;최초 30분 {rng.randrange(5, 30) * 100}원, 이후 10분마다 '
+        f'{rng.randrange(2, 10) * 100}원 (1일 최대 {rng.randrange(10, 40) * 1000}원)'
+        for zone in range(1, 6) for kind in ('노상', '노외', '부설', '화물', '이륜')
+        for _ in range(rng.randrange(2, 6))
+    )
+    return (f'<별표><별표단위><별표번호>1</별표번호><별표제목><![CDATA[주차요금(제5조 관련)]]></별표제목>'
+            f'<별표내용><![CDATA[<p>[별표 1]</p><p>주차요금(제5조 관련)</p><p>{rows}</p>'
+            f'<p>※ 비고: &lt;장애인&gt; 및 국가유공자 차량은 50% 감면</p>]]></별표내용></별표단위></별표>')
+
+
+def synth_ordinance_detail(params, settings):
+    """
+    lawService.do?target=ordin 응답 흉내 (공개된 DRF 응답 구조를 따름: 조문 내용은 CDATA 안의 <p>/<br/> 표시와 엔티티,
+    조문마다 다른 길이, 부칙과 긴 별표 텍스트)
+    """
+    # ID마다 조문 순서와 문구가 조금씩 달라지도록 ID로 난수를 정함
+    ordinance_id = params.get('ID', '0')
+    rng = random.Random(ordinance_id)
+    clauses = ['시장은 주차장의 효율적인 관리를 위하여 필요한 경우 관리 업무를 위탁할 수 있다.',
+               '제1항에 따라 위탁받은 자는 매년 운영 실적을 시장에게 보고하여야 한다.',
+               '주차요금은 별표와 같으며 감면 대상은 규칙으로 정한다.',
+               '시장은 공영주차장의 설치 계획을 5년마다 수립하여야 한다.',
+               '「주차장법」 제12조에&nbsp;따른 노외주차장의 관리는 다음 각 호와 같다.']
+    items = ['1. 주차장의 유지ㆍ보수', '2. 요금의 징수 및 감면', '3. 그 밖에 시장이 필요하다고 인정하는 사항']
+    titles = ['목적', '정의', '적용 범위', '관리 위탁', '주차요금', '감면', '설치 계획', '보고']
+    articles = []
+    for j in range(1, settings.articles + 1):
+        title = titles[j % len(titles)]
+        paragraphs = ''.join(f'<p>{"①②③④⑤"[k]} {rng.choice(clauses)}</p>' for k in range(rng.randrange(1, 5)))
+        if rng.random() < 0.3:
+            paragraphs += '<p>' + '<br/>'.join(items) + '</p>'
+        articles.append(f'<조 조문번호="{j}"><조번호>{j}</조번호><조제목>{title}</조제목>'
+                        f'<조내용><![CDATA[<p>제{j}조({title})</p>{paragraphs}]]></조내용></조>')
+    addenda = (f'<부칙><부칙내용><![CDATA[<p>부칙 &lt;2024. {rng.randrange(1, 13)}. 1.&gt;</p>'
+               '<p>이 조례는 공포한 날부터 시행한다.</p>]]></부칙내용></부칙>')
+    return _xml(f'<LawService><자치법규기본정보><자치법규ID>{escape(ordinance_id)}</자치법규ID></자치법규기본정보>'
+                f'<조문>{"".join(articles)}</조문>{addenda}{_synth_annex(rng)}</LawService>')
+
+
+def synth_law_search(params, settings):
+    query = escape(params.get('query', ''))
+    return _xml('<LawSearch><totalCnt>1</totalCnt><law id="1"><법령ID>001234</법령ID>'
+                f'<법령명한글>{query}</법령명한글><법령일련번호>250000</법령일련번호><현행연혁코드>현행</현행연혁코드></law></LawSearch>')
+
+
+def synth_law_detail(params, settings):
+    units = ''.join(
+        f'<조문단위><조문번호>{i}</조문번호><조문내용><![CDATA[제{i}조(주차장의 관리) 주차장관리자는 주차장을 관리하여야 한다.]]></조문내용>'
+        f'<항><항내용><![CDATA[① 지방자치단체는 조례로 정하는 바에 따라 관리를 위탁할 수 있다.]]></항내용></항></조문단위>'
+        for i in range(1, settings.articles * 5 + 1)
+    )
+    return _xml(f'<법령><기본정보><법령ID>{escape(params.get("ID", ""))}</법령ID></기본정보><조문>{units}</조문></법령>')
+
+
+def fixture_path(settings, endpoint, params):
+    target = params.get('target', 'ordin')
+    if endpoint == 'lawSearch':
+        digest = hashlib.sha1(params.get('query', '').encode('utf-8')).hexdigest()[:12]
+        name = f"{target}_{params.get('org') or 'all'}_{digest}_p{params.get('page', 1)}.xml"
+    else:
+        name = f"{target}_{params.get('ID', '')}.xml"
+    return os.path.join(settings.fixtures, endpoint, name)
+
+
+def law_response(endpoint, params, raw_query, settings):
+    path = fixture_path(settings, endpoint, params)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    if settings.record_from:
+        with urllib.request.urlopen(f'{settings.record_from}/{endpoint}.do?{raw_query}', timeout=60) as response:
+            content = response.read()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return content
+    target = params.get('target', 'ordin')
+    synth = {
+        ('lawSearch', 'ordin'): synth_ordinance_search,
+        ('lawService', 'ordin'): synth_ordinance_detail,
+        ('lawSearch', 'law'): synth_law_search,
+        ('lawService', 'law'): synth_law_detail,
+    }[(endpoint, target)]
+    return synth(params, settings)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    settings = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail(self):
+        self._send(self.settings.error_status, b'injected error', 'text/plain')
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/stats':
+            self._send(200, json.dumps(self.settings.counts).encode(), 'application/json')
+            return
+        endpoint = url.path.rsplit('/', 1)[-1].split('.', 1)[0]
+        if endpoint not in ('lawSearch', 'lawService'):
+            self._send(404, b'not found', 'text/plain')
+            return
+        self.settings.count(endpoint)
+        if self.settings.delay(self.settings.latency):
+            self._fail()
+            return
+        params = dict(urllib.parse.parse_qsl(url.query))
+        self._send(200, law_response(endpoint, params, url.query, self.settings), 'application/xml; charset=UTF-8')
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if url.path.endswith('/chat/completions'):
+            provider = 'openai'
+        elif url.path.endswith(':generateContent'):
+            provider = 'gemini'
+        else:
+            self._send(404, b'not found', 'text/plain')
+            return
+        self.settings.count(provider)
+        if self.settings.delay(self.settings.llm_latency):
+            self._fail()
+            return
+        prompt_chars = len(json.dumps(request, ensure_ascii=False))
+        if provider == 'openai':
+            body = {
+                'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': request.get('model', 'gpt-4'),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': LLM_RESPONSE}}],
+                'usage': {'prompt_tokens': prompt_chars, 'completion_tokens': len(LLM_RESPONSE),
+                          'total_tokens': prompt_chars + len(LLM_RESPONSE)}
+            }
+        else:
+            body = {
+                'candidates': [{'index': 0, 'finishReason': 'STOP',
+                                'content': {'role': 'model', 'parts': [{'text': LLM_RESPONSE}]}}],
+                'usageMetadata': {'promptTokenCount': prompt_chars, 'candidatesTokenCount': len(LLM_RESPONSE),
+                                  'totalTokenCount': prompt_chars + len(LLM_RESPONSE)}
+            }
+        self._send(200, json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='law.go.kr / LLM 대역 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='녹화된 응답 XML 디렉터리')
+    parser.add_argument('--latency-ms', type=float, default=150, help='law.go.kr 응답 지연')
+    parser.add_argument('--jitter-ms', type=float, default=100, help='지연 시간의 ± 흔들림')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='오류로 응답할 비율 (0~1)')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--llm-latency-ms', type=float, default=3000, help='Gemini/OpenAI 응답 지연')
+    parser.add_argument('--ordinances', type=int, default=5, help='합성 검색 결과의 기관별 조례 수')
+    parser.add_argument('--articles', type=int, default=20, help='합성 조례의 조문 수')
+    parser.add_argument('--record-from', help='녹화본이 없을 때 요청을 보낼 실제 DRF 주소')
+    parser.add_argument('--seed', type=int, default=0, help='지연과 오류 주입 난수의 시드')
+    args = parser.parse_args()
+
+    Handler.settings = Settings(args)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"mock law.go.kr listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
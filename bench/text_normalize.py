@@ -0,0 +1,80 @@
+"""
+조문 텍스트 정리 벤치마크 (이전 방식: str.replace 연쇄와 노드마다 re.sub / 현재 방식: law_text.normalize_text)
+
+    python bench/text_normalize.py [--articles 3000] [--markup-ratio 0.1] [--repeat 5] [--detail-file 법령.xml ...]
+
+--detail-file에 저장해 둔 lawService.do 응답 XML을 여러 개 주면 그 조문/항/호 내용 전체를 말뭉치로 사용
+주지 않으면 합성 법령 본문을 쓰되, 태그와 엔티티가 들어 있는 조문의 비율을 --markup-ratio로 정함
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from law_text import normalize_text  # noqa: E402
+from law_xml import parse_texts  # noqa: E402
+from xml_parse import TEXT_TAGS, make_detail_xml  # noqa: E402
+
+
+_TAG = re.compile(r'<[^>]+>')
+
+
+def legacy_ordinance(content):
+    # 이전 get_ordinance_detail
+    content = content.replace('<![CDATA[', '').replace(']]>', '')
+    content = content.replace('<p>', '').replace('</p>', '\n')
+    content = content.replace('<br/>', '\n')
+    content = content.replace('<br>', '\n')
+    content = content.replace('&nbsp;', ' ')
+    return content.strip()
+
+
+def legacy_upper_law(text):
+    # 이전 상위법령 검토
+    content = re.sub(r'<[^>]+>', '', text)
+    return content.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>').strip()
+
+
+def run(func, corpus, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='조문 텍스트 정리 벤치마크')
+    parser.add_argument('--articles', type=int, default=3000, help='만들어 낼 법령 본문의 조 수')
+    parser.add_argument('--markup-ratio', type=float, default=0.1,
+                        help='합성 말뭉치에서 태그와 엔티티가 들어 있는 조문의 비율')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--detail-file', nargs='*', default=[], help='저장해 둔 lawService.do 응답 XML')
+    args = parser.parse_args()
+
+    documents = []
+    for path in args.detail_file:
+        with open(path, 'rb') as f:
+            documents.append(f.read())
+    corpus = [text for content in documents for _, text in parse_texts(content, TEXT_TAGS)]
+    if not documents:
+        marked_up = [text for _, text in parse_texts(make_detail_xml(args.articles), TEXT_TAGS)]
+        corpus = [text if i % 1000 < args.markup_ratio * 1000 else _TAG.sub('', text).replace('&nbsp;', ' ')
+                  for i, text in enumerate(marked_up)]
+    chars = sum(len(text) for text in corpus)
+
+    print(f"조문 {len(corpus)}개, {chars // 1024}K 글자")
+    for label, func in (('이전(조례 본문)', legacy_ordinance),
+                        ('이전(상위법령)', legacy_upper_law),
+                        ('normalize_text', normalize_text)):
+        seconds = run(func, corpus, args.repeat)
+        print(f"{label:<18}{seconds * 1000:>10.1f}ms{len(corpus) / seconds:>14.0f}개/초")
+
+
+if __name__ == '__main__':
+    main()
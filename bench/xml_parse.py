@@ -0,0 +1,126 @@
+"""
+law.go.kr 응답 XML 파싱 마이크로 벤치마크 (이전 방식: 전체 트리 파싱 + find 반복 / 현재 방식: law_xml 스트리밍 파싱)
+
+    python bench/xml_parse.py [--articles 3000] [--repeat 5]
+
+지방자치법 규모의 법령 본문과 100건짜리 조례 검색 목록을 만들어 요청 하나당 파싱 시간과 최대 메모리를 비교
+실제 응답으로 비교하려면 --search-file, --detail-file에 저장해 둔 XML 파일을 지정
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from law_xml import parse_records, parse_texts  # noqa: E402
+
+SEARCH_FIELDS = ('자치법규명', '자치법규ID', '지자체기관명', '자치법규일련번호', '공포일자')
+TEXT_TAGS = ('조문내용', '항내용', '호내용')
+
+
+def make_search_xml(count=100):
+    laws = ''.join(
+        f'<law id="{i}"><자치법규일련번호>{1000 + i}</자치법규일련번호><자치법규명>서울특별시 주차장 설치 및 관리 조례 {i}</자치법규명>'
+        f'<자치법규ID>{2000 + i}</자치법규ID><공포일자>20240101</공포일자><지자체기관명>서울특별시</지자체기관명>'
+        f'<자치법규종류>조례</자치법규종류><자치법규상세링크>/DRF/lawService.do?ID={2000 + i}</자치법규상세링크></law>'
+        for i in range(count)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><OrdinSearch><totalCnt>{count}</totalCnt>{laws}</OrdinSearch>'.encode()
+
+
+def make_detail_xml(articles=3000):
+    units = []
+    for i in range(1, articles + 1):
+        items = ''.join(
+            f'<항><항번호>{j}</항번호><항내용><![CDATA[{j} 지방자치단체의 장은 주민의 복리 증진을 위하여 '
+            f'필요한 사무를 처리한다.<br/>&nbsp;다만, 법령에 특별한 규정이 있는 경우에는 그러하지 아니하다.]]></항내용>'
+            f'<호><호번호>1</호번호><호내용><![CDATA[1. 주민의 안전과 관련된 사무 <p>제{i}조 참조</p>]]></호내용></호></항>'
+            for j in range(1, 4)
+        )
+        units.append(f'<조문단위 조문키="{i:04d}001"><조문번호>{i}</조문번호><조문여부>조문</조문여부>'
+                     f'<조문내용><![CDATA[제{i}조(목적) 이 법은 지방자치단체의 종류와 조직 및 운영에 관한 사항을 정한다.]]></조문내용>'
+                     f'{items}</조문단위>')
+    return ('<?xml version="1.0" encoding="UTF-8"?><법령><기본정보><법령명_한글>지방자치법</법령명_한글></기본정보>'
+            f'<조문>{"".join(units)}</조문></법령>').encode()
+
+
+def legacy_search(content):
+    # 이전 search_region: 응답을 문자열로 바꾼 뒤 전체 트리를 만들고 항목마다 find를 두 번 호출
+    root = ET.fromstring(content.decode('utf-8'))
+    laws = []
+    for law in root.findall('.//law'):
+        laws.append({tag: law.find(tag).text if law.find(tag) is not None else None for tag in SEARCH_FIELDS})
+    total_node = root.find('totalCnt')
+    return laws, total_node.text if total_node is not None else None
+
+
+def legacy_detail(content):
+    # 이전 상위법령 검토: 전체 트리를 만든 뒤 detail_root.iter()로 모든 요소를 훑음
+    root = ET.fromstring(content)
+    texts = []
+    for node in root.iter():
+        if node.tag in TEXT_TAGS and node.text and node.text.strip():
+            texts.append((node.tag, node.text))
+    return texts
+
+
+def streaming_search(content):
+    return parse_records(content, 'law', SEARCH_FIELDS, scalars=('totalCnt',))
+
+
+def streaming_detail(content):
+    return parse_texts(content, TEXT_TAGS)
+
+
+def measure(func, content, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='law.go.kr XML 파싱 벤치마크')
+    parser.add_argument('--articles', type=int, default=3000, help='만들어 낼 법령 본문의 조 수')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--search-file', help='저장해 둔 lawSearch.do 응답 XML')
+    parser.add_argument('--detail-file', help='저장해 둔 lawService.do 법령 본문 XML')
+    args = parser.parse_args()
+
+    if args.search_file:
+        with open(args.search_file, 'rb') as f:
+            search_xml = f.read()
+    else:
+        search_xml = make_search_xml()
+    if args.detail_file:
+        with open(args.detail_file, 'rb') as f:
+            detail_xml = f.read()
+    else:
+        detail_xml = make_detail_xml(args.articles)
+
+    # 두 방식의 결과가 같은지 먼저 확인
+    assert legacy_detail(detail_xml) == streaming_detail(detail_xml)
+    assert legacy_search(search_xml)[0] == streaming_search(search_xml)[0]
+
+    cases = [
+        ('lawSearch', search_xml, legacy_search, streaming_search),
+        ('lawService', detail_xml, legacy_detail, streaming_detail),
+    ]
+    print(f"{'응답':<12}{'크기':>10}{'방식':>12}{'시간(ms)':>12}{'최대 메모리(KB)':>18}")
+    for name, content, legacy, streaming in cases:
+        for label, func in (('이전', legacy), ('스트리밍', streaming)):
+            seconds, peak = measure(func, content, args.repeat)
+            print(f"{name:<12}{len(content) // 1024:>8}KB{label:>12}{seconds * 1000:>12.1f}{peak // 1024:>18}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# 비교 분석 작업 설정 (상태와 결과 파일은 디스크에 두어 어느 gunicorn 워커에서든 조회 가능)
+COMPARE_JOB_DIR = os.environ.get('COMPARE_JOB_DIR', os.path.join(tempfile.gettempdir(), 'compare_jobs'))
+COMPARE_MAX_WORKERS = int(os.environ.get('COMPARE_MAX_WORKERS', '2'))
+COMPARE_JOB_TTL = float(os.environ.get('COMPARE_JOB_TTL', str(24 * 3600)))
+
+RESULT_FILENAME = 'result.docx'
+
+# 진행 단계와 화면에 보여줄 설명
+JOB_STATES = {
+    'queued': '대기 중',
+    'crawling': '타 시도 조례 수집 중',
+    'extracting': 'PDF 텍스트 추출 중',
+    'analyzing': 'AI 비교 분석 중',
+    'upper_law_review': '상위법령 검토 중',
+    'rendering': 'Word 문서 생성 중',
+    'done': '완료',
+    'failed': '실패'
+}
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    # gunicorn 워커가 fork된 뒤에 스레드가 만들어지도록 처음 사용할 때 생성
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=COMPARE_MAX_WORKERS,
+                                           thread_name_prefix='compare-job')
+        return _executor
+
+
+def _valid_job_id(job_id):
+    try:
+        return uuid.UUID(job_id).hex == job_id
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+def job_path(job_id, filename):
+    return os.path.join(COMPARE_JOB_DIR, job_id, filename)
+
+
+def _write_status(job_id, **fields):
+    path = job_path(job_id, 'status.json')
+    with _lock:
+        status = _read_status_file(path) or {'id': job_id, 'created_at': time.time()}
+        status.update(fields)
+        status['updated_at'] = time.time()
+        status['message'] = JOB_STATES.get(status.get('state'), '')
+        # 다른 워커가 반쯤 쓰인 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(status, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    return status
+
+
+def _read_status_file(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def get_status(job_id):
+    if not _valid_job_id(job_id):
+        return None
+    return _read_status_file(job_path(job_id, 'status.json'))
+
+
+def result_path(job_id):
+    status = get_status(job_id)
+    if not status or status.get('state') != 'done':
+        return None
+    path = job_path(job_id, RESULT_FILENAME)
+    return path if os.path.exists(path) else None
+
+
+def cleanup_jobs():
+    # 보관 기간이 지난 작업 디렉터리 삭제
+    if not os.path.isdir(COMPARE_JOB_DIR):
+        return
+    now = time.time()
+    for name in os.listdir(COMPARE_JOB_DIR):
+        path = os.path.join(COMPARE_JOB_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > COMPARE_JOB_TTL:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def create_job(**fields):
+    """
+    새 작업 디렉터리를 만들고 작업 ID를 반환 (fields는 검색어, 문서 ID 등 상태와 함께 기록할 값)
+    """
+    cleanup_jobs()
+    job_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(COMPARE_JOB_DIR, job_id))
+    _write_status(job_id, state='queued', error=None, **fields)
+    return job_id
+
+
+def start_job(job_id, work):
+    """
+    work(report, result_path)를 작업 스레드 풀에서 실행
+    work는 단계가 바뀔 때 report(state)를 호출하고 결과 문서를 result_path에 저장해야 함
+    """
+    def report(state):
+        metrics.log('job_state', job_id=job_id, state=state, description=JOB_STATES.get(state, state))
+        _write_status(job_id, state=state)
+
+    def run():
+        try:
+            work(report, job_path(job_id, RESULT_FILENAME))
+            _write_status(job_id, state='done')
+        except Exception as e:
+            metrics.log('compare_job_error', job_id=job_id, error=str(e))
+            _write_status(job_id, state='failed', error=str(e))
+
+    _get_executor().submit(metrics.bind(run))
@@ -0,0 +1,128 @@
+import io
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.enum.section import WD_ORIENT
+from docx.shared import Emu, Mm
+
+# 조례 검색 결과 Word 문서(A3 가로, 3열 비교표)를 python-docx 객체 없이 본문 XML을 직접 만들어 쓰는 렌더러
+# 스타일, 글꼴 등 나머지 파트는 python-docx 기본 서식으로 한 번 만들어 둔 빈 문서를 그대로 복사함
+
+DOCUMENT_PART = 'word/document.xml'
+COLUMNS = 3
+
+_lock = threading.Lock()
+_template = None
+_invalid_xml_chars = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Template:
+
+    def __init__(self, members, head, tail, column_width):
+        self.members = members  # [(ZipInfo, bytes 또는 None(본문 자리))]
+        self.head = head  # <w:body>까지
+        self.tail = tail  # <w:sectPr>부터 끝까지
+        self.column_width = column_width  # 표 한 칸의 너비 (twip)
+
+
+def set_landscape_a3(section):
+    section.orientation = WD_ORIENT.LANDSCAPE
+    section.page_width = Mm(420)
+    section.page_height = Mm(297)
+
+
+def _get_template():
+    # 워커마다 처음 한 번만 빈 A3 가로 문서를 만들어 파트별로 나눠 둠
+    global _template
+    with _lock:
+        if _template is None:
+            doc = Document()
+            section = doc.sections[-1]
+            set_landscape_a3(section)
+            block_width = section.page_width - section.left_margin - section.right_margin
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            members = []
+            with zipfile.ZipFile(buffer) as package:
+                for info in package.infolist():
+                    if info.filename == DOCUMENT_PART:
+                        document_xml = package.read(info).decode('utf-8')
+                        members.append((info, None))
+                    else:
+                        members.append((info, package.read(info)))
+            body_start = document_xml.index('<w:body>') + len('<w:body>')
+            body_end = document_xml.index('<w:sectPr')
+            _template = _Template(members, document_xml[:body_start].encode('utf-8'),
+                                  document_xml[body_end:].encode('utf-8'), Emu(block_width // COLUMNS).twips)
+        return _template
+
+
+def _run_content(text):
+    # python-docx add_run과 같이 줄바꿈은 <w:br/>, 탭은 <w:tab/>으로 바꿈
+    text = _invalid_xml_chars.sub('', text.replace('\r\n', '\n').replace('\r', '\n'))
+    parts = []
+    for i, line in enumerate(text.split('\n')):
+        if i:
+            parts.append('<w:br/>')
+        for j, chunk in enumerate(line.split('\t')):
+            if j:
+                parts.append('<w:tab/>')
+            if chunk:
+                parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+    return ''.join(parts)
+
+
+def _paragraph(text, style=None):
+    style_xml = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    return f'<w:p>{style_xml}<w:r>{_run_content(text)}</w:r></w:p>'
+
+
+def _ordinance_cell(ordinance, width):
+    content = ''
+    if ordinance is not None:
+        # 지역과 조례명은 굵은 빨간 글씨, 이어서 조문 내용
+        title = _run_content(f'{ordinance.metro}\n{ordinance.name}\n')
+        content = (f'<w:r><w:rPr><w:b/><w:color w:val="FF0000"/></w:rPr>{title}</w:r>'
+                   f'<w:r>{_run_content(ordinance.text)}</w:r>')
+    return f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr><w:p>{content}</w:p></w:tc>'
+
+
+def _ordinance_table(ordinances, width):
+    cells = list(ordinances) + [None] * (COLUMNS - len(ordinances))
+    grid = f'<w:gridCol w:w="{width}"/>' * COLUMNS
+    return ('<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/>'
+            '<w:tblLayout w:type="autofit"/>'
+            '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+            'w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+            f'<w:tblGrid>{grid}</w:tblGrid>'
+            f'<w:tr>{"".join(_ordinance_cell(o, width) for o in cells)}</w:tr></w:tbl>')
+
+
+def write_search_results(out, query, ordinances, total_count):
+    """
+    /api/save의 검색 결과 문서를 out(쓰기 가능한 파일 객체)에 .docx로 씀
+    조례 3개마다 표 하나와 페이지 나누기를 넣으며, 본문 XML은 표 단위로 만들어 바로 압축해 씀
+    """
+    template = _get_template()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as package:
+        for info, data in template.members:
+            if data is not None:
+                package.writestr(info, data)
+                continue
+            body_info = zipfile.ZipInfo(DOCUMENT_PART, date_time=info.date_time)
+            body_info.compress_type = zipfile.ZIP_DEFLATED
+            with package.open(body_info, 'w') as body:
+                body.write(template.head)
+                body.write((_paragraph('조례 검색 결과', style='Heading1')
+                            + _paragraph(f'검색어: {query}')
+                            + _paragraph(f'총 {total_count}건의 조례가 검색되었습니다.\n')).encode('utf-8'))
+                for i in range(0, len(ordinances), COLUMNS):
+                    chunk = _ordinance_table(ordinances[i:i + COLUMNS], template.column_width)
+                    # 마지막 표가 아니면 페이지 나누기 추가
+                    if i + COLUMNS < len(ordinances):
+                        chunk += '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+                    body.write(chunk.encode('utf-8'))
+                body.write(template.tail)
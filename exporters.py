@@ -0,0 +1,175 @@
+import io
+import re
+import csv
+import json
+import zipfile
+from dataclasses import asdict
+from html import escape as escape_html
+from xml.sax.saxutils import escape as escape_xml
+
+# 검색 결과 내보내기 (python-docx 없이 수집 결과를 한 번 훑으면서 바로 써 내려감)
+# 각 함수는 CollectionResult를 받아 응답 본문 조각을 차례로 내보내는 제너레이터이며, xlsx만 zip이라 파일 객체에 씀
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_COLUMNS = ('metro', 'name', 'id', 'article_no', 'article')
+# Excel 셀 하나에 들어가는 최대 글자 수
+XLSX_MAX_CELL_CHARS = 32767
+
+_invalid_xml_chars = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="ko">
+<head>
+<meta charset="utf-8">
+<title>조례 검색 결과 - {query}</title>
+<style>
+body {{ font-family: 'Malgun Gothic', sans-serif; margin: 24px; }}
+.grid {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 0; border-top: 1px solid #000; border-left: 1px solid #000; }}
+.ordinance {{ border-right: 1px solid #000; border-bottom: 1px solid #000; padding: 8px; }}
+.ordinance h2 {{ color: #f00; font-size: 1em; margin: 0 0 8px; }}
+.ordinance p {{ white-space: pre-wrap; margin: 0 0 6px; }}
+</style>
+</head>
+<body>
+<h1>조례 검색 결과</h1>
+<p>검색어: {query}</p>
+<p>총 {total}건의 조례가 검색되었습니다.</p>
+<div class="grid">
+"""
+_HTML_TAIL = """</div>
+</body>
+</html>
+"""
+
+
+def _ordinance_record(ordinance):
+    return {
+        'id': ordinance.id,
+        'name': ordinance.name,
+        'metro': ordinance.metro,
+        'content': ordinance.text,
+        'articles': ordinance.articles
+    }
+
+
+def iter_html(collected):
+    # /api/save Word 문서와 같이 조례를 3열로 나란히 놓은 HTML 페이지
+    yield _HTML_HEAD.format(query=escape_html(collected.query), total=collected.total)
+    for ordinance in collected.ordinances:
+        articles = (''.join(f'<p>{escape_html(article)}</p>' for article in ordinance.articles)
+                    or f'<p>{escape_html(ordinance.text)}</p>')
+        yield (f'<section class="ordinance"><h2>{escape_html(ordinance.metro)}<br>{escape_html(ordinance.name)}</h2>'
+               f'{articles}</section>\n')
+    yield _HTML_TAIL
+
+
+def _iter_article_rows(collected):
+    # 조문 하나당 한 행 (조문이 없는 조례도 빈 조문으로 한 행을 남김)
+    for ordinance in collected.ordinances:
+        articles = ordinance.articles or ['']
+        for number, article in enumerate(articles, 1):
+            yield ordinance.metro, ordinance.name, ordinance.id or '', number if ordinance.articles else '', article
+
+
+def iter_csv(collected):
+    # Excel에서 한글이 깨지지 않도록 BOM을 붙인 UTF-8
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield '\ufeff' + buffer.getvalue()
+    for row in _iter_article_rows(collected):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def iter_json(collected):
+    # {'query', 'total', 'regions', 'results'}를 조례 단위로 나눠 내보냄
+    header = json.dumps({'query': collected.query, 'total': collected.total,
+                         'regions': [asdict(region) for region in collected.regions]}, ensure_ascii=False)
+    yield header[:-1] + ', "results": ['
+    for index, ordinance in enumerate(collected.ordinances):
+        yield (', ' if index else '') + json.dumps(_ordinance_record(ordinance), ensure_ascii=False)
+    yield ']}\n'
+
+
+def iter_ndjson(collected):
+    # 조례 하나당 한 줄
+    for ordinance in collected.ordinances:
+        yield json.dumps(_ordinance_record(ordinance), ensure_ascii=False) + '\n'
+
+
+STREAM_FORMATS = {
+    # 형식(파일 확장자): (MIME 형식, 제너레이터), text/* 형식에는 Flask가 charset=utf-8을 붙임
+    'html': ('text/html', iter_html),
+    'csv': ('text/csv', iter_csv),
+    'json': ('application/json', iter_json),
+    'ndjson': ('application/x-ndjson', iter_ndjson),
+}
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="조례" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, int):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            text = escape_xml(_invalid_xml_chars.sub('', str(value))[:XLSX_MAX_CELL_CHARS])
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+
+def write_xlsx(out, collected):
+    """
+    조문 하나당 한 행인 .xlsx를 out(쓰기 가능한 파일 객체)에 씀 (공유 문자열 없이 셀에 바로 문자열을 넣어 한 번에 씀)
+    """
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as package:
+        for name, content in _XLSX_PARTS.items():
+            package.writestr(name, content)
+        sheet_info = zipfile.ZipInfo('xl/worksheets/sheet1.xml')
+        sheet_info.compress_type = zipfile.ZIP_DEFLATED
+        with package.open(sheet_info, 'w') as sheet:
+            sheet.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetData>' + _xlsx_row(CSV_COLUMNS)).encode('utf-8'))
+            for row in _iter_article_rows(collected):
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+            sheet.write(b'</sheetData></worksheet>')
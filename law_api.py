@@ -0,0 +1,253 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+import upstream
+from law_cache import law_cache
+from law_text import normalize_text
+from law_xml import ParseError, child_texts, iter_elements, parse_records, parse_texts
+
+# API 설정
+OC = "climsneys85"  # 이메일 ID
+# 벤치마크에서는 bench/mock_law_server.py 주소로 바꿔 씀
+LAW_API_BASE_URL = os.environ.get('LAW_API_BASE_URL', 'http://www.law.go.kr/DRF').rstrip('/')
+search_url = f"{LAW_API_BASE_URL}/lawSearch.do"
+detail_url = f"{LAW_API_BASE_URL}/lawService.do"
+
+# 광역지자체 코드 및 이름
+metropolitan_govs = {
+    '6110000': '서울특별시',
+    '6260000': '부산광역시',
+    '6270000': '대구광역시',
+    '6280000': '인천광역시',
+    '6290000': '광주광역시',
+    '6300000': '대전광역시',
+    '5690000': '세종특별자치시',
+    '6310000': '울산광역시',
+    '6410000': '경기도',
+    '6530000': '강원특별자치도',
+    '6430000': '충청북도',
+    '6440000': '충청남도',
+    '6540000': '전북특별자치도',
+    '6460000': '전라남도',
+    '6470000': '경상북도',
+    '6480000': '경상남도',
+    '6500000': '제주특별자치도'
+}
+
+# 개별 요청 제한 시간(초, 읽기 제한 시간의 상한이며 연결/읽기 제한 시간은 upstream.py 설정) 및 재시도 설정
+REQUEST_TIMEOUT = 60
+SEARCH_PAGE_SIZE = 100  # lawSearch.do display 최대값
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '16'))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '3'))
+HTTP_BACKOFF = float(os.environ.get('HTTP_BACKOFF', '0.5'))
+
+# OC 키 하나의 law.go.kr 초당 요청 수 상한 (모든 워커 합계, 0이면 제한 없음)
+LAW_API_RATE = float(os.environ.get('LAW_API_RATE', '20'))
+
+# 상위법령 검색 결과는 개정 여부 판단에 쓰이므로 본문보다 짧게 캐시
+LAW_SEARCH_CACHE_TTL = float(os.environ.get('LAW_SEARCH_CACHE_TTL', str(24 * 3600)))
+
+# 응답에서 읽어 오는 항목
+_ORDINANCE_SEARCH_FIELDS = ('자치법규명', '자치법규ID', '지자체기관명', '자치법규일련번호', '공포일자')
+_LAW_SEARCH_FIELDS = ('법령ID', '법령명한글', '법령일련번호', '현행연혁코드')
+LAW_TEXT_TAGS = ('조문내용', '항내용', '호내용')
+
+_lock = threading.Lock()
+_session = None
+
+
+def get_session():
+    # keep-alive 연결을 재사용하는 공용 세션 (HTTP_POOL_SIZE는 동시 요청 수 이상으로 설정)
+    global _session
+    with _lock:
+        if _session is None:
+            # 읽기 제한 시간 초과는 재시도하지 않음 (느린 응답은 upstream의 헤지 요청이 대신함)
+            retry = Retry(
+                total=HTTP_RETRIES,
+                read=0,
+                backoff_factor=HTTP_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET'])
+            )
+            adapter = HTTPAdapter(
+                pool_connections=2,
+                pool_maxsize=HTTP_POOL_SIZE,
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def set_request_rate(rate):
+    # 초당 요청 수 상한 변경 (0 이하이면 제한 없음)
+    global LAW_API_RATE
+    LAW_API_RATE = rate
+
+
+def _get(url, params, timeout):
+    # law.go.kr 요청 (OC 키별 요청 한도, 서킷 브레이커, 헤지 요청과 지연 시간 기록은 upstream에서 처리)
+    return upstream.get(get_session(), url, params, timeout, LAW_API_RATE)
+
+
+def describe_error(e):
+    # 화면에 보낼 오류 설명 (requests 오류 메시지에는 OC 키가 들어간 요청 주소가 있으므로 그대로 쓰지 않음,
+    # 전체 오류는 서버 로그에만 남김)
+    if isinstance(e, upstream.CircuitOpenError):
+        return "API 요청 오류: law.go.kr 요청이 연속으로 실패해 잠시 중단됨"
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return f"API 요청 오류: HTTP {e.response.status_code}"
+    if isinstance(e, requests.exceptions.RetryError):
+        return "API 요청 오류: 재시도 후에도 서버 오류 응답"
+    if isinstance(e, requests.Timeout):
+        return "API 요청 오류: 응답 시간 초과"
+    if isinstance(e, requests.RequestException):
+        return f"API 요청 오류: {type(e).__name__}"
+    if isinstance(e, ParseError):
+        return "XML 파싱 오류"
+    if isinstance(e, TimeoutError):
+        return str(e)
+    return f"예상치 못한 오류: {type(e).__name__}"
+
+
+def _cached_fetch(url, params, target, key, parse, revision=None, ttl=None, timeout=REQUEST_TIMEOUT):
+    # 캐시에 있으면 저장된 XML을, 없으면 law.go.kr 응답 바이트를 parse로 읽어 결과를 반환 (읽기에 성공한 응답만 저장)
+    # law.go.kr 요청이 실패하거나 브레이커가 열려 있으면 만료된(개정 전) 캐시라도 있으면 그 값을 사용
+    content = law_cache.get(target, key, revision=revision, ttl=ttl)
+    if content is not None:
+        return parse(content)
+    try:
+        response = _get(url, params, timeout)
+    except requests.RequestException as e:
+        content = law_cache.get_stale(target, key)
+        if content is None:
+            raise
+        metrics.LAW_API_STALE.inc(target=target)
+        metrics.log('law_api_stale', target=target, key=key, error=str(e))
+        return parse(content)
+    result = parse(response.content)
+    law_cache.set(target, key, response.content, revision=revision)
+    return result
+
+
+def _revision(law, *tags):
+    # 검색 목록에서 개정 여부를 판단할 값 (일련번호가 없으면 공포일자 사용)
+    for tag in tags:
+        value = law.get(tag)
+        if value:
+            return value.strip()
+    return None
+
+
+def search_region(org_code, metro_name, query, page=1, timeout=REQUEST_TIMEOUT):
+    """
+    한 광역지자체(본청)의 조례를 제목으로 검색해 (검색어와 일치하는 조례 목록, 전체 검색 건수)를 반환
+    전체 검색 건수(totalCnt)는 본청 필터링 전 값으로, 나머지 페이지 수를 계산하는 데 사용
+    """
+    params = {
+        'OC': OC,
+        'target': 'ordin',
+        'type': 'XML',
+        'query': query,
+        'display': SEARCH_PAGE_SIZE,
+        'search': 1,  # 제목만 검색
+        'sort': 'ddes',
+        'page': page,
+        'org': org_code
+    }
+    response = _get(search_url, params, timeout)  # HTTP 오류 체크
+
+    records, scalars = parse_records(response.content, 'law', _ORDINANCE_SEARCH_FIELDS, scalars=('totalCnt',))
+    search_terms = [term.lower() for term in query.split() if term.strip()]
+    laws = []
+    for law in records:
+        ordinance_name = law['자치법규명'] or ""
+        ordinance_id = law['자치법규ID']
+        기관명 = law['지자체기관명'] or ""
+
+        if 기관명 != metro_name:
+            continue  # 본청이 아니면 건너뜀
+
+        # 검색어 매칭 로직
+        ordinance_name_clean = ordinance_name.replace(' ', '').lower()
+        if not all(term in ordinance_name_clean for term in search_terms):
+            continue
+
+        laws.append({
+            'name': ordinance_name,
+            'id': ordinance_id,
+            'revision': _revision(law, '자치법규일련번호', '공포일자'),
+            'date': law['공포일자']
+        })
+    try:
+        total_count = int(scalars['totalCnt'] or 0)
+    except ValueError:
+        total_count = 0
+    return laws, total_count
+
+
+def _parse_ordinance_articles(xml_content):
+    articles = []
+    for article in iter_elements(xml_content, {'조'}):
+        content = normalize_text(child_texts(article, ('조내용',))['조내용'])
+        if content:
+            articles.append(content)
+    return articles
+
+
+def fetch_ordinance_detail(ordinance_id, revision=None, timeout=REQUEST_TIMEOUT):
+    # 조례 본문의 조문 목록 (요청이나 XML 읽기에 실패하면 예외)
+    params = {
+        'OC': OC,
+        'target': 'ordin',
+        'ID': ordinance_id,
+        'type': 'XML'
+    }
+    return _cached_fetch(detail_url, params, 'ordin', ordinance_id, _parse_ordinance_articles,
+                         revision=revision, timeout=timeout)
+
+
+def get_ordinance_detail(ordinance_id, revision=None):
+    # fetch_ordinance_detail과 같으나 실패하면 빈 목록을 반환
+    try:
+        return fetch_ordinance_detail(ordinance_id, revision)
+    except Exception:
+        return []
+
+
+def search_laws(query):
+    """
+    법령명으로 법령(target=law)을 검색해 검색 결과 목록을 반환
+    목록의 각 항목은 {'법령ID', '법령명한글', '법령일련번호', '현행연혁코드'} (없는 값은 None)
+    """
+    params = {
+        'OC': OC,
+        'target': 'law',
+        'type': 'XML',
+        'query': query
+    }
+    return _cached_fetch(search_url, params, 'law-search', query,
+                         lambda content: parse_records(content, 'law', _LAW_SEARCH_FIELDS)[0],
+                         ttl=LAW_SEARCH_CACHE_TTL)
+
+
+def get_law_detail(law_id, revision=None):
+    """
+    법령ID로 법령 본문의 조문내용/항내용/호내용을 문서 순서대로 (태그, 텍스트) 목록으로 반환
+    (revision은 검색 결과의 법령일련번호 또는 공포일자)
+    """
+    params = {
+        'OC': OC,
+        'target': 'law',
+        'type': 'XML',
+        'ID': law_id
+    }
+    return _cached_fetch(detail_url, params, 'law', law_id,
+                         lambda content: parse_texts(content, LAW_TEXT_TAGS), revision=revision)
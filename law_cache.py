@@ -0,0 +1,171 @@
+import os
+import time
+import zlib
+import sqlite3
+import tempfile
+import threading
+from collections import Counter
+
+import metrics
+
+# 법령/조례 원문 캐시 설정 (gunicorn 워커들이 같은 SQLite 파일을 공유)
+LAW_CACHE_PATH = os.environ.get('LAW_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'law_cache.sqlite3'))
+LAW_CACHE_TTL = float(os.environ.get('LAW_CACHE_TTL', str(7 * 24 * 3600)))
+LAW_CACHE_MAX_BYTES = int(os.environ.get('LAW_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    target TEXT NOT NULL,
+    key TEXT NOT NULL,
+    revision TEXT,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (target, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+"""
+
+
+class LawCache:
+    """
+    target(ordin, law 등)과 ID로 원문을 압축 저장하는 SQLite 캐시
+    TTL이 지났거나 검색 목록의 개정 정보(revision)가 달라진 항목은 미스로 처리하고 (law.go.kr 장애 때 get_stale로 쓸 수 있도록
+    새 응답으로 덮어쓸 때까지 남겨 둠),
+    전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 지움
+    """
+
+    def __init__(self, path=LAW_CACHE_PATH, ttl=LAW_CACHE_TTL, max_bytes=LAW_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = Counter()
+
+    def _connect(self):
+        # 스레드(및 fork된 프로세스)마다 별도 연결을 사용
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, target, event):
+        with self._stats_lock:
+            self._stats[(target, event)] += 1
+
+    def get(self, target, key, revision=None, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT value, revision, stored_at FROM entries WHERE target = ? AND key = ?',
+                (target, str(key))
+            ).fetchone()
+            if row is None:
+                self._count(target, 'miss')
+                return None
+            value, stored_revision, stored_at = row
+            if revision and stored_revision != revision:
+                # 검색 목록에 더 새로운 개정(공포) 정보가 있으면 무효화
+                self._count(target, 'invalidated')
+                self._count(target, 'miss')
+                return None
+            if time.time() - stored_at > ttl:
+                self._count(target, 'expired')
+                self._count(target, 'miss')
+                return None
+            conn.execute(
+                'UPDATE entries SET accessed_at = ? WHERE target = ? AND key = ?',
+                (time.time(), target, str(key))
+            )
+            self._count(target, 'hit')
+            return zlib.decompress(value)
+        except sqlite3.Error as e:
+            metrics.log('cache_error', operation='get', target=target, key=str(key), error=str(e))
+            self._count(target, 'error')
+            return None
+
+    def get_stale(self, target, key):
+        # TTL과 개정 정보를 따지지 않고 저장된 값을 반환 (law.go.kr 요청이 실패했을 때 대신 사용)
+        try:
+            row = self._connect().execute(
+                'SELECT value FROM entries WHERE target = ? AND key = ?', (target, str(key))
+            ).fetchone()
+        except sqlite3.Error as e:
+            metrics.log('cache_error', operation='get_stale', target=target, key=str(key), error=str(e))
+            self._count(target, 'error')
+            return None
+        if row is None:
+            return None
+        self._count(target, 'stale')
+        return zlib.decompress(row[0])
+
+    def set(self, target, key, value, revision=None):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        blob = zlib.compress(value)
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (target, key, revision, value, size, stored_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (target, str(key), revision, blob, len(blob), now, now)
+            )
+            self._count(target, 'store')
+            self._evict(conn)
+        except sqlite3.Error as e:
+            metrics.log('cache_error', operation='set', target=target, key=str(key), error=str(e))
+            self._count(target, 'error')
+
+    def invalidate(self, target, key):
+        try:
+            self._connect().execute('DELETE FROM entries WHERE target = ? AND key = ?', (target, str(key)))
+        except sqlite3.Error as e:
+            metrics.log('cache_error', operation='invalidate', target=target, key=str(key), error=str(e))
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 오래 사용하지 않은 순서대로 최대 크기의 90%까지 줄임
+        excess = total - int(self.max_bytes * 0.9)
+        victims = []
+        for target, key, size in conn.execute(
+                'SELECT target, key, size FROM entries ORDER BY accessed_at ASC'):
+            if excess <= 0:
+                break
+            victims.append((target, key))
+            excess -= size
+        conn.executemany('DELETE FROM entries WHERE target = ? AND key = ?', victims)
+        for target, _ in victims:
+            self._count(target, 'evicted')
+
+    def stats(self):
+        with self._stats_lock:
+            counters = {}
+            for (target, event), count in self._stats.items():
+                counters.setdefault(target, {})[event] = count
+        try:
+            entries, total = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        except sqlite3.Error:
+            entries, total = None, None
+        return {
+            'pid': os.getpid(),
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'counters': counters
+        }
+
+
+law_cache = LawCache()
@@ -0,0 +1,46 @@
+import re
+import html
+
+# 조문 텍스트 정리 (law.go.kr 응답의 조문/항/호 내용과 검색용 비교 문자열에 공통으로 사용)
+
+# 응답에 자주 나오는 표시는 str.replace로 먼저 바꾸고(줄바꿈 태그는 줄바꿈으로), 남은 태그만 정규식으로 지움
+# (정규식 콜백으로 한 번에 바꾸는 방식은 CPython에서 replace 연쇄보다 몇 배 느려 bench/text_normalize.py로 비교해 정함)
+_KNOWN_MARKUP = (
+    ('<![CDATA[', ''),
+    (']]>', ''),
+    ('<p>', ''),
+    ('</p>', '\n'),
+    ('<br/>', '\n'),
+    ('<br>', '\n'),
+)
+_LINE_BREAK = re.compile(r'</p\s*>|<br\s*/?>', re.IGNORECASE)
+# 태그는 영문 이름만 인정해 "제2조<정의>"처럼 꺾쇠를 쓴 본문은 지우지 않음
+_TAG = re.compile(r'</?[A-Za-z][^<>]*>')
+_non_word = re.compile(r'[^0-9A-Za-z가-힣]+')
+
+
+def normalize_text(text):
+    """
+    조문 텍스트에서 CDATA 표시와 HTML 태그를 지우고(</p>, <br>은 줄바꿈) 엔티티를 바꾼 뒤 앞뒤 공백을 없앰
+    """
+    if not text:
+        return ''
+    # 대부분의 조문에는 태그나 엔티티가 없으므로 확인만 하고 넘어감
+    if '<' in text or ']]>' in text:
+        for old, new in _KNOWN_MARKUP:
+            if old in text:
+                text = text.replace(old, new)
+        if '<' in text:
+            text = _TAG.sub('', _LINE_BREAK.sub('\n', text))
+    if '&' in text:
+        text = text.replace('&nbsp;', ' ')
+        if '&' in text:
+            text = html.unescape(text)
+    if '\xa0' in text:
+        text = text.replace('\xa0', ' ')
+    return text.strip()
+
+
+def compact(text):
+    # 띄어쓰기와 문장부호를 없애고 소문자로 바꾼 비교용 문자열
+    return _non_word.sub('', text or '').lower()
@@ -0,0 +1,60 @@
+import io
+import xml.etree.ElementTree as ET
+
+# law.go.kr 응답 XML 스트리밍 파서
+# lxml도 설치되어 있지만(python-docx 의존성) 요소마다 파이썬 프록시 객체를 만드는 비용 때문에
+# 표준 라이브러리(C 가속 expat)보다 느려서 bench/xml_parse.py로 비교한 뒤 표준 라이브러리를 사용
+ParseError = ET.ParseError
+
+
+def _iterparse(content):
+    return ET.iterparse(io.BytesIO(content), events=('end',))
+
+
+def iter_elements(content, tags, leaves=False):
+    """
+    content(응답 바이트)를 앞에서부터 읽으며 tags에 해당하는 요소가 닫힐 때마다 내보내고, 처리한 요소는 비워서 메모리를 돌려줌
+    leaves=True이면 대상이 하위 요소가 없는 요소라는 뜻으로, 대상이 아닌 요소도 닫히는 즉시 비움
+    (내보낸 요소는 다음 요소를 받기 전까지만 사용할 수 있음)
+    """
+    for _, elem in _iterparse(content):
+        if elem.tag in tags:
+            yield elem
+        elif not leaves:
+            continue  # 대상 요소 안의 하위 요소는 대상 요소를 처리할 때까지 유지
+        elem.clear()
+
+
+def child_texts(elem, names):
+    # 하위 요소를 한 번만 훑어 names의 첫 번째 값을 모음 (없는 항목은 None)
+    values = dict.fromkeys(names)
+    for child in elem:
+        if child.tag in values and values[child.tag] is None:
+            values[child.tag] = child.text
+    return values
+
+
+def parse_records(content, record_tag, fields, scalars=()):
+    """
+    record_tag 요소마다 fields 값을 dict로 뽑은 목록과, 레코드 밖에 있는 scalars 요소의 값을 dict로 반환
+    예) parse_records(content, 'law', ('자치법규ID', '자치법규명'), scalars=('totalCnt',))
+    """
+    records = []
+    values = dict.fromkeys(scalars)
+    for elem in iter_elements(content, {record_tag, *scalars}):
+        if elem.tag == record_tag:
+            records.append(child_texts(elem, fields))
+        elif values[elem.tag] is None:
+            values[elem.tag] = elem.text
+    return records, values
+
+
+def parse_texts(content, tags):
+    """
+    tags에 해당하는 요소의 (태그, 텍스트)를 문서 순서대로 반환 (텍스트가 비어 있는 요소는 제외)
+    """
+    texts = []
+    for elem in iter_elements(content, set(tags), leaves=True):
+        if elem.text and elem.text.strip():
+            texts.append((elem.tag, elem.text))
+    return texts
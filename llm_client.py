@@ -0,0 +1,186 @@
+import os
+import time
+import hashlib
+import functools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import google.ai.generativelanguage as glm
+import google.generativeai as genai
+import openai
+
+import metrics
+from law_cache import law_cache
+from prompt_budget import estimate_tokens
+
+# LLM 호출 설정 (제공자별 제한 시간(초)과 동시 호출 수)
+GEMINI_MODEL = 'gemini-1.5-flash'
+OPENAI_MODEL = 'gpt-4'
+GEMINI_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', '120'))
+OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', '120'))
+LLM_MAX_WORKERS = int(os.environ.get('LLM_MAX_WORKERS', '8'))
+# 한 워커에서 동시에 보내는 Gemini 요청 수 상한 (상위법령 검토가 한꺼번에 몰리는 것을 막음)
+GEMINI_MAX_CONCURRENT = int(os.environ.get('GEMINI_MAX_CONCURRENT', '3'))
+OPENAI_TEMPERATURE = 0.7
+OPENAI_MAX_TOKENS = 4000
+# 응답 캐시 설정 (제공자, 모델, temperature, 프롬프트의 SHA-256이 같으면 저장해 둔 응답을 그대로 사용)
+# law_cache의 'llm' 항목으로 저장되어 워커끼리 공유하고, 캐시 크기 상한을 넘으면 오래 쓰지 않은 것부터 지워짐
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', '1') != '0'
+LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', str(30 * 24 * 3600)))
+
+# 대체 API 주소 (비워 두면 SDK 기본값, 벤치마크에서는 bench/mock_law_server.py 주소)
+GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT', '')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') or None
+
+OPENAI_SYSTEM_PROMPT = "당신은 법률 전문가입니다. 조례 분석과 검토를 도와주세요."
+
+_lock = threading.Lock()
+_executor = None
+_gemini_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENT)
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def _get_executor():
+    # gunicorn 워커가 fork된 뒤에 스레드가 만들어지도록 처음 사용할 때 생성
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix='llm')
+        return _executor
+
+
+def _count(provider, event, amount=1):
+    with _stats_lock:
+        _stats[(provider, event)] += amount
+
+
+def cache_key(provider, model, temperature, *prompt_parts):
+    # 프롬프트(시스템 프롬프트가 있으면 함께)의 SHA-256에 제공자, 모델, temperature를 붙인 캐시 키
+    digest = hashlib.sha256('\0'.join(prompt_parts).encode('utf-8')).hexdigest()
+    return f'{provider}:{model}:{temperature}:{digest}'
+
+
+def _record_tokens(provider, model, prompt_tokens, completion_tokens):
+    metrics.LLM_TOKENS.inc(prompt_tokens or 0, provider=provider, model=model, kind='prompt')
+    metrics.LLM_TOKENS.inc(completion_tokens or 0, provider=provider, model=model, kind='completion')
+
+
+def _call(provider, model, generate):
+    # 실제 API 호출 (호출 시간을 llm_request_duration_seconds와 단계 로그로 남김)
+    with metrics.span('llm', provider=provider, model=model), \
+            metrics.timed(metrics.LLM_SECONDS, provider=provider, model=model):
+        return generate()
+
+
+def _cached_generate(provider, model, key, generate, use_cache):
+    # use_cache가 False이면 저장된 응답을 읽지 않고 새로 요청하되, 받은 응답으로 캐시를 갱신함
+    if not LLM_CACHE_ENABLED:
+        return _call(provider, model, generate)
+    if use_cache:
+        cached = law_cache.get('llm', key, ttl=LLM_CACHE_TTL)
+        if cached is not None:
+            _count(provider, 'hit')
+            return cached.decode('utf-8')
+        _count(provider, 'miss')
+    else:
+        _count(provider, 'bypass')
+    started = time.monotonic()
+    text = _call(provider, model, generate)
+    _count(provider, 'seconds', time.monotonic() - started)
+    # 빈 응답은 저장하지 않음 (다음 요청에서 다시 시도)
+    if text:
+        law_cache.set('llm', key, text)
+    return text
+
+
+def _gemini_client(api_key, timeout):
+    # 호출마다 api_key로 만든 클라이언트 (genai.configure는 프로세스 공용 기본 클라이언트를 바꾸므로
+    # 동시에 실행되는 다른 사용자의 요청이 이 키로 보내질 수 있음)
+    # 제한 시간이 지나면 요청을 끊어 _gemini_slots 자리를 돌려받음 (SDK 0.3.0의 generate_content에는 timeout 인자가 없음)
+    client_options = {'api_key': api_key}
+    if GEMINI_API_ENDPOINT:
+        client_options['api_endpoint'] = GEMINI_API_ENDPOINT
+    client = glm.GenerativeServiceClient(client_options=client_options,
+                                         transport='rest' if GEMINI_API_ENDPOINT else None)
+    client.generate_content = functools.partial(client.generate_content, timeout=timeout)
+    return client
+
+
+def generate_gemini(api_key, prompt, timeout=GEMINI_TIMEOUT, use_cache=True):
+    """
+    Gemini로 프롬프트를 보내 응답 텍스트를 반환 (응답이 비어 있으면 None)
+    같은 프롬프트의 응답이 캐시에 있으면 요청하지 않고 반환 (use_cache=False이면 캐시를 읽지 않음)
+    """
+    def generate():
+        with _gemini_slots:
+            model = genai.GenerativeModel(GEMINI_MODEL)
+            model._client = _gemini_client(api_key, timeout)
+            response = model.generate_content(prompt)
+        text = response.text if response and hasattr(response, 'text') and response.text else None
+        # 응답에 사용량 정보가 없는 SDK 버전에서는 글자 수로 추정
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            _record_tokens('gemini', GEMINI_MODEL, usage.prompt_token_count, usage.candidates_token_count)
+        else:
+            _record_tokens('gemini', GEMINI_MODEL, estimate_tokens(prompt), estimate_tokens(text))
+        return text
+
+    key = cache_key('gemini', GEMINI_MODEL, 'default', prompt)
+    return _cached_generate('gemini', GEMINI_MODEL, key, generate, use_cache)
+
+
+def generate_openai(api_key, prompt, timeout=OPENAI_TIMEOUT, use_cache=True):
+    """
+    OpenAI로 프롬프트를 보내 응답 텍스트를 반환 (응답이 비어 있으면 None)
+    같은 프롬프트의 응답이 캐시에 있으면 요청하지 않고 반환 (use_cache=False이면 캐시를 읽지 않음)
+    """
+    def generate():
+        client = openai.OpenAI(api_key=api_key, timeout=timeout, base_url=OPENAI_BASE_URL)
+        response = client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": OPENAI_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=OPENAI_TEMPERATURE,
+            max_tokens=OPENAI_MAX_TOKENS
+        )
+        if response.usage is not None:
+            _record_tokens('openai', OPENAI_MODEL, response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+    key = cache_key('openai', OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_SYSTEM_PROMPT, prompt)
+    return _cached_generate('openai', OPENAI_MODEL, key, generate, use_cache)
+
+
+def stats():
+    # 이 워커의 제공자별 응답 캐시 적중/미스/우회 횟수와 실제 API 호출에 쓴 시간(초)
+    with _stats_lock:
+        result = {}
+        for (provider, event), count in _stats.items():
+            result.setdefault(provider, {})[event] = count
+    return result
+
+
+def run_concurrently(calls):
+    """
+    calls의 (이름, 함수, 제한 시간) 목록을 동시에 실행하고 같은 순서로 (이름, 결과, 오류) 목록을 반환
+    제한 시간이 지난 호출은 기다리지 않고 취소하며(이미 시작된 호출은 결과를 버림) 오류로 표시
+    """
+    executor = _get_executor()
+    started_at = time.monotonic()
+    futures = [(name, executor.submit(metrics.bind(func)), timeout) for name, func, timeout in calls]
+
+    outcomes = []
+    for name, future, timeout in futures:
+        remaining = max(0, started_at + timeout - time.monotonic())
+        try:
+            outcomes.append((name, future.result(timeout=remaining), None))
+        except Exception as e:
+            if not future.done():
+                future.cancel()
+                e = TimeoutError(f'{name} API 응답 시간({timeout:.0f}초) 초과')
+            outcomes.append((name, None, e))
+    return outcomes
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# 단계별 처리 시간, law.go.kr/LLM 호출 지연 시간과 토큰 수를 워커 프로세스마다 모아 Prometheus 텍스트 형식으로 내보냄
+# 로그는 한 줄에 JSON 하나이며 request_id로 같은 요청(및 그 요청이 스레드 풀에 넘긴 작업)의 로그를 묶음
+
+METRICS_LOG = os.environ.get('METRICS_LOG', '1') != '0'  # 단계별 구조화 로그 출력 여부
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+
+    kind = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labels, key)} {value}' for key, value in values]
+
+
+class Histogram:
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}  # 레이블 값 -> [구간별 개수, 합계, 개수]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {count}')
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'HTTP 요청 처리 시간(초)',
+                                 ('method', 'route', 'status'))
+STAGE_SECONDS = Histogram('stage_duration_seconds', '처리 단계별 소요 시간(초)', ('stage', 'status'))
+UPSTREAM_SECONDS = Histogram('law_api_request_duration_seconds', 'law.go.kr 요청 시간(초, 캐시 적중 제외)',
+                             ('endpoint', 'org', 'status'))
+LAW_API_HEDGES = Counter('law_api_hedged_requests_total', 'p95보다 늦어 한 번 더 보낸 law.go.kr 요청 수 (먼저 응답한 쪽별)',
+                         ('endpoint', 'winner'))
+LAW_API_CIRCUIT_OPENED = Counter('law_api_circuit_opened_total', 'law.go.kr 서킷 브레이커가 열린 횟수', ('endpoint',))
+LAW_API_STALE = Counter('law_api_stale_responses_total', 'law.go.kr 요청 실패로 만료된 캐시를 대신 쓴 횟수', ('target',))
+LLM_SECONDS = Histogram('llm_request_duration_seconds', 'LLM API 호출 시간(초, 캐시 적중 제외)',
+                        ('provider', 'model', 'status'))
+LLM_TOKENS = Counter('llm_tokens_total', 'LLM 토큰 수 (Gemini는 응답에 사용량이 없으면 추정치)',
+                     ('provider', 'model', 'kind'))
+
+
+def request_id():
+    return _request_id.get()
+
+
+def start_request(value=None):
+    """
+    현재 요청(또는 작업)의 request_id를 정함 (주어진 값이 없으면 새로 만듦)
+    """
+    value = (value or '').strip()[:64] or uuid.uuid4().hex[:16]
+    _request_id.set(value)
+    return value
+
+
+def bind(func):
+    # 스레드 풀에 넘길 함수가 지금의 request_id를 이어받도록 현재 컨텍스트에서 실행되게 감쌈
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return run
+
+
+def log(event, **fields):
+    """
+    구조화 로그 한 줄 (JSON)
+    """
+    if not METRICS_LOG:
+        return
+    record = {
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'event': event,
+        'request_id': _request_id.get(),
+        'pid': os.getpid()
+    }
+    record.update(fields)
+    print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+
+
+@contextmanager
+def timed(histogram, **labels):
+    # 블록 실행 시간을 histogram에 기록 (예외가 나면 status="error")
+    started = time.monotonic()
+    status = 'ok'
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        histogram.observe(time.monotonic() - started, status=status, **labels)
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    처리 단계 하나의 시간을 stage_duration_seconds에 기록하고 구조화 로그로 남김
+    블록 안에서 yield된 dict에 값을 넣으면 로그에 함께 기록됨
+    """
+    started = time.monotonic()
+    status = 'ok'
+    extra = {}
+    try:
+        yield extra
+    except BaseException as e:
+        status = 'error'
+        extra['error'] = str(e)
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        STAGE_SECONDS.observe(seconds, stage=stage, status=status)
+        log('span', stage=stage, status=status, seconds=round(seconds, 4), **{**fields, **extra})
+
+
+def render():
+    """
+    이 워커의 모든 지표를 Prometheus 텍스트 형식으로 반환
+    """
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.description}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
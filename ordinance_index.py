@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+
+import metrics
+from law_api import SEARCH_PAGE_SIZE, metropolitan_govs, search_region, fetch_ordinance_detail, describe_error
+from law_text import compact
+
+# 광역지자체 조례 로컬 색인 (SQLite FTS5, 글자 2-gram으로 색인해 띄어쓰기와 관계없이 부분 일치 검색)
+ORDINANCE_INDEX_PATH = os.environ.get('ORDINANCE_INDEX_PATH',
+                                      os.path.join(tempfile.gettempdir(), 'ordinance_index.sqlite3'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ordinances (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    org_code TEXT NOT NULL,
+    metro TEXT NOT NULL,
+    name TEXT NOT NULL,
+    revision TEXT,
+    promulgated TEXT,
+    articles TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ordinances_org_code ON ordinances (org_code);
+CREATE VIRTUAL TABLE IF NOT EXISTS ordinance_fts USING fts5(name, body, tokenize='unicode61');
+CREATE TABLE IF NOT EXISTS regions (
+    org_code TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+def bigrams(text):
+    """
+    색인용 글자 2-gram 토큰열 ("주차장" -> "주차 차장")
+    """
+    text = compact(text)
+    if len(text) < 2:
+        return text
+    return ' '.join(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def _terms(query):
+    return [compact(term) for term in query.split() if compact(term)]
+
+
+def searchable(query):
+    """
+    색인으로 찾을 수 있는 검색어인지 (2-gram 색인이므로 두 글자 이상인 검색어가 하나는 있어야 함)
+    """
+    return any(len(term) >= 2 for term in _terms(query))
+
+
+def _match_expression(terms, column):
+    # 검색어마다 2-gram 구(phrase)로 바꿔 모두 포함하는 행을 찾음
+    phrases = [f'{column} : "{bigrams(term)}"' for term in terms]
+    return ' AND '.join(phrases)
+
+
+class OrdinanceIndex:
+
+    def __init__(self, path=ORDINANCE_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        # 스레드(및 fork된 프로세스)마다 별도 연결을 사용
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def synced_regions(self):
+        rows = self._connect().execute('SELECT org_code, count, synced_at FROM regions').fetchall()
+        return {org_code: {'count': count, 'synced_at': synced_at} for org_code, count, synced_at in rows}
+
+    def is_ready(self):
+        # 17개 광역지자체가 모두 한 번 이상 동기화되어야 로컬 색인으로 검색
+        return set(metropolitan_govs) <= set(self.synced_regions())
+
+    def revisions(self, org_code):
+        rows = self._connect().execute(
+            'SELECT id, revision FROM ordinances WHERE org_code = ?', (org_code,)).fetchall()
+        return dict(rows)
+
+    def upsert(self, record):
+        """
+        record: {'id', 'org_code', 'metro', 'name', 'revision', 'date', 'articles'}
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT rowid FROM ordinances WHERE id = ?', (record['id'],)).fetchone()
+            if row is not None:
+                conn.execute('DELETE FROM ordinance_fts WHERE rowid = ?', row)
+                conn.execute('DELETE FROM ordinances WHERE rowid = ?', row)
+            cursor = conn.execute(
+                'INSERT INTO ordinances (id, org_code, metro, name, revision, promulgated, articles, synced_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (record['id'], record['org_code'], record['metro'], record['name'], record.get('revision'),
+                 record.get('date'), json.dumps(record['articles'], ensure_ascii=False), time.time())
+            )
+            conn.execute(
+                'INSERT INTO ordinance_fts (rowid, name, body) VALUES (?, ?, ?)',
+                (cursor.lastrowid, bigrams(record['name']), bigrams('\n'.join(record['articles'])))
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def remove(self, ordinance_ids):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for ordinance_id in ordinance_ids:
+                row = conn.execute('SELECT rowid FROM ordinances WHERE id = ?', (ordinance_id,)).fetchone()
+                if row is not None:
+                    conn.execute('DELETE FROM ordinance_fts WHERE rowid = ?', row)
+                    conn.execute('DELETE FROM ordinances WHERE rowid = ?', row)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def mark_region_synced(self, org_code):
+        conn = self._connect()
+        count = conn.execute('SELECT COUNT(*) FROM ordinances WHERE org_code = ?', (org_code,)).fetchone()[0]
+        conn.execute('INSERT OR REPLACE INTO regions (org_code, count, synced_at) VALUES (?, ?, ?)',
+                     (org_code, count, time.time()))
+
+    def search(self, query, scope='title'):
+        """
+        제목(scope='title') 또는 제목과 본문(scope='body')에 검색어가 모두 들어 있는 조례를
+        metropolitan_govs 순서, 최근 공포일 순서로 반환
+        두 글자 이상인 검색어가 없으면(searchable이 False) 빈 목록을 반환
+        """
+        terms = _terms(query)
+        # 한 글자 검색어는 2-gram 색인으로 찾을 수 없으므로 두 글자 이상인 검색어로 후보를 좁힌 뒤 아래에서 함께 확인
+        indexed_terms = [term for term in terms if len(term) >= 2]
+        if not indexed_terms:
+            return []
+        rows = self._connect().execute(
+            'SELECT o.id, o.org_code, o.metro, o.name, o.promulgated, o.articles '
+            'FROM ordinances o JOIN ordinance_fts ON ordinance_fts.rowid = o.rowid WHERE ordinance_fts MATCH ?',
+            (_match_expression(indexed_terms, '{name body}' if scope == 'body' else 'name'),)
+        ).fetchall()
+
+        order = {org_code: index for index, org_code in enumerate(metropolitan_govs)}
+        results = []
+        for ordinance_id, org_code, metro, name, promulgated, articles_json in rows:
+            articles = json.loads(articles_json)
+            name_clean = compact(name)
+            body_clean = compact('\n'.join(articles)) if scope == 'body' else ''
+            if not all(term in name_clean or term in body_clean for term in terms):
+                continue
+            results.append({
+                'id': ordinance_id,
+                'org_code': org_code,
+                'metro': metro,
+                'name': name,
+                'date': promulgated,
+                'articles': articles
+            })
+        # 최근 공포일 순으로 정렬한 뒤 지역 순서로 다시 정렬 (정렬이 안정적이므로 지역 안에서는 공포일 순서 유지)
+        results.sort(key=lambda r: r['date'] or '', reverse=True)
+        results.sort(key=lambda r: order.get(r['org_code'], len(order)))
+        return results
+
+
+def refresh_region(index, org_code, timeout=None):
+    """
+    한 광역지자체 본청의 전체 조례 목록을 받아 새로 생기거나 개정된 조례만 본문을 가져와 색인하고,
+    목록에서 사라진 조례는 색인에서 지움. (추가/갱신, 삭제, 유지) 건수를 반환
+    """
+    metro_name = metropolitan_govs[org_code]
+    kwargs = {} if timeout is None else {'timeout': timeout}
+    listed = {}
+    page = 1
+    while True:
+        laws, total_count = search_region(org_code, metro_name, '', page=page, **kwargs)
+        for law in laws:
+            if law['id']:
+                listed[law['id']] = law
+        if page * SEARCH_PAGE_SIZE >= total_count:
+            break
+        page += 1
+
+    known = index.revisions(org_code)
+    changed = [law for ordinance_id, law in listed.items() if known.get(ordinance_id) != law['revision']]
+    for law in changed:
+        revision = law['revision']
+        try:
+            articles = fetch_ordinance_detail(law['id'], revision, **kwargs)
+        except Exception as e:
+            metrics.log('index_detail_error', org_code=org_code, id=law['id'], error=describe_error(e))
+            # 본문을 받지 못했으면 색인에 있던 본문은 그대로 두고, 처음 보는 조례는 제목만 넣음
+            # (어느 쪽이든 개정 정보가 목록과 달라 다음 동기화 때 다시 받음)
+            if law['id'] in known:
+                continue
+            articles, revision = [], None
+        index.upsert({
+            'id': law['id'],
+            'org_code': org_code,
+            'metro': metro_name,
+            'name': law['name'],
+            'revision': revision,
+            'date': law.get('date'),
+            'articles': articles
+        })
+    removed = [ordinance_id for ordinance_id in known if ordinance_id not in listed]
+    index.remove(removed)
+    index.mark_region_synced(org_code)
+    return len(changed), len(removed), len(listed) - len(changed)
+
+
+ordinance_index = OrdinanceIndex()
@@ -0,0 +1,446 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass, field, asdict, replace
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Optional
+
+import metrics
+from law_api import (
+    REQUEST_TIMEOUT, SEARCH_PAGE_SIZE, metropolitan_govs, search_region, fetch_ordinance_detail, describe_error
+)
+from law_cache import law_cache
+from ordinance_index import ordinance_index, searchable
+
+# 광역지자체 검색 동시 실행 수 및 요청 전체 제한 시간(초)
+SEARCH_MAX_WORKERS = int(os.environ.get('SEARCH_MAX_WORKERS', '8'))
+SEARCH_DEADLINE = float(os.environ.get('SEARCH_DEADLINE', '90'))
+# 지역별로 가져올 최대 검색 페이지 수 (페이지당 100건)
+SEARCH_MAX_PAGES = int(os.environ.get('SEARCH_MAX_PAGES', '20'))
+
+# 조례 본문 동시 요청 수
+DETAIL_MAX_WORKERS = int(os.environ.get('DETAIL_MAX_WORKERS', '8'))
+
+# 같은 검색어의 수집 결과를 재사용하는 시간(초)
+QUERY_CACHE_TTL = float(os.environ.get('QUERY_CACHE_TTL', '600'))
+# 스트리밍 검색에서 캐시용으로 모아 두는 조문 글자 수 상한 (넘으면 캐시하지 않고 흘려보내기만 함)
+STREAM_CACHE_MAX_CHARS = int(os.environ.get('STREAM_CACHE_MAX_CHARS', str(20 * 1000 * 1000)))
+
+# 검색 출처: auto(로컬 색인이 모두 동기화되어 있으면 색인, 아니면 law.go.kr), index(항상 색인), live(항상 law.go.kr)
+SEARCH_SOURCE = os.environ.get('SEARCH_SOURCE', 'auto')
+SEARCH_SCOPES = ('title', 'body')
+
+
+@dataclass
+class Ordinance:
+    id: Optional[str]
+    name: str
+    metro: str
+    articles: List[str] = field(default_factory=list)
+    error: Optional[str] = None  # 본문을 가져오지 못한 경우
+
+    @property
+    def text(self):
+        if self.articles:
+            return '\n'.join(self.articles)
+        return '(조문을 가져오지 못했습니다)' if self.error else '(조문 없음)'
+
+
+@dataclass
+class RegionStatus:
+    org_code: str
+    metro: str
+    count: int = 0
+    error: Optional[str] = None
+    failed_details: int = 0  # 본문을 가져오지 못한 조례 수
+    stale: bool = False  # law.go.kr 요청이 실패해 만료된 예전 수집 결과를 대신 사용한 경우
+
+
+@dataclass
+class CollectionResult:
+    query: str
+    ordinances: List[Ordinance] = field(default_factory=list)
+    regions: List[RegionStatus] = field(default_factory=list)
+
+    @property
+    def total(self):
+        return len(self.ordinances)
+
+    @property
+    def complete(self):
+        # 검색이나 본문 수집에 실패했거나 예전 결과를 쓴 지역이 하나라도 있으면 False (캐시하지 않음)
+        return not any(region.error or region.failed_details or region.stale for region in self.regions)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            query=data['query'],
+            ordinances=[Ordinance(**item) for item in data['ordinances']],
+            regions=[RegionStatus(**item) for item in data['regions']]
+        )
+
+
+_lock = threading.Lock()
+_search_executor = None
+_detail_executor = None
+_inflight = {}
+
+
+def _get_executors():
+    # gunicorn 워커가 fork된 뒤에 스레드가 만들어지도록 처음 사용할 때 생성
+    global _search_executor, _detail_executor
+    with _lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS,
+                                                  thread_name_prefix='law-search')
+            _detail_executor = ThreadPoolExecutor(max_workers=DETAIL_MAX_WORKERS,
+                                                  thread_name_prefix='law-detail')
+        return _search_executor, _detail_executor
+
+
+def normalize_query(query):
+    return ' '.join(query.split())
+
+
+def _assemble_region(org_code, region_pages):
+    # 페이지 순서대로 조례 목록을 합치고 실패하거나 시간 안에 끝나지 않은 페이지는 오류로 표시
+    status = RegionStatus(org_code=org_code, metro=metropolitan_govs[org_code])
+    laws = []
+    seen = set()
+    for page in sorted(region_pages):
+        future = region_pages[page]
+        if not future.done():
+            future.cancel()
+            metrics.log('region_search_error', metro=status.metro, page=page, error='검색 제한 시간 초과')
+            status.error = status.error or '검색 제한 시간 초과'
+            continue
+        try:
+            page_laws, _ = future.result()
+        except Exception as e:
+            metrics.log('region_search_error', metro=status.metro, page=page, error=str(e))
+            status.error = status.error or describe_error(e)
+            continue
+        # 페이지 사이에 목록이 밀려 같은 조례가 두 번 나오면 한 번만 사용
+        for law in page_laws:
+            if law['id'] and law['id'] in seen:
+                continue
+            seen.add(law['id'])
+            laws.append(law)
+    status.count = len(laws)
+    return status, laws
+
+
+def _ordinance(law, status, future):
+    # 본문 요청 결과로 Ordinance를 만들고, 실패했거나 제한 시간 안에 받지 못했으면 조례와 지역 상태에 기록
+    ordinance = Ordinance(id=law['id'], name=law['name'], metro=status.metro)
+    if not law['id']:
+        return ordinance
+    if future is None or not future.done():
+        if future is not None:
+            future.cancel()
+        ordinance.error = '본문 수집 제한 시간 초과'
+        status.error = status.error or '검색 제한 시간 초과'
+        status.failed_details += 1
+        return ordinance
+    try:
+        ordinance.articles = future.result()
+    except Exception as e:
+        metrics.log('ordinance_detail_error', metro=status.metro, id=law['id'], name=law['name'], error=str(e))
+        ordinance.error = describe_error(e)
+        status.failed_details += 1
+    return ordinance
+
+
+def _iter_regions(query, deadline):
+    """
+    17개 광역지자체를 동시에 검색하고 본문까지 모두 받은 지역부터 (지역 순번, 지역 상태, 조례 목록)을 내보냄
+    첫 페이지의 전체 건수를 보고 나머지 페이지를 같은 스레드 풀에서 동시에 요청하며,
+    페이지가 도착하는 대로 중복 없이 본문을 요청해 검색과 본문 수집이 겹쳐서 진행됨
+    제한 시간은 검색과 본문 수집 모두에 적용되며, 그때까지 끝나지 않은 지역은 시간 초과로 표시하고 받은 결과만 내보냄
+    """
+    search_executor, detail_executor = _get_executors()
+    deadline_at = time.monotonic() + deadline
+    order = list(metropolitan_govs)
+
+    def run(org_code, page):
+        # 대기열에서 기다린 시간만큼 개별 요청의 제한 시간을 줄임
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('검색 제한 시간 초과')
+        return search_region(org_code, metropolitan_govs[org_code], query, page=page,
+                             timeout=min(REQUEST_TIMEOUT, remaining))
+
+    def fetch(ordinance_id, revision):
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('본문 수집 제한 시간 초과')
+        return fetch_ordinance_detail(ordinance_id, revision, timeout=min(REQUEST_TIMEOUT, remaining))
+
+    pages = {org_code: {} for org_code in order}  # org_code -> {page: future}
+    page_owner = {}  # future -> (org_code, page)
+    detail_futures = {}  # 자치법규ID -> future
+    pending = set()
+
+    def submit_page(org_code, page):
+        future = search_executor.submit(metrics.bind(run), org_code, page)
+        pages[org_code][page] = future
+        page_owner[future] = (org_code, page)
+        pending.add(future)
+
+    def submit_details(laws):
+        # 검색 목록의 개정 정보로 캐시된 본문의 무효화 여부를 판단 (제한 시간이 지난 뒤에는 새로 요청하지 않음)
+        if timed_out:
+            return
+        for law in laws:
+            if law['id'] and law['id'] not in detail_futures:
+                future = detail_executor.submit(metrics.bind(fetch), law['id'], law.get('revision'))
+                detail_futures[law['id']] = future
+                pending.add(future)
+
+    for org_code in order:
+        submit_page(org_code, 1)
+
+    assembled = {}
+    timed_out = False
+    while order:
+        # 검색과 본문 수집이 모두 끝난 지역을 내보냄
+        for org_code in list(order):
+            if org_code not in assembled:
+                if not timed_out and any(f in pending for f in pages[org_code].values()):
+                    continue
+                assembled[org_code] = _assemble_region(org_code, pages[org_code])
+                submit_details(assembled[org_code][1])
+            status, laws = assembled[org_code]
+            if not timed_out and any(not detail_futures[law['id']].done() for law in laws if law['id']):
+                continue
+            order.remove(org_code)
+            ordinances = [_ordinance(law, status, detail_futures.get(law['id'])) for law in laws]
+            yield list(metropolitan_govs).index(org_code), status, ordinances
+        if not order:
+            break
+
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            continue
+        if not pending:
+            continue
+        done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            if future not in page_owner:
+                continue
+            org_code, page = page_owner[future]
+            try:
+                laws, total_count = future.result()
+            except Exception:
+                continue  # 오류는 _assemble_region에서 지역 상태로 정리
+            submit_details(laws)
+            if page != 1:
+                continue
+            last_page = math.ceil(total_count / SEARCH_PAGE_SIZE)
+            if last_page > SEARCH_MAX_PAGES:
+                # 검색 결과가 너무 많으면 SEARCH_MAX_PAGES페이지까지만 가져옴
+                metrics.log('search_truncated', metro=metropolitan_govs[org_code], total=total_count,
+                            max_pages=SEARCH_MAX_PAGES)
+                last_page = SEARCH_MAX_PAGES
+            for next_page in range(2, last_page + 1):
+                submit_page(org_code, next_page)
+
+
+def _build_result(query, regions):
+    # {지역 순번: (지역 상태, 조례 목록)}을 metropolitan_govs 순서의 CollectionResult로 정리
+    result = CollectionResult(query=query)
+    for index in sorted(regions):
+        status, ordinances = regions[index]
+        result.regions.append(status)
+        result.ordinances.extend(ordinances)
+    return result
+
+
+def _with_stale(key, stale, index, status, ordinances):
+    """
+    검색이나 본문 수집에 실패한 지역은 만료된 예전 수집 결과(stale)에 그 지역이 온전히 있으면 그것으로 대신함
+    stale은 처음 필요할 때 한 번만 읽도록 [결과] 목록으로 넘김 (아직 읽지 않았으면 빈 목록)
+    """
+    if not (status.error or status.failed_details):
+        return status, ordinances
+    if not stale:
+        stale.append(_parse_cached(law_cache.get_stale('query', key)))
+    old = stale[0].regions[index] if stale[0] is not None and index < len(stale[0].regions) else None
+    if old is None or old.org_code != status.org_code or old.error or old.failed_details:
+        return status, ordinances
+    metrics.LAW_API_STALE.inc(target='query')
+    metrics.log('law_api_stale', target='query', key=key, region=status.metro, error=status.error)
+    return replace(old, stale=True), [o for o in stale[0].ordinances if o.metro == old.metro]
+
+
+def _crawl(query, key, deadline):
+    with metrics.span('crawl', query=query) as info:
+        stale = []
+        regions = {index: _with_stale(key, stale, index, status, ordinances)
+                   for index, status, ordinances in _iter_regions(query, deadline)}
+        result = _build_result(query, regions)
+        info.update(ordinances=result.total, failed_regions=[r.metro for r in result.regions if r.error],
+                    stale_regions=[r.metro for r in result.regions if r.stale])
+    return result
+
+
+def _use_index(scope):
+    # 본문 검색은 law.go.kr 제목 검색으로 할 수 없으므로 항상 로컬 색인을 사용
+    if scope not in SEARCH_SCOPES:
+        raise ValueError(f'지원하지 않는 검색 범위입니다: {scope}')
+    if SEARCH_SOURCE == 'live' and scope == 'title':
+        return False
+    if ordinance_index.is_ready():
+        return True
+    if scope == 'body' or SEARCH_SOURCE == 'index':
+        raise RuntimeError('로컬 조례 색인이 아직 만들어지지 않았습니다. python sync.py로 색인을 먼저 동기화해 주세요.')
+    return False
+
+
+def _index_result(query, scope):
+    """
+    로컬 색인 검색 결과를 반환 (색인을 쓰지 않으면 None)
+    색인 파일을 열 수 없거나 SQLite에 FTS5가 없으면, 색인이 꼭 필요한 경우(본문 검색, SEARCH_SOURCE=index)가 아닌 한
+    None을 반환해 law.go.kr에서 수집하게 함
+    """
+    try:
+        if not _use_index(scope):
+            return None
+        if not searchable(query):
+            # 한 글자 검색어는 색인으로 찾을 수 없음 (제목 검색은 law.go.kr에서 찾음)
+            if scope == 'body' or SEARCH_SOURCE == 'index':
+                raise ValueError('로컬 조례 색인 검색어는 두 글자 이상이어야 합니다.')
+            return None
+        with metrics.span('index_search', query=query, scope=scope):
+            return _search_index(query, scope)
+    except sqlite3.Error as e:
+        if scope == 'body' or SEARCH_SOURCE == 'index':
+            raise RuntimeError(f'로컬 조례 색인을 사용할 수 없습니다: {str(e)}') from e
+        metrics.log('index_unavailable', scope=scope, error=str(e))
+        return None
+
+
+def _search_index(query, scope):
+    # 로컬 색인 검색 결과를 law.go.kr 수집 결과와 같은 CollectionResult로 정리
+    result = CollectionResult(query=query)
+    counts = {org_code: 0 for org_code in metropolitan_govs}
+    for record in ordinance_index.search(query, scope):
+        counts[record['org_code']] = counts.get(record['org_code'], 0) + 1
+        result.ordinances.append(Ordinance(
+            id=record['id'],
+            name=record['name'],
+            metro=record['metro'],
+            articles=record['articles']
+        ))
+    result.regions = [RegionStatus(org_code=org_code, metro=metro_name, count=counts[org_code])
+                      for org_code, metro_name in metropolitan_govs.items()]
+    return result
+
+
+def _load_cached(key):
+    return _parse_cached(law_cache.get('query', key, ttl=QUERY_CACHE_TTL))
+
+
+def _parse_cached(cached):
+    if cached is None:
+        return None
+    try:
+        return CollectionResult.from_dict(json.loads(cached))
+    except (ValueError, KeyError, TypeError):
+        # 형식이 바뀐 예전 캐시는 무시하고 다시 수집
+        return None
+
+
+def collect_ordinances(query, deadline=None, scope='title'):
+    """
+    검색어에 해당하는 광역지자체 본청 조례와 조문을 수집해 CollectionResult로 반환
+    /api/search, /api/save, /api/compare가 모두 이 함수만 사용함
+    로컬 색인을 쓸 수 있으면 색인에서 바로 찾고(scope='body'이면 조문 본문까지 검색), 아니면 law.go.kr에서 수집
+    최근 수집 결과는 공유 캐시에서 돌려주고, 같은 검색어를 동시에 요청하면 한 번만 수집해 결과를 나눠 씀
+    law.go.kr 요청에 실패한 지역은 만료된 예전 수집 결과가 있으면 그것으로 대신함 (RegionStatus.stale)
+    반환값은 여러 요청이 공유하므로 호출하는 쪽에서 수정하지 않아야 함
+    """
+    query = normalize_query(query)
+    indexed = _index_result(query, scope)
+    if indexed is not None:
+        return indexed
+    key = query.lower()
+    deadline = SEARCH_DEADLINE if deadline is None else deadline
+
+    cached = _load_cached(key)
+    if cached is not None:
+        return cached
+
+    with _lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+    if not owner:
+        return future.result()
+
+    try:
+        # 기다리는 사이 다른 워커가 저장했을 수 있으므로 한 번 더 확인
+        result = _load_cached(key)
+        if result is None:
+            result = _crawl(query, key, deadline)
+            # 일부 지역이 실패한 결과는 캐시하지 않음
+            if result.complete:
+                law_cache.set('query', key, json.dumps(result.to_dict(), ensure_ascii=False))
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+
+def iter_collect(query, deadline=None, scope='title'):
+    """
+    collect_ordinances의 스트리밍 버전으로, 지역별 수집이 끝나는 대로 (지역 순번, RegionStatus, [Ordinance])를 내보냄
+    지역 순서는 완료 순서이므로 화면에서는 지역 순번으로 정렬해야 함
+    캐시된 결과나 로컬 색인 검색 결과는 그대로 흘려보내고, 새로 수집한 결과는 STREAM_CACHE_MAX_CHARS 이하일 때만 캐시함
+    """
+    query = normalize_query(query)
+    cached = _index_result(query, scope)
+    if cached is None:
+        key = query.lower()
+        deadline = SEARCH_DEADLINE if deadline is None else deadline
+        cached = _load_cached(key)
+    if cached is not None:
+        for index, status in enumerate(cached.regions):
+            yield index, status, [o for o in cached.ordinances if o.metro == status.metro]
+        return
+
+    kept = {}
+    kept_chars = 0
+    with metrics.span('crawl', query=query, streaming=True) as info:
+        total = 0
+        stale = []
+        for index, status, ordinances in _iter_regions(query, deadline):
+            status, ordinances = _with_stale(key, stale, index, status, ordinances)
+            total += len(ordinances)
+            info['ordinances'] = total
+            yield index, status, ordinances
+            if kept is None:
+                continue
+            kept[index] = (status, ordinances)
+            kept_chars += sum(len(article) for o in ordinances for article in o.articles)
+            if kept_chars > STREAM_CACHE_MAX_CHARS:
+                kept = None  # 너무 큰 결과는 워커 메모리에 모아 두지 않음
+
+    if kept is not None:
+        result = _build_result(query, kept)
+        if result.complete:
+            law_cache.set('query', key, json.dumps(result.to_dict(), ensure_ascii=False))
@@ -0,0 +1,117 @@
+import io
+import os
+import re
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+
+import metrics
+from law_cache import law_cache
+
+# PDF 텍스트 추출 설정 (쪽 수가 PDF_PARALLEL_MIN_PAGES 이상이면 프로세스 풀에서 쪽 단위로 나눠 추출)
+PDF_MAX_WORKERS = int(os.environ.get('PDF_MAX_WORKERS', str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', '16'))
+# 추출한 텍스트는 파일 내용의 SHA-256으로 캐시 (같은 초안을 다시 올리거나 여러 번 비교해도 한 번만 추출)
+# 이 해시가 업로드한 문서의 ID이며, 보관 기간이 지나거나 캐시 크기 상한으로 밀려나면 다시 업로드해야 함
+PDF_TEXT_CACHE_TTL = float(os.environ.get('PDF_TEXT_CACHE_TTL', str(7 * 24 * 3600)))
+
+_document_id = re.compile(r'^[0-9a-f]{64}$')
+
+_lock = threading.Lock()
+_executor = None
+_stats = Counter()
+
+
+def _get_executor():
+    # 스레드가 있는 워커 프로세스에서 fork하지 않도록 spawn으로 처음 사용할 때 생성
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PDF_MAX_WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def _extract_pages(data, start, stop):
+    # 프로세스 풀에서 실행: start~stop-1쪽의 텍스트 목록
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_count(data):
+    return len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+
+
+def valid_document_id(document_id):
+    return bool(_document_id.match(document_id or ''))
+
+
+def load_text(document_id):
+    """
+    업로드할 때 추출해 둔 문서의 (텍스트, 정보)를 반환 (없거나 보관 기간이 지났으면 None)
+    """
+    if not valid_document_id(document_id):
+        return None
+    cached = law_cache.get('pdf-text', document_id, ttl=PDF_TEXT_CACHE_TTL)
+    if cached is None:
+        return None
+    pages, seconds, text = cached.decode('utf-8').split('\n', 2)
+    return text, {'sha256': document_id, 'pages': int(pages), 'seconds': float(seconds), 'cached': True}
+
+
+def extract_text(data):
+    """
+    PDF 파일 내용(bytes)의 텍스트를 (텍스트, 정보)로 반환
+    정보는 {'sha256', 'pages', 'seconds', 'cached'}이며 캐시에서 가져온 경우 pages와 seconds는 저장 당시 값
+    쪽이 없는 PDF는 ValueError, 읽을 수 없는 PDF는 PyPDF2 오류를 그대로 올림
+    """
+    digest = content_hash(data)
+    cached = load_text(digest)
+    if cached is not None:
+        # 적중은 추출을 건너뛴 경우만 셈 (비교 분석 때 문서 ID로 텍스트를 읽는 것은 세지 않음)
+        with _lock:
+            _stats['hits'] += 1
+        metrics.log('pdf_cache_hit', sha256=digest[:12], pages=cached[1]['pages'])
+        return cached
+
+    started = time.monotonic()
+    with metrics.span('pdf_extract', sha256=digest[:12]) as info:
+        pages = page_count(data)
+        info['pages'] = pages
+        if pages == 0:
+            raise ValueError('PDF 파일이 비어있습니다.')
+        if pages < PDF_PARALLEL_MIN_PAGES or PDF_MAX_WORKERS <= 1:
+            page_texts = _extract_pages(data, 0, pages)
+        else:
+            # 워커 수만큼 연속된 쪽 묶음으로 나눠 추출한 뒤 쪽 순서대로 합침
+            chunk = -(-pages // PDF_MAX_WORKERS)
+            executor = _get_executor()
+            futures = [executor.submit(_extract_pages, data, start, min(start + chunk, pages))
+                       for start in range(0, pages, chunk)]
+            page_texts = [text for future in futures for text in future.result()]
+        text = ''.join(page + '\n' for page in page_texts)
+    seconds = time.monotonic() - started
+
+    law_cache.set('pdf-text', digest, f"{pages}\n{seconds:.3f}\n{text}")
+    with _lock:
+        _stats['misses'] += 1
+        _stats['pages'] += pages
+        _stats['seconds'] += seconds
+    return text, {'sha256': digest, 'pages': pages, 'seconds': round(seconds, 3), 'cached': False}
+
+
+def stats():
+    # 이 워커의 PDF 추출 캐시 적중/미스 횟수와 실제로 추출한 쪽 수, 쪽당 평균 시간
+    with _lock:
+        result = dict(_stats)
+    result['seconds_per_page'] = (result['seconds'] / result['pages']) if result.get('pages') else None
+    return result
@@ -0,0 +1,126 @@
+import os
+import math
+from collections import Counter
+
+from law_text import compact
+
+# 프롬프트 토큰 예산 (LLM 지연 시간과 비용, 컨텍스트 길이 초과를 막기 위한 상한)
+ANALYSIS_REFERENCE_TOKEN_BUDGET = int(os.environ.get('ANALYSIS_REFERENCE_TOKEN_BUDGET', '30000'))
+UPPER_LAW_TOKEN_BUDGET = int(os.environ.get('UPPER_LAW_TOKEN_BUDGET', '8000'))
+UPPER_LAW_ORDINANCE_TOKEN_BUDGET = int(os.environ.get('UPPER_LAW_ORDINANCE_TOKEN_BUDGET', '3000'))
+UPPER_LAW_DOC_TOKEN_BUDGET = int(os.environ.get('UPPER_LAW_DOC_TOKEN_BUDGET', '1500'))
+
+NGRAM_SIZE = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def estimate_tokens(text):
+    """
+    토큰 수 추정치 (한글은 글자당 약 1토큰, 그 밖의 문자는 4글자당 약 1토큰)
+    """
+    if not text:
+        return 0
+    hangul = sum(1 for ch in text if '가' <= ch <= '힣')
+    return hangul + math.ceil((len(text) - hangul) / 4)
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    # 띄어쓰기와 문장부호를 없앤 뒤 글자 n-gram으로 나눔 (형태소 분석 없이 한글 조문 비교에 사용)
+    text = compact(text)
+    if len(text) < n:
+        return [text] if text else []
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+class PassageIndex:
+    """
+    조/항/호 단위 구절에 대한 글자 n-gram BM25 색인
+    """
+
+    def __init__(self, passages, n=NGRAM_SIZE):
+        self.n = n
+        self.term_counts = [Counter(char_ngrams(passage, n)) for passage in passages]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(passages)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def scores(self, query_text):
+        query_counts = Counter(char_ngrams(query_text, self.n))
+        # 긴 질의(조례 전문)에서 자주 나오는 n-gram이 점수를 독차지하지 않도록 로그 가중치 사용
+        query_weights = {term: 1 + math.log(count) for term, count in query_counts.items() if term in self.idf}
+        results = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            if not length:
+                results.append(0.0)
+                continue
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (self.avg_length or 1))
+            score = 0.0
+            for term, tf in counts.items():
+                weight = query_weights.get(term)
+                if weight:
+                    score += weight * self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+def select_passages(passages, query_text, token_budget):
+    """
+    query_text와 관련도가 높은 구절부터 token_budget 안에서 고르고, 고른 구절의 번호를 원래 순서대로 반환
+    """
+    if not passages:
+        return []
+    costs = [estimate_tokens(passage) for passage in passages]
+    if sum(costs) <= token_budget:
+        return list(range(len(passages)))
+    scores = PassageIndex(passages).scores(query_text)
+    ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+    selected = []
+    used = 0
+    for i in ranked:
+        if used + costs[i] > token_budget:
+            continue
+        selected.append(i)
+        used += costs[i]
+    return sorted(selected)
+
+
+def truncate_to_budget(text, token_budget):
+    """
+    앞에서부터 token_budget 안에 들어가는 만큼만 남김 (줄 단위로 자름)
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text
+    kept = []
+    used = 0
+    for line in text.split('\n'):
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            break
+        kept.append(line)
+        used += cost
+    return '\n'.join(kept)
+
+
+def plan_reference_articles(query_text, ordinances, token_budget=ANALYSIS_REFERENCE_TOKEN_BUDGET, exclude=()):
+    """
+    타 시도 조례 전체 조문 중 업로드한 조례와 관련도가 높은 조문을 예산 안에서 골라
+    조례마다 (조문 번호, 조문) 목록을 반환 (조문 번호는 원래 순서의 0부터 시작하는 번호)
+    exclude의 (조례 번호, 조문 번호)는 후보에서 뺌
+    """
+    flat = [(o_index, a_index, article)
+            for o_index, ordinance in enumerate(ordinances)
+            for a_index, article in enumerate(ordinance.articles)
+            if (o_index, a_index) not in exclude]
+    selected = select_passages([article for _, _, article in flat], query_text, token_budget)
+    plan = [[] for _ in ordinances]
+    for i in selected:
+        o_index, a_index, article = flat[i]
+        plan[o_index].append((a_index, article))
+    return plan
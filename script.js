@@ -1,6 +1,7 @@
 // DOM 요소
 const searchInput = document.getElementById('searchInput');
 const searchBtn = document.getElementById('searchBtn');
+const searchScope = document.getElementById('searchScope');
 const saveBtn = document.getElementById('saveBtn');
 const uploadBtn = document.getElementById('uploadBtn');
 const compareBtn = document.getElementById('compareBtn');
@@ -12,6 +13,9 @@ const helpContent = document.getElementById('helpContent');
 const closeModal = document.querySelector('.close');
 const pdfFile = document.getElementById('pdfFile');
 
+// 업로드한 PDF의 문서 ID (비교 분석 때 PDF를 다시 보내지 않고 이 ID만 보냄)
+let uploadedDocument = null;  // { file, promise }
+
 // API 도움말 내용
 const apiHelpContent = {
     gemini: `[Gemini API 키 얻는 방법]
@@ -63,11 +67,12 @@ uploadBtn.addEventListener('click', () => pdfFile.click());
 compareBtn.addEventListener('click', handleCompare);
 closeModal.addEventListener('click', () => helpModal.style.display = 'none');
 
-// PDF 파일 선택 시 이벤트
+// PDF 파일 선택 시 바로 업로드해 문서 ID를 받아 둠
 pdfFile.addEventListener('change', function(e) {
     const file = e.target.files[0];
     if (file) {
         updateStatus(`PDF 파일이 선택되었습니다: ${file.name}`, 0);
+        handleUpload(file).catch(() => {});
     }
 });
 
@@ -79,7 +84,7 @@ document.querySelectorAll('.help-btn').forEach(btn => {
     });
 });
 
-// 검색 처리
+// 검색 처리 (지역별 결과가 도착하는 대로 표시)
 async function handleSearch() {
     const query = searchInput.value.trim();
     if (!query) {
@@ -88,14 +93,15 @@ async function handleSearch() {
     }
 
     updateStatus('검색 중...', 0);
+    resultText.innerHTML = '';
     try {
         console.log('검색 요청 시작:', query);
-        const response = await fetch('/api/search', {
+        const response = await fetch('/api/search/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ query })
+            body: JSON.stringify({ query, scope: searchScope.value })
         });
 
         console.log('서버 응답 상태:', response.status);
@@ -104,17 +110,40 @@ async function handleSearch() {
             throw new Error(errorData.error || '검색 실패');
         }
 
-        const data = await response.json();
-        console.log('검색 결과:', data);
-        
-        if (!data.results || data.results.length === 0) {
+        // 지역 순번별 영역을 만들어 두고 도착 순서와 관계없이 지역 순서대로 표시
+        const regionContainers = {};
+        let regionsDone = 0;
+        let shown = 0;
+        let summary = null;
+
+        await readNdjson(response, record => {
+            if (record.type === 'result') {
+                getRegionContainer(regionContainers, record.region_index).appendChild(createResultElement(record));
+                shown += 1;
+            } else if (record.type === 'region') {
+                regionsDone += 1;
+                updateStatus(`검색 중... (${regionsDone}/17개 시도, ${shown}건)`, Math.round(regionsDone / 17 * 100));
+            } else if (record.type === 'summary') {
+                summary = record;
+            } else if (record.type === 'error') {
+                throw new Error(record.error);
+            }
+        });
+
+        console.log('검색 결과 요약:', summary);
+        if (!summary || summary.total === 0) {
             resultText.innerHTML = '<p>검색 결과가 없습니다.</p>';
             updateStatus('검색 결과가 없습니다.', 100);
             return;
         }
 
-        displayResults(data);
-        updateStatus(`검색 완료! (${data.results.length}건)`, 100);
+        const failed = summary.regions.filter(region => region && region.error).map(region => region.metro);
+        const failedNote = failed.length > 0 ? ` - 일부 시도 검색 실패: ${failed.join(', ')}` : '';
+        const failedDetails = summary.regions.reduce((sum, region) => sum + ((region && region.failed_details) || 0), 0);
+        const detailNote = failedDetails > 0 ? ` - 본문을 가져오지 못한 조례 ${failedDetails}건` : '';
+        const stale = summary.regions.filter(region => region && region.stale).map(region => region.metro);
+        const staleNote = stale.length > 0 ? ` - 이전에 저장된 결과 사용: ${stale.join(', ')}` : '';
+        updateStatus(`검색 완료! (${summary.total}건)${failedNote}${detailNote}${staleNote}`, 100);
     } catch (error) {
         console.error('검색 중 오류 발생:', error);
         updateStatus(`오류 발생: ${error.message}`, 0);
@@ -122,45 +151,79 @@ async function handleSearch() {
     }
 }
 
+// NDJSON 응답을 한 줄씩 읽어 콜백에 전달
+async function readNdjson(response, onRecord) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder('utf-8');
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => onRecord(JSON.parse(line)));
+    }
+    buffer += decoder.decode();
+    if (buffer.trim()) {
+        onRecord(JSON.parse(buffer));
+    }
+}
+
+// 지역 순번에 해당하는 결과 영역 (앞뒤 지역 순서를 유지하며 삽입)
+function getRegionContainer(regionContainers, regionIndex) {
+    if (!regionContainers[regionIndex]) {
+        const container = document.createElement('div');
+        container.dataset.regionIndex = regionIndex;
+        const next = Array.from(resultText.children).find(child => Number(child.dataset.regionIndex) > regionIndex);
+        resultText.insertBefore(container, next || null);
+        regionContainers[regionIndex] = container;
+    }
+    return regionContainers[regionIndex];
+}
+
 // 결과 표시
 function displayResults(data) {
     resultText.innerHTML = '';
     if (data.results && data.results.length > 0) {
-        data.results.forEach(result => {
-            const resultElement = document.createElement('div');
-            resultElement.className = 'result-item mb-8';
-
-            // 조례명: 붉은색 굵게
-            const lawName = `<span class="font-bold text-red-600 text-lg">${result.name}</span>`;
-
-            // 조문 내용: 배열 또는 문자열
-            let articles = result.content;
-            let lawContent = '';
-            if (Array.isArray(articles)) {
-                if (articles.length > 0) {
-                    lawContent = articles.map(article =>
-                        `<div class="law-article text-black" style="margin-bottom:8px;">${article.replace(/\n/g, '<br>')}</div>`
-                    ).join('');
-                } else {
-                    lawContent = `<div class="law-article text-gray-500">(조문 없음)</div>`;
-                }
-            } else if (typeof articles === 'string') {
-                lawContent = `<div class="law-article text-black">${articles.replace(/\n/g, '<br>')}</div>`;
-            } else {
-                lawContent = `<div class="law-article text-gray-500">(조문 없음)</div>`;
-            }
-
-            resultElement.innerHTML = `
-                <div class="mb-2">${lawName}</div>
-                <div>${lawContent}</div>
-            `;
-            resultText.appendChild(resultElement);
-        });
+        data.results.forEach(result => resultText.appendChild(createResultElement(result)));
     } else {
         resultText.innerHTML = '<p>검색 결과가 없습니다.</p>';
     }
 }
 
+// 조례 하나를 표시할 요소 생성
+function createResultElement(result) {
+    const resultElement = document.createElement('div');
+    resultElement.className = 'result-item mb-8';
+
+    // 조례명: 붉은색 굵게
+    const lawName = `<span class="font-bold text-red-600 text-lg">${result.name}</span>`;
+
+    // 조문 내용: 배열 또는 문자열
+    let articles = result.content;
+    let lawContent = '';
+    if (Array.isArray(articles)) {
+        if (articles.length > 0) {
+            lawContent = articles.map(article =>
+                `<div class="law-article text-black" style="margin-bottom:8px;">${article.replace(/\n/g, '<br>')}</div>`
+            ).join('');
+        } else {
+            lawContent = `<div class="law-article text-gray-500">(조문 없음)</div>`;
+        }
+    } else if (typeof articles === 'string') {
+        lawContent = `<div class="law-article text-black">${articles.replace(/\n/g, '<br>')}</div>`;
+    } else {
+        lawContent = `<div class="law-article text-gray-500">(조문 없음)</div>`;
+    }
+
+    resultElement.innerHTML = `
+        <div class="mb-2">${lawName}</div>
+        <div>${lawContent}</div>
+    `;
+    return resultElement;
+}
+
 // 파일 저장 처리
 async function handleSave() {
     const searchInput = document.getElementById('searchInput');
@@ -179,7 +242,7 @@ async function handleSave() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ query: query })
+            body: JSON.stringify({ query: query, scope: searchScope.value })
         });
 
         if (!response.ok) {
@@ -205,43 +268,49 @@ async function handleSave() {
     }
 }
 
-// PDF 업로드 처리
-function handleUpload() {
-    const input = document.createElement('input');
-    input.type = 'file';
-    input.accept = '.pdf';
-    input.onchange = async (e) => {
-        const file = e.target.files[0];
-        if (!file) return;
-
-        updateStatus('PDF 업로드 중...', 0);
-        const formData = new FormData();
-        formData.append('pdf', file);
+// PDF 업로드 처리 (같은 파일은 한 번만 올리고 문서 ID를 재사용)
+function handleUpload(file) {
+    if (uploadedDocument && uploadedDocument.file === file) {
+        return uploadedDocument.promise;
+    }
+    const promise = uploadPdf(file);
+    uploadedDocument = { file, promise };
+    // 실패한 업로드는 다음에 다시 시도
+    promise.catch(() => {
+        if (uploadedDocument && uploadedDocument.promise === promise) {
+            uploadedDocument = null;
+        }
+    });
+    return promise;
+}
 
-        try {
-            console.log('PDF 업로드 시작:', file.name);
-            const response = await fetch('/api/upload', {
-                method: 'POST',
-                body: formData
-            });
+async function uploadPdf(file) {
+    updateStatus('PDF 업로드 중...', 0);
+    const formData = new FormData();
+    formData.append('pdf', file);
 
-            console.log('서버 응답 상태:', response.status);
-            const data = await response.json();
+    try {
+        console.log('PDF 업로드 시작:', file.name);
+        const response = await fetch('/api/upload', {
+            method: 'POST',
+            body: formData
+        });
 
-            if (!response.ok) {
-                throw new Error(data.error || '업로드 실패');
-            }
+        console.log('서버 응답 상태:', response.status);
+        const data = await response.json();
 
-            console.log('PDF 업로드 성공:', data.message);
-            updateStatus('PDF 업로드 완료!', 100);
-            resultText.innerHTML = `<p class="success">${data.message}</p>`;
-        } catch (error) {
-            console.error('PDF 업로드 중 오류 발생:', error);
-            updateStatus(`오류 발생: ${error.message}`, 0);
-            resultText.innerHTML = `<p class="error">오류가 발생했습니다: ${error.message}</p>`;
+        if (!response.ok) {
+            throw new Error(data.error || '업로드 실패');
         }
-    };
-    input.click();
+
+        console.log('PDF 업로드 성공:', data.message);
+        updateStatus(`PDF 업로드 완료! (${data.pages}쪽)`, 100);
+        return data.document_id;
+    } catch (error) {
+        console.error('PDF 업로드 중 오류 발생:', error);
+        updateStatus(`오류 발생: ${error.message}`, 0);
+        throw error;
+    }
 }
 
 // 비교 분석 처리
@@ -268,26 +337,42 @@ async function handleCompare() {
     }
 
     try {
+        // 파일을 고를 때 시작한 업로드가 끝나기를 기다림 (이미 끝났으면 바로 문서 ID를 받음)
+        const documentId = await handleUpload(pdfFile);
         updateStatus('비교 분석을 시작합니다...잠시만 기다려주세요', 0);
         
         const formData = new FormData();
-        formData.append('pdf', pdfFile);
+        formData.append('document_id', documentId);
         formData.append('query', query);
+        formData.append('scope', searchScope.value);
         if (geminiApiKey) formData.append('geminiApiKey', geminiApiKey);
         if (openaiApiKey) formData.append('openaiApiKey', openaiApiKey);
 
-        const response = await fetch('/api/compare', {
+        // 비교 분석은 오래 걸리므로 백그라운드 작업으로 등록한 뒤 진행 상황을 조회
+        const response = await fetch('/api/compare/jobs', {
             method: 'POST',
             body: formData
         });
 
         if (!response.ok) {
+            if (response.status === 404) {
+                // 서버에 보관된 문서가 만료되었으면 다음 시도 때 다시 업로드
+                uploadedDocument = null;
+            }
             const errorData = await response.json();
             throw new Error(errorData.error || '비교 분석 중 오류가 발생했습니다.');
         }
 
+        const job = await response.json();
+        await waitForCompareJob(job.status_url);
+
         // 파일 다운로드 처리
-        const blob = await response.blob();
+        const downloadResponse = await fetch(job.download_url);
+        if (!downloadResponse.ok) {
+            const errorData = await downloadResponse.json();
+            throw new Error(errorData.error || '결과 파일을 받지 못했습니다.');
+        }
+        const blob = await downloadResponse.blob();
         const url = window.URL.createObjectURL(blob);
         const a = document.createElement('a');
         a.href = url;
@@ -304,6 +389,36 @@ async function handleCompare() {
     }
 }
 
+// 비교 분석 작업 진행 단계별 진행률
+const compareJobProgress = {
+    queued: 5,
+    crawling: 15,
+    extracting: 30,
+    analyzing: 50,
+    upper_law_review: 75,
+    rendering: 90,
+    done: 100
+};
+
+// 비교 분석 작업이 끝날 때까지 상태를 조회
+async function waitForCompareJob(statusUrl) {
+    while (true) {
+        const response = await fetch(statusUrl);
+        const status = await response.json();
+        if (!response.ok) {
+            throw new Error(status.error || '작업 상태를 확인하지 못했습니다.');
+        }
+        if (status.state === 'failed') {
+            throw new Error(status.error || '비교 분석 중 오류가 발생했습니다.');
+        }
+        updateStatus(`비교 분석 중... (${status.message})`, compareJobProgress[status.state] || 0);
+        if (status.state === 'done') {
+            return status;
+        }
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+}
+
 // API 도움말 표시
 function showApiHelp(apiType) {
     helpContent.innerHTML = apiHelpContent[apiType].replace(/\n/g, '<br>');
@@ -0,0 +1,107 @@
+"""
+17개 광역지자체 본청 조례 전체를 로컬 색인(ordinance_index)으로 동기화하는 명령
+
+    python sync.py                      # 중단된 동기화가 있으면 이어서, 없으면 새로 시작
+    python sync.py --rate 2             # law.go.kr 요청을 초당 2건 이하로 제한
+    python sync.py --regions 6110000 6410000 --restart
+
+두 번째 실행부터는 새로 생기거나 개정된 조례만 본문을 받음 (cron 등으로 매일 실행)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import law_api
+from law_api import metropolitan_govs
+from ordinance_index import ORDINANCE_INDEX_PATH, OrdinanceIndex, refresh_region
+
+SYNC_RATE = float(os.environ.get('SYNC_RATE', '2'))
+SYNC_CHECKPOINT_PATH = os.environ.get('SYNC_CHECKPOINT_PATH', ORDINANCE_INDEX_PATH + '.sync.json')
+# 이보다 오래된 체크포인트는 이어 받지 않고 새로 시작 (전날 실패한 동기화가 다음 날 끝난 지역을 건너뛰지 않도록)
+SYNC_RESUME_MAX_AGE = float(os.environ.get('SYNC_RESUME_MAX_AGE', str(12 * 3600)))
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    # 중간에 중단되어도 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def run_sync(regions, index, checkpoint_path, restart=False, timeout=None):
+    """
+    regions를 차례로 동기화하고 실패한 지역 코드 목록을 반환
+    지역 하나가 끝날 때마다 체크포인트를 남겨, 중단 후 다시 실행하면 끝난 지역은 건너뜀
+    (지역 안에서도 조례마다 바로 색인에 저장하므로 다시 받는 것은 목록 페이지뿐임)
+    """
+    checkpoint = None if restart else load_checkpoint(checkpoint_path)
+    if (checkpoint and checkpoint.get('regions') == regions
+            and time.time() - checkpoint.get('started_at', 0) < SYNC_RESUME_MAX_AGE):
+        print(f"[SYNC] 이전 동기화를 이어서 진행합니다 (완료 {len(checkpoint['done'])}/{len(regions)})")
+    else:
+        checkpoint = {'regions': regions, 'done': [], 'started_at': time.time()}
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    failed = []
+    for org_code in regions:
+        if org_code in checkpoint['done']:
+            continue
+        metro_name = metropolitan_govs[org_code]
+        started_at = time.monotonic()
+        try:
+            changed, removed, unchanged = refresh_region(index, org_code, timeout=timeout)
+        except Exception as e:
+            print(f"[SYNC] {metro_name} 동기화 오류: {str(e)}")
+            failed.append(org_code)
+            continue
+        print(f"[SYNC] {metro_name}: 추가/갱신 {changed}건, 삭제 {removed}건, 유지 {unchanged}건 "
+              f"({time.monotonic() - started_at:.1f}초)")
+        checkpoint['done'].append(org_code)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    # 모든 지역이 끝났으면 다음 실행은 처음부터 (실패한 지역이 있으면 다음 실행에서 그 지역만 다시 시도)
+    if not failed:
+        os.remove(checkpoint_path)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='광역지자체 조례 로컬 색인 동기화')
+    parser.add_argument('--regions', nargs='+', metavar='ORG_CODE',
+                        help='동기화할 지자체 코드 (기본값: 17개 광역지자체 전체)')
+    parser.add_argument('--rate', type=float, default=SYNC_RATE,
+                        help=f'law.go.kr 초당 요청 수 상한 (0이면 제한 없음, 기본값: {SYNC_RATE:g})')
+    parser.add_argument('--index', default=ORDINANCE_INDEX_PATH, help='색인 파일 경로')
+    parser.add_argument('--checkpoint', default=SYNC_CHECKPOINT_PATH, help='체크포인트 파일 경로')
+    parser.add_argument('--restart', action='store_true', help='체크포인트를 무시하고 처음부터 동기화')
+    parser.add_argument('--timeout', type=float, default=None, help='요청당 제한 시간(초)')
+    args = parser.parse_args(argv)
+
+    regions = args.regions or list(metropolitan_govs)
+    unknown = [org_code for org_code in regions if org_code not in metropolitan_govs]
+    if unknown:
+        parser.error(f"알 수 없는 지자체 코드: {', '.join(unknown)}")
+
+    law_api.set_request_rate(args.rate)
+    failed = run_sync(regions, OrdinanceIndex(args.index), args.checkpoint,
+                      restart=args.restart, timeout=args.timeout)
+    if failed:
+        print(f"[SYNC] 실패한 지역: {', '.join(metropolitan_govs[org_code] for org_code in failed)}")
+        return 1
+    print("[SYNC] 동기화 완료")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import pytest
+
+import article_align
+from article_align import align, split_articles, verdict
+from ordinance_service import Ordinance
+
+DRAFT = """부산광역시 주차장 설치 및 관리 조례안
+제1조(목적) 이 조례는 「주차장법」에서 위임된 사항과 그 시행에 필요한 사항을 규정함을 목적으로 한다.
+제2조(정의) 이 조례에서 사용하는 용어의 뜻은 「주차장법」에서 정하는 바에 따른다.
+제2조의2(공영주차장 요금) 공영주차장의 주차요금은 별표 1과 같이 하며 시장은 필요한 경우 감면할 수 있다.
+부칙
+제1조(시행일) 이 조례는 공포한 날부터 시행한다.
+"""
+
+SAME = '제1조(목적) 이 조례는 「주차장법」에서 위임된 사항과 그 시행에 필요한 사항을 규정함을 목적으로 한다.'
+SIMILAR = '제3조(주차요금) 공영주차장의 주차요금은 별표와 같이 하며 요금을 감면할 수 있는 대상은 규칙으로 정한다.'
+OTHER = '제9조(위원회) 시장은 도시계획에 관한 사항을 심의하기 위하여 위원회를 둔다.'
+
+
+def test_verdict_thresholds():
+    assert verdict(1.0) == '동일'
+    assert verdict(article_align.ALIGN_SAME_THRESHOLD) == '동일'
+    assert verdict(article_align.ALIGN_SIMILAR_THRESHOLD) == '유사'
+    assert verdict(article_align.ALIGN_SIMILAR_THRESHOLD - 0.01) == '상이'
+    assert verdict(0.0) == '상이'
+
+
+def test_split_articles_stops_at_addenda():
+    articles = split_articles(DRAFT)
+    assert [article.label for article in articles] == ['제1조', '제2조', '제2조의2']
+    assert articles[2].heading == '제2조의2(공영주차장 요금)'
+
+
+def test_align_verdicts():
+    ordinances = [
+        Ordinance(id='1', name='서울특별시 주차장 설치 조례', metro='서울특별시', articles=[OTHER, SAME, SIMILAR]),
+        Ordinance(id='2', name='대구광역시 주차장 조례', metro='대구광역시', articles=[]),
+    ]
+    alignments = align(DRAFT, ordinances)
+    assert len(alignments) == 3
+
+    purpose, definitions, fees = (alignment.matches for alignment in alignments)
+    assert (purpose[0].label, purpose[0].verdict) == ('제1조', '동일')
+    assert purpose[0].score == pytest.approx(1.0, abs=1e-4)
+    assert (fees[0].label, fees[0].verdict) == ('제3조', '유사')
+    assert definitions[0].verdict == '상이'
+    # 조문이 없는 조례는 판정하지 않음
+    assert all(matches[1].verdict == '없음' and matches[1].article_index is None
+               for matches in (purpose, definitions, fees))
+    assert alignments[0].counts() == {'동일': 1, '유사': 0, '상이': 0}
+
+
+def test_align_without_articles_in_draft():
+    assert align('조 구분이 없는 문서', [Ordinance(id='1', name='조례', metro='서울특별시', articles=[SAME])]) == []
+
+
+def test_chunked_similarity_matches_single_pass(monkeypatch):
+    ours = [article.text for article in split_articles(DRAFT)]
+    theirs = [OTHER, SAME, SIMILAR] * 5
+    expected = article_align.similarity_matrix(ours, theirs)
+    monkeypatch.setattr(article_align, 'ALIGN_CHUNK_CELLS', 7)
+    assert article_align.similarity_matrix(ours, theirs) == pytest.approx(expected, abs=1e-6)
@@ -0,0 +1,81 @@
+import time
+
+from law_cache import LawCache
+
+
+def _cache(tmp_path, **kwargs):
+    return LawCache(path=str(tmp_path / 'law_cache.sqlite3'), **kwargs)
+
+
+def _age(cache, target, key, seconds):
+    cache._connect().execute('UPDATE entries SET stored_at = ? WHERE target = ? AND key = ?',
+                             (time.time() - seconds, target, key))
+
+
+def test_round_trip(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set('ordin', '100', '제1조(목적) 이 조례는')
+    assert cache.get('ordin', '100').decode('utf-8') == '제1조(목적) 이 조례는'
+    assert cache.get('ordin', '200') is None
+    assert cache.stats()['counters']['ordin'] == {'store': 1, 'hit': 1, 'miss': 1}
+
+
+def test_ttl(tmp_path):
+    cache = _cache(tmp_path, ttl=100)
+    cache.set('ordin', '100', b'x')
+    _age(cache, 'ordin', '100', 150)
+    assert cache.get('ordin', '100') is None
+    assert cache.get('ordin', '100', ttl=200) == b'x'
+    assert cache.stats()['counters']['ordin']['expired'] == 1
+
+
+def test_revision_mismatch_is_a_miss_but_kept(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set('ordin', '100', b'old', revision='r1')
+    assert cache.get('ordin', '100', revision='r2') is None
+    assert cache.get('ordin', '100', revision='r1') == b'old'
+    # 개정 정보 없이 조회하면 개정 여부를 따지지 않음
+    assert cache.get('ordin', '100') == b'old'
+    assert cache.stats()['counters']['ordin']['invalidated'] == 1
+
+    cache.set('ordin', '100', b'new', revision='r2')
+    assert cache.get('ordin', '100', revision='r2') == b'new'
+    assert cache.get('ordin', '100', revision='r1') is None
+
+
+def test_stale_ignores_ttl_and_revision(tmp_path):
+    cache = _cache(tmp_path, ttl=100)
+    cache.set('ordin', '100', b'old', revision='r1')
+    _age(cache, 'ordin', '100', 150)
+    assert cache.get('ordin', '100', revision='r2') is None
+    assert cache.get_stale('ordin', '100') == b'old'
+    assert cache.get_stale('ordin', '200') is None
+    assert cache.stats()['counters']['ordin']['stale'] == 1
+
+
+def test_invalidate(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set('ordin', '100', b'x')
+    cache.invalidate('ordin', '100')
+    assert cache.get('ordin', '100') is None
+    assert cache.get_stale('ordin', '100') is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, max_bytes=300)
+    cache.set('ordin', 'a', b'a' * 100)
+    cache._connect().execute("UPDATE entries SET accessed_at = 0 WHERE key = 'a'")
+    cache.set('ordin', 'b', b'b' * 100)
+    # 압축 후 크기로 세므로 서로 다른 내용을 여러 개 넣어 상한을 넘김
+    for i in range(40):
+        cache.set('ordin', f'c{i}', str(i * 7919).encode() * 10)
+    assert cache.get('ordin', 'a') is None
+    assert cache.stats()['bytes'] <= 300
+
+
+def test_unusable_path_degrades_to_miss(tmp_path):
+    cache = LawCache(path=str(tmp_path / 'missing' / 'law_cache.sqlite3'))
+    cache.set('ordin', '100', b'x')
+    assert cache.get('ordin', '100') is None
+    assert cache.get_stale('ordin', '100') is None
+    assert cache.stats()['counters']['ordin']['error'] == 3
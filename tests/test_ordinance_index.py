@@ -0,0 +1,97 @@
+import pytest
+
+import ordinance_index
+from law_api import metropolitan_govs
+from ordinance_index import OrdinanceIndex, refresh_region, searchable
+
+SEOUL, BUSAN = '6110000', '6260000'
+
+
+def _record(ordinance_id, org_code, name, articles, date='20200101', revision='r1'):
+    return {'id': ordinance_id, 'org_code': org_code, 'metro': metropolitan_govs[org_code], 'name': name,
+            'revision': revision, 'date': date, 'articles': articles}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = OrdinanceIndex(str(tmp_path / 'ordinance_index.sqlite3'))
+    index.upsert(_record('1', BUSAN, '부산광역시 주차장 설치 및 관리 조례', ['제1조(목적) 이 조례는 주차장 설치에 관하여 정한다.']))
+    index.upsert(_record('2', SEOUL, '서울특별시 주차장 설치 조례', ['제1조(목적) 주차장의 설치 기준을 정한다.'],
+                         date='20190101'))
+    index.upsert(_record('3', SEOUL, '서울특별시 주차장 조례', ['제1조(목적) 공영주차장을 정한다.'], date='20210101'))
+    index.upsert(_record('4', SEOUL, '서울특별시 도로 점용허가 조례', ['제2조(정의) 노상주차장은 도로에 설치한다.']))
+    return index
+
+
+def _ids(results):
+    return [result['id'] for result in results]
+
+
+def test_title_search_ignores_spacing_and_orders_by_region_then_date(index):
+    assert _ids(index.search('주차장')) == ['3', '2', '1']
+    assert _ids(index.search('주차장설치')) == ['2', '1']
+    assert _ids(index.search('주차장 관리')) == ['1']
+
+
+def test_body_scope_includes_articles(index):
+    assert _ids(index.search('노상주차장')) == []
+    assert _ids(index.search('노상주차장', scope='body')) == ['4']
+    assert _ids(index.search('주차장', scope='body')) == ['3', '4', '2', '1']
+
+
+def test_single_character_terms(index):
+    assert not searchable('차 a')
+    assert searchable('주차장 및')
+    # 한 글자 검색어만으로는 색인을 훑지 않음
+    assert index.search('차') == []
+    assert _ids(index.search('주차장 및')) == ['1']
+
+
+def test_upsert_replaces_and_remove_deletes(index):
+    index.upsert(_record('3', SEOUL, '서울특별시 공영차고지 조례', ['제1조(목적) 차고지를 정한다.'], revision='r2'))
+    assert _ids(index.search('주차장')) == ['2', '1']
+    assert _ids(index.search('공영차고지')) == ['3']
+    index.remove(['3', 'missing'])
+    assert index.search('공영차고지') == []
+    assert index.revisions(SEOUL) == {'2': 'r1', '4': 'r1'}
+
+
+def test_ready_only_when_every_region_synced(index):
+    assert not index.is_ready()
+    for org_code in list(metropolitan_govs)[:-1]:
+        index.mark_region_synced(org_code)
+    assert not index.is_ready()
+    index.mark_region_synced(list(metropolitan_govs)[-1])
+    assert index.is_ready()
+    assert index.synced_regions()[SEOUL]['count'] == 3
+
+
+def test_refresh_region_retries_only_failed_details(index, monkeypatch):
+    listed = [
+        {'id': '2', 'name': '서울특별시 주차장 설치 조례', 'revision': 'r2', 'date': '20220101'},
+        {'id': '3', 'name': '서울특별시 주차장 조례', 'revision': 'r1', 'date': '20210101'},
+        {'id': '5', 'name': '서울특별시 빈 조례', 'revision': 'r1', 'date': None},
+        {'id': '6', 'name': '서울특별시 새 조례', 'revision': 'r1', 'date': None},
+    ]
+    fetched = []
+
+    def fetch(ordinance_id, revision=None, **kwargs):
+        fetched.append(ordinance_id)
+        if ordinance_id in ('2', '6'):
+            raise RuntimeError('law.go.kr 오류')
+        return []
+
+    monkeypatch.setattr(ordinance_index, 'search_region', lambda *args, **kwargs: (listed, len(listed)))
+    monkeypatch.setattr(ordinance_index, 'fetch_ordinance_detail', fetch)
+
+    assert refresh_region(index, SEOUL) == (3, 1, 1)
+    assert fetched == ['2', '5', '6']
+    # 본문을 받지 못한 기존 조례는 이전 본문을 유지하고, 새 조례는 개정 정보 없이 제목만 들어감
+    assert index.revisions(SEOUL) == {'2': 'r1', '3': 'r1', '5': 'r1', '6': None}
+    assert _ids(index.search('설치 기준', scope='body')) == ['2']
+    assert _ids(index.search('새 조례')) == ['6']
+
+    fetched.clear()
+    refresh_region(index, SEOUL)
+    # 본문이 없는 조례(5)는 다시 받지 않음
+    assert fetched == ['2', '6']
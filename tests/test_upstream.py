@@ -0,0 +1,119 @@
+import pytest
+import requests
+
+import upstream
+from upstream import CircuitBreaker, CircuitOpenError
+
+
+def _open_breaker(cooldown):
+    breaker = CircuitBreaker('test', failures=2, cooldown=cooldown)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker('test', failures=3, cooldown=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker('test', failures=2, cooldown=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+
+def test_half_open_allows_one_trial():
+    breaker = _open_breaker(cooldown=0)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+
+
+def test_half_open_success_closes():
+    breaker = _open_breaker(cooldown=0)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow() and breaker.allow()
+
+
+def test_half_open_failure_reopens():
+    breaker = _open_breaker(cooldown=60)
+    breaker.cooldown = 0
+    assert breaker.allow()
+    breaker.cooldown = 60
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_release_frees_trial_slot():
+    breaker = _open_breaker(cooldown=0)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+
+
+class _Session:
+
+    def __init__(self, error=None, status=200):
+        self.error = error
+        self.status = status
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        response = requests.Response()
+        response.status_code = self.status
+        response.url = url
+        return response
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    # get()이 쓰는 엔드포인트별 상태를 테스트마다 새로 둠
+    monkeypatch.setattr(upstream, '_breakers', {})
+    monkeypatch.setattr(upstream, '_latencies', {})
+    breaker = CircuitBreaker('lawService', failures=1, cooldown=0)
+    upstream._breakers['lawService'] = breaker
+    upstream._latencies['lawService'] = upstream.LatencyWindow()
+    return breaker
+
+
+def test_get_rejects_while_open(breaker):
+    breaker.cooldown = 60
+    breaker.record_failure()
+    session = _Session()
+    with pytest.raises(CircuitOpenError):
+        upstream.get(session, 'http://example/lawService.do', {}, 5, 0)
+    assert session.calls == 0
+
+
+def test_get_unexpected_error_does_not_wedge_half_open(breaker):
+    breaker.record_failure()
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            upstream.get(_Session(error=ValueError('boom')), 'http://example/lawService.do', {}, 5, 0)
+    upstream.get(_Session(), 'http://example/lawService.do', {}, 5, 0)
+    assert breaker.state == 'closed'
+
+
+def test_get_client_error_is_not_a_failure(breaker):
+    with pytest.raises(requests.HTTPError):
+        upstream.get(_Session(status=404), 'http://example/lawService.do', {}, 5, 0)
+    assert breaker.state == 'closed'
+    with pytest.raises(requests.HTTPError):
+        upstream.get(_Session(status=503), 'http://example/lawService.do', {}, 5, 0)
+    assert breaker.state == 'open'
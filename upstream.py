@@ -0,0 +1,287 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+import metrics
+
+# law.go.kr 요청 공통 처리 (OC 키별 토큰 버킷, 엔드포인트별 서킷 브레이커, 짧은 연결/읽기 제한 시간, 헤지 요청)
+# 토큰 버킷은 SQLite 파일로 gunicorn 워커끼리 공유하고, 브레이커와 지연 시간 통계는 워커마다 따로 둠
+LAW_API_STATE_PATH = os.environ.get('LAW_API_STATE_PATH',
+                                    os.path.join(tempfile.gettempdir(), 'law_api_state.sqlite3'))
+LAW_API_CONNECT_TIMEOUT = float(os.environ.get('LAW_API_CONNECT_TIMEOUT', '3.05'))
+LAW_API_READ_TIMEOUT = float(os.environ.get('LAW_API_READ_TIMEOUT', '15'))
+# 초당 요청 수(LAW_API_RATE)를 넘겨 한꺼번에 보낼 수 있는 요청 수 (캐시가 비어 있을 때 검색 한 번의 요청 수(100건 안팎) 이상)
+LAW_API_BURST = float(os.environ.get('LAW_API_BURST', '120'))
+# 연속 실패가 LAW_API_BREAKER_FAILURES번이면 LAW_API_BREAKER_COOLDOWN초 동안 요청을 보내지 않고(캐시가 있으면 지난 응답 사용)
+# 그 뒤 요청 하나로 회복 여부를 확인함
+LAW_API_BREAKER_FAILURES = int(os.environ.get('LAW_API_BREAKER_FAILURES', '5'))
+LAW_API_BREAKER_COOLDOWN = float(os.environ.get('LAW_API_BREAKER_COOLDOWN', '30'))
+# 응답이 최근 p95 지연 시간(최소 LAW_API_HEDGE_MIN_DELAY초)보다 늦으면 같은 요청을 한 번 더 보내 먼저 온 응답을 사용
+# (p95는 엔드포인트별 최근 LAW_API_LATENCY_WINDOW개 성공 요청으로 계산하며, 표본이 적을 때는 헤지하지 않음)
+LAW_API_HEDGE = os.environ.get('LAW_API_HEDGE', '1') != '0'
+LAW_API_HEDGE_MIN_DELAY = float(os.environ.get('LAW_API_HEDGE_MIN_DELAY', '0.5'))
+LAW_API_HEDGE_WORKERS = int(os.environ.get('LAW_API_HEDGE_WORKERS', '32'))
+LAW_API_LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class CircuitOpenError(requests.ConnectionError):
+    # 브레이커가 열려 요청을 보내지 않은 경우 (연결 오류와 같이 처리됨)
+    pass
+
+
+class TokenBucket:
+    """
+    키(OC)마다 초당 rate개씩 채워지고 최대 burst개까지 쌓이는 토큰 버킷 (SQLite 파일로 프로세스끼리 공유)
+    """
+
+    def __init__(self, key, path=LAW_API_STATE_PATH, burst=LAW_API_BURST):
+        self.key = key
+        self.path = path
+        self.burst = burst
+        self._local = threading.local()
+
+    def _connect(self):
+        # 스레드(및 fork된 프로세스)마다 별도 연결을 사용
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _take(self, rate):
+        # 토큰 하나를 가져오고 0을, 모자라면 토큰이 찰 때까지 기다릴 시간(초)을 반환
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (self.key,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * rate)
+            wait_seconds = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait_seconds = (1 - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                         (self.key, tokens, now))
+            conn.execute('COMMIT')
+            return wait_seconds
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def acquire(self, rate, block=True):
+        """
+        토큰 하나를 얻으면 True (rate가 0 이하이면 제한 없음, block=False이면 토큰이 없을 때 기다리지 않고 False)
+        """
+        if rate <= 0:
+            return True
+        while True:
+            try:
+                wait_seconds = self._take(rate)
+            except sqlite3.Error as e:
+                # 상태 파일을 쓸 수 없으면 제한 없이 진행 (키는 OC이므로 로그에 남기지 않음)
+                metrics.log('rate_limit_error', error=str(e))
+                return True
+            if not wait_seconds:
+                return True
+            if not block:
+                return False
+            time.sleep(wait_seconds)
+
+
+class CircuitBreaker:
+    """
+    연속 실패 횟수로 열리고, cooldown초 뒤 요청 하나(half-open)가 성공하면 닫히는 서킷 브레이커
+    """
+
+    def __init__(self, name, failures=LAW_API_BREAKER_FAILURES, cooldown=LAW_API_BREAKER_COOLDOWN):
+        self.name = name
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self._trial = False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+            self._trial = False
+
+    def release(self):
+        # 결과를 판단할 수 없이 끝난 요청 (half-open 확인 요청이었다면 다음 요청이 다시 확인하도록 자리를 비움)
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self._failures >= self.failures):
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._trial = False
+                opened = True
+            else:
+                opened = False
+        if opened:
+            metrics.LAW_API_CIRCUIT_OPENED.inc(endpoint=self.name)
+            metrics.log('circuit_open', endpoint=self.name, cooldown=self.cooldown)
+
+
+class LatencyWindow:
+    # 최근 성공 요청의 지연 시간 (헤지 기준인 p95 계산용)
+
+    def __init__(self, size=LAW_API_LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self):
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+_lock = threading.Lock()
+_executor = None
+_buckets = {}
+_breakers = {}
+_latencies = {}
+
+
+def _get_executor():
+    # gunicorn 워커가 fork된 뒤에 스레드가 만들어지도록 처음 사용할 때 생성
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LAW_API_HEDGE_WORKERS, thread_name_prefix='law-api')
+        return _executor
+
+
+def _state(endpoint, key):
+    with _lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(key)
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+            _latencies[endpoint] = LatencyWindow()
+        return _buckets[key], _breakers[endpoint], _latencies[endpoint]
+
+
+def _is_upstream_failure(e):
+    # 4xx 응답(429 제외)은 서버가 살아 있다는 뜻이므로 브레이커 실패로 세지 않음
+    response = getattr(e, 'response', None)
+    if isinstance(e, requests.HTTPError) and response is not None:
+        return response.status_code == 429 or response.status_code >= 500
+    return True
+
+
+def _send(session, url, params, timeout, endpoint, latencies):
+    with metrics.timed(metrics.UPSTREAM_SECONDS, endpoint=endpoint, org=params.get('org', '')):
+        started = time.monotonic()
+        response = session.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+    latencies.add(time.monotonic() - started)
+    return response
+
+
+def _hedged(session, url, params, timeout, endpoint, latencies, bucket, rate, delay):
+    executor = _get_executor()
+    primary = executor.submit(metrics.bind(_send), session, url, params, timeout, endpoint, latencies)
+    done, _ = wait([primary], timeout=delay)
+    # 헤지 요청도 한도 안에서만 보냄 (토큰이 없으면 첫 요청을 끝까지 기다림)
+    if done or not bucket.acquire(rate, block=False):
+        return primary.result()
+    hedge = executor.submit(metrics.bind(_send), session, url, params, timeout, endpoint, latencies)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                response = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            metrics.LAW_API_HEDGES.inc(endpoint=endpoint, winner='hedge' if future is hedge else 'primary')
+            return response
+    raise error
+
+
+def get(session, url, params, timeout, rate):
+    """
+    law.go.kr에 GET 요청을 보내 응답을 반환 (HTTP 오류는 예외)
+    OC 키의 토큰 버킷(초당 rate개)을 지키고, 브레이커가 열려 있으면 보내지 않고 CircuitOpenError를 올림
+    timeout은 읽기 제한 시간의 상한이며 실제로는 LAW_API_CONNECT_TIMEOUT, LAW_API_READ_TIMEOUT 이하로 줄임
+    """
+    endpoint = url.rsplit('/', 1)[-1].split('.', 1)[0]
+    bucket, breaker, latencies = _state(endpoint, params.get('OC', ''))
+    if not breaker.allow():
+        raise CircuitOpenError(f'{endpoint} 요청이 연속으로 실패해 잠시 보내지 않습니다')
+    timeouts = (LAW_API_CONNECT_TIMEOUT, min(LAW_API_READ_TIMEOUT, timeout))
+    p95 = latencies.p95() if LAW_API_HEDGE else None
+    try:
+        bucket.acquire(rate)
+        if p95 is None:
+            response = _send(session, url, params, timeouts, endpoint, latencies)
+        else:
+            response = _hedged(session, url, params, timeouts, endpoint, latencies, bucket, rate,
+                               max(p95, LAW_API_HEDGE_MIN_DELAY))
+    except requests.RequestException as e:
+        if _is_upstream_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record_success()
+    return response
+
+
+def stats():
+    # 이 워커의 엔드포인트별 브레이커 상태와 최근 p95 지연 시간
+    with _lock:
+        endpoints = list(_breakers)
+    return {
+        endpoint: {'circuit': _breakers[endpoint].state, 'p95': _latencies[endpoint].p95()}
+        for endpoint in endpoints
+    }